@@ -1,2 +1,19 @@
 # an __init__.py file in the folder turns the folder into a python package
-# and allows us to import the files in the folder as a module.
\ No newline at end of file
+# and allows us to import the files in the folder as a module.
+import importlib
+
+# Qubitrix - Package
+# The public API is split in three, so that tools only pay for what they use:
+#
+#     Qubitrix.engine  the rules and Game, without pygame (cheap enough for every worker process to import)
+#     Qubitrix.render  drawing, imported name by name on first use
+#     Qubitrix.audio   sound effects, which load pygame's mixer the first time one is played
+#
+# "import Qubitrix" imports none of them; each is imported the first time it is used as an attribute.
+
+SUBPACKAGES = ("engine", "render", "audio")
+
+def __getattr__(name):
+    if name not in SUBPACKAGES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f"{__name__}.{name}")
@@ -0,0 +1,123 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # headless: nothing is drawn or played
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+if __package__ in (None, ""): # run as a script from inside the Qubitrix folder, so import it as the package it is
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Qubitrix.controllers.abstract_controller import GameEvent
+from Qubitrix.replays.archive import ReplayArchive, append_games, clear_frequencies, input_counts, multiplier_curve, placement_heatmap, record_session
+from Qubitrix.replays.verification import initialize_worker
+
+# Qubitrix - Replay Archiver
+# Adds recorded sessions to a replay archive (see replays.archive), re-simulating each one once:
+#
+#     python archive_replays.py add archive/ sessions/*.json --workers 8
+#
+# and answers questions about every game in an archive without simulating anything again:
+#
+#     python archive_replays.py summary archive/
+#     python archive_replays.py heatmap archive/ --save heatmap.npy    where pieces are placed, plane by plane
+#     python archive_replays.py clears archive/                        clear and spin frequencies by level
+#     python archive_replays.py multiplier archive/ --bin-seconds 30   the score multiplier over the course of a game
+#     python archive_replays.py inputs archive/                        how often each input is used
+
+APPEND_BATCH = 64 # sessions appended to the archive at once
+
+def add(archive_path, log_paths, workers):
+    start = time.perf_counter()
+    game_count = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=initialize_worker) as executor:
+        sessions = executor.map(record_session, log_paths, chunksize=8)
+        batch = []
+        for n, games in enumerate(sessions, 1):
+            batch += games
+            if n % APPEND_BATCH == 0 or n == len(log_paths):
+                append_games(archive_path, batch)
+                game_count += len(batch)
+                batch = []
+    print(f"Added {game_count} games from {len(log_paths)} sessions in {time.perf_counter()-start:.2f}s")
+
+def print_summary(archive):
+    games = archive.games
+    print(f"{len(games)} games ({int(games['finished'].sum())} finished), {len(archive.events)} placements, "
+          f"{games['frames'].sum(dtype=np.int64)/60/3600:.1f} hours played, rules version {archive.rules_version}")
+    if len(games):
+        scores = games["score"]
+        print(f"Score: mean {scores.mean():.0f}, median {np.median(scores):.0f}, best {scores.max()}")
+        print(f"Level reached: mean {games['level'].mean():.1f}, best {games['level'].max()}")
+        print(f"Highest multiplier: mean {games['highest_multiplier'].mean():.2f}, best {games['highest_multiplier'].max():.2f}")
+
+def print_heatmap(archive, save_path):
+    heatmap = placement_heatmap(archive)
+    if save_path:
+        np.save(save_path, heatmap)
+    total = max(int(heatmap.sum()), 1)
+    for z in range(archive.height): # top plane first, like the board
+        if heatmap[:, :, z].any():
+            print(f"Plane {archive.height-z} ({heatmap[:, :, z].sum()/total*100:.1f}% of cubes):")
+            for y in range(archive.depth):
+                print("    " + " ".join(f"{heatmap[x, y, z]/total*100:5.2f}%" for x in range(archive.width)))
+
+def print_clears(archive):
+    counts = clear_frequencies(archive)
+    print("Level  Placements  Singles  Doubles  Triples   Quads  Spins: singles  doubles  triples")
+    for level in range(len(counts)):
+        placements = counts[level].sum()
+        if placements:
+            plain, spin = counts[level]/placements*100
+            print(f"{level:5d}  {placements:10d}  " + "  ".join(f"{share:6.2f}%" for share in plain[1:]) + "         " + "  ".join(f"{share:6.2f}%" for share in spin[1:4]))
+
+def print_multiplier(archive, bin_seconds):
+    averages, counts = multiplier_curve(archive, bin_seconds)
+    print("Time      Placements  Multiplier")
+    for n, (average, count) in enumerate(zip(averages, counts)):
+        if count:
+            print(f"{n*bin_seconds:6.0f}s  {count:10d}  {average:10.3f}")
+
+def print_inputs(archive):
+    counts = input_counts(archive)
+    minutes = max(archive.games["frames"].sum(dtype=np.int64)/60/60, 1/60)
+    print("Input                          Count  Per minute")
+    for event in sorted(GameEvent, key=lambda event: -counts[event.value]):
+        if counts[event.value]:
+            print(f"{event.name:28s} {counts[event.value]:8d}  {counts[event.value]/minutes:10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build replay archives and compute statistics over every game in them")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_command = commands.add_parser("add", help="simulate recorded sessions and add their games to an archive")
+    add_command.add_argument("archive", help="folder of the archive, created if it doesn't exist")
+    add_command.add_argument("logs", nargs="+", help="input logs recorded with qubitrix.py --record")
+    add_command.add_argument("--workers", type=int, default=os.cpu_count(), help="number of simulating processes (default: one per CPU)")
+    for name, help in (("summary", "overall results"), ("heatmap", "how often each cell gets a cube"), ("clears", "clear and spin frequencies by level"),
+                       ("multiplier", "the average score multiplier over time in a game"), ("inputs", "how often each input is used")):
+        commands.add_parser(name, help=help).add_argument("archive")
+    commands.choices["heatmap"].add_argument("--save", metavar="FILE", help="also save the counts as a NumPy array indexed [x, y, z]")
+    commands.choices["multiplier"].add_argument("--bin-seconds", type=float, default=10, help="length of each stretch of time averaged over")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        return add(args.archive, args.logs, args.workers)
+    with ReplayArchive(args.archive) as archive:
+        match args.command:
+            case "summary":
+                print_summary(archive)
+            case "heatmap":
+                print_heatmap(archive, args.save)
+            case "clears":
+                print_clears(archive)
+            case "multiplier":
+                print_multiplier(archive, args.bin_seconds)
+            case "inputs":
+                print_inputs(archive)
+
+if __name__ == '__main__':
+    main()
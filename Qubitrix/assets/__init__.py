@@ -0,0 +1,2 @@
+# an __init__.py file in the folder turns the folder into a python package
+# and allows us to import the files in the folder as a module.
\ No newline at end of file
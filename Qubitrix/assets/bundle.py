@@ -0,0 +1,95 @@
+import io
+import json
+import mmap
+import os
+import struct
+
+# Qubitrix - Asset Bundle Module
+# Packs the game's sounds and fonts into one file, so that starting the game opens and maps a single file instead of
+# listing the sounds folder and reading and decoding every WAV on its own (many small reads are slow from a zipped or
+# network-mounted install). Build it with `python pack_assets.py`.
+#
+# A bundle starts with HEADER (the magic bytes, the format version and the size of the table of contents), followed by
+# the table of contents as JSON and then the assets, each starting at a multiple of ALIGNMENT. Offsets in the table of
+# contents count from where the assets start. Sounds are stored already decoded, as the raw samples pygame.mixer plays,
+# so they are only usable when the mixer was initialized with the same frequency, sample format and channel count as
+# when the bundle was built; the table of contents records them. Other files (the font) are stored as they are.
+
+MAGIC = b"QBXA"
+VERSION = 1
+HEADER = struct.Struct("<4sII") # magic, version, table of contents size
+ALIGNMENT = 16
+DEFAULT_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets.bundle")
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def build_bundle(path, sounds, files, mixer_format):
+    """
+    Writes a bundle to path.
+
+    Args:
+        sounds: {name: raw samples (bytes)} as returned by pygame.mixer.Sound.get_raw().
+        files: {name: file contents (bytes)}, names being paths relative to the Qubitrix folder like "fonts/qubitrix-font.ttf".
+        mixer_format: the pygame.mixer.get_init() the samples were decoded for.
+    """
+    contents = {"mixer": list(mixer_format), "sounds": {}, "files": {}}
+    blobs = [(contents["sounds"], name, data) for name, data in sorted(sounds.items())] + [(contents["files"], name, data) for name, data in sorted(files.items())]
+    offset = 0
+    for table, name, data in blobs:
+        table[name] = [offset, len(data)]
+        offset = align(offset + len(data))
+    table_json = json.dumps(contents).encode()
+    data_start = align(HEADER.size + len(table_json))
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(table_json)))
+        file.write(table_json)
+        for table, name, data in blobs:
+            file.seek(data_start + table[name][0])
+            file.write(data)
+        file.truncate(data_start + offset)
+    os.replace(path + ".tmp", path) # never leave a half-written bundle where the game looks for one
+
+class AssetBundle:
+    """
+    A bundle mapped into memory. Assets are handed out as views of the mapping, so nothing is read until it is used.
+
+    Attributes:
+        mixer_format: the (frequency, format, channels) the sounds were decoded for.
+        sounds: {name: (offset, size)} of the raw samples of each sound.
+        files: {name: (offset, size)} of each other file.
+    """
+    def __init__(self, path=DEFAULT_BUNDLE_PATH):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) # the mapping stays valid after the file is closed
+        magic, version, table_size = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} asset bundle, rebuild it with pack_assets.py")
+        contents = json.loads(self.map[HEADER.size:HEADER.size+table_size])
+        self.data_start = align(HEADER.size + table_size)
+        self.mixer_format = tuple(contents["mixer"])
+        self.sounds = {name: tuple(entry) for name, entry in contents["sounds"].items()}
+        self.files = {name: tuple(entry) for name, entry in contents["files"].items()}
+
+    def view(self, entry):
+        offset, size = entry
+        return memoryview(self.map)[self.data_start+offset:self.data_start+offset+size]
+
+    def sound_buffer(self, name, mixer_format):
+        """Returns the raw samples of a sound for pygame.mixer.Sound(buffer=...), or None if it isn't in the bundle for this mixer format."""
+        if name not in self.sounds or tuple(mixer_format) != self.mixer_format:
+            return None
+        return self.view(self.sounds[name])
+
+    def open_file(self, name):
+        """Returns a file object with the contents of a bundled file, or None if it isn't in the bundle."""
+        if name not in self.files:
+            return None
+        return io.BytesIO(self.view(self.files[name])) # pygame.font.Font reads fonts from file objects as well as paths
+
+def load_bundle(path=DEFAULT_BUNDLE_PATH):
+    """Returns the AssetBundle at path, or None if there is none or it can't be used, in which case the loose files are used instead."""
+    try:
+        return AssetBundle(path)
+    except (OSError, ValueError, struct.error): # struct.error: too short to hold a header
+        return None
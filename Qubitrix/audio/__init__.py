@@ -0,0 +1,31 @@
+import importlib
+
+# Qubitrix - Audio Module
+# The game's sound effects, for code that shouldn't import pygame just to be imported itself. The sounds module (and
+# pygame's mixer with it) is only imported the first time a sound is played or one of its names is used here, so the
+# rules engine can play its sounds through play() and still import without pygame:
+#
+#     from Qubitrix import audio
+#     audio.play("place_hard", 300)
+#     audio.Effects().memory_budget = 8*2**20  # any name from Qubitrix.sounds
+
+def get_effects():
+    """Returns the Effects singleton (see Qubitrix.sounds), importing it the first time."""
+    from Qubitrix.sounds import Effects
+    return Effects()
+
+def play(name, maxtime):
+    """Plays the sound effect called name for at most maxtime milliseconds."""
+    get_effects()[name].play(maxtime=maxtime)
+
+def preload():
+    """Loads every sound effect now, instead of the first time each is played."""
+    get_effects().load_all_sounds()
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        return getattr(importlib.import_module("Qubitrix.sounds"), name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -0,0 +1,123 @@
+import bisect
+import json
+import time
+
+# Qubitrix - Input Latency Module
+# Measures how long it takes from an input being read to the frame that shows its effect being presented. The game
+# loop drains the event queue, runs the game tick (which fires auto-repeats), draws the frame and presents it, so every
+# input handled during a frame shows up when that frame is presented.
+#
+# Inputs are timestamped when the frame's events are drained (begin_frame), or when an auto-repeat fires, and tagged
+# by Game.basic_input(), Game.modified_input() and Game.hold_piece() with what kind of input they were. An input can
+# also wait in the event queue before it is drained, while the loop sleeps until the next frame; pygame doesn't say
+# when events arrived, so that wait is reported separately as an upper bound (the time since the last frame was
+# presented). Auto-repeats also report their jitter: how far the time between two repeats of the same key appearing on
+# screen is from the repeat interval the game intends.
+
+BUCKET_EDGES = (*range(1, 51), 60, 70, 80, 90, 100, 150, 200, 300, 500, 1000) # upper bounds of the histogram buckets, in milliseconds
+BASIC_INPUT_TYPES = ("move", "move", "move", "move", "grid rotation", "grid rotation", "soft drop")
+MODIFIED_INPUT_TYPES = ("rotate", "rotate", "rotate", "rotate", "rotate", "rotate", "hard drop")
+HOLD_INPUT_TYPE = "hold"
+QUEUE_WAIT = "queue wait (upper bound)"
+REPEAT_SUFFIX = " (repeat)"
+
+class LatencyHistogram:
+    """Counts of latencies in buckets a millisecond wide up to 50ms, and coarser ones above that."""
+    def __init__(self):
+        self.counts = [0]*(len(BUCKET_EDGES)+1) # the last bucket is for anything over the last edge
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        milliseconds = seconds*1000
+        self.counts[bisect.bisect_left(BUCKET_EDGES, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.maximum = max(self.maximum, milliseconds)
+
+    def mean(self):
+        return self.total/self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket the given fraction of latencies fall at or under, in milliseconds."""
+        target = fraction*self.count
+        seen = 0
+        for n, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return BUCKET_EDGES[n] if n < len(BUCKET_EDGES) else self.maximum
+        return 0.0
+
+    def report(self):
+        labels = [f"<={edge}ms" for edge in BUCKET_EDGES] + [f">{BUCKET_EDGES[-1]}ms"]
+        return {"count": self.count, "mean_ms": round(self.mean(), 3), "p50_ms": self.percentile(0.5), "p95_ms": self.percentile(0.95),
+                "p99_ms": self.percentile(0.99), "max_ms": round(self.maximum, 3), "histogram": {label: count for label, count in zip(labels, self.counts) if count}}
+
+class LatencyTracer:
+    """
+    Traces inputs from being read to being presented on screen.
+
+    Attributes:
+        latencies: {input type: LatencyHistogram} from the input being read to its frame being presented. Auto-repeats
+            have REPEAT_SUFFIX added to their type, and QUEUE_WAIT holds the queue wait bound of every frame.
+        jitter: {input type: LatencyHistogram} of how far apart consecutive auto-repeats appeared from the intended
+            interval, either way.
+        open_traces: the (input type, key, timestamp, repeat interval) of inputs waiting for their frame to be presented.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.latencies = {}
+        self.jitter = {}
+        self.open_traces = []
+        self.frame_timestamp = None
+        self.last_presented = None
+        self.last_repeats = {} # {key: when its last auto-repeat was presented}
+
+    def begin_frame(self):
+        """Timestamps the inputs of a frame. Call it right after draining the event queue."""
+        self.frame_timestamp = self.clock()
+        if self.last_presented is not None:
+            self.latencies.setdefault(QUEUE_WAIT, LatencyHistogram()).add(self.frame_timestamp-self.last_presented)
+
+    def tag(self, input_type, key=None, repeat=False, repeat_interval=None):
+        """
+        Records an input being handled. key identifies which key or button it came from, for measuring auto-repeat
+        jitter, and repeat_interval is how many seconds apart the game means repeats of it to be.
+        """
+        if repeat:
+            self.open_traces.append((input_type + REPEAT_SUFFIX, key, self.clock(), repeat_interval))
+        elif self.frame_timestamp is not None: # inputs from outside the game loop, like replays, aren't traced
+            self.last_repeats.pop(key, None) # a new press starts a new run of repeats
+            self.open_traces.append((input_type, key, self.frame_timestamp, None))
+
+    def frame_presented(self):
+        """Closes the traces of every input handled since the last frame was presented. Call it right after presenting."""
+        presented = self.clock()
+        for input_type, key, timestamp, repeat_interval in self.open_traces:
+            self.latencies.setdefault(input_type, LatencyHistogram()).add(presented-timestamp)
+            if repeat_interval is not None:
+                if key in self.last_repeats:
+                    self.jitter.setdefault(input_type, LatencyHistogram()).add(abs(presented-self.last_repeats[key]-repeat_interval))
+                self.last_repeats[key] = presented
+        self.open_traces.clear()
+        self.frame_timestamp = None
+        self.last_presented = presented
+
+    def describe(self):
+        """Returns lines of text summarizing the latencies, for the debug overlay."""
+        lines = [f"{input_type}: p50 {histogram.percentile(0.5):.0f}ms p95 {histogram.percentile(0.95):.0f}ms max {histogram.maximum:.0f}ms"
+                 for input_type, histogram in sorted(self.latencies.items()) if input_type != QUEUE_WAIT]
+        lines += [f"{input_type} jitter: p95 {histogram.percentile(0.95):.0f}ms" for input_type, histogram in sorted(self.jitter.items())]
+        if QUEUE_WAIT in self.latencies:
+            lines.append(f"+ up to {self.latencies[QUEUE_WAIT].percentile(0.95):.0f}ms queued (p95)")
+        return lines
+
+    def report(self):
+        """Returns every histogram as a dictionary that can be saved as JSON."""
+        return {"latency": {input_type: histogram.report() for input_type, histogram in sorted(self.latencies.items())},
+                "repeat_jitter": {input_type: histogram.report() for input_type, histogram in sorted(self.jitter.items())}}
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
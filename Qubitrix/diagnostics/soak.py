@@ -0,0 +1,259 @@
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from Qubitrix.diagnostics.latency import LatencyHistogram
+from Qubitrix.engine import FPS, KEYDOWN, KEYUP, Game, global_tick, get_ui_color_id, hotkeys, keyboard_input_check
+
+# Qubitrix - Soak Test Module
+# Cabinets run for days, so a few kilobytes lost per game add up. A soak test plays game after game as fast as it can
+# (see soak.py), and a SoakMonitor samples the process every so often: its resident memory, what Python has allocated
+# (through tracemalloc) split by the subsystem that allocated it, the garbage collector's counts and how long frames
+# took. Memory that keeps growing at a steady rate once the game has warmed up is a leak, so the report fits a line to
+# each of those series and flags the ones that grow faster than a given slope.
+#
+# Time is measured in hours of play (frames/FPS) rather than on the wall clock, so a leak that grows with every frame
+# reads the same however much faster than real time the soak test runs. tracemalloc only sees Python's allocations;
+# memory SDL allocates for surfaces, sounds and fonts only shows up in the resident memory. Tracing also slows every
+# allocation down, which the frame times include.
+
+DEFAULT_SAMPLE_FRAMES = 5*60*FPS # five minutes of play
+DEFAULT_MAX_GROWTH = 1.0 # in megabytes per hour of play
+DEFAULT_WARMUP_HOURS = 0.25 # of play, while sounds are loaded and caches fill up; samples from it are left out of the trends
+HOT_SPOTS = 15 # lines whose allocations grew the most, in the report
+PACKAGE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESTART_FRAMES = 3*FPS # how long a finished game stays on screen before the next one starts
+HELD_FRAMES = (1, 12) # how long random presses are held, at least and at most, in frames
+MOVE_KEYS = range(9) # hotkeys the random player presses: moves, turns, drops, the modifier and hold (not pause)
+
+def get_resident_memory():
+    """Returns how many bytes of the process are in memory, or on systems without /proc the most there have been."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError: # Windows
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*(1 if sys.platform == "darwin" else 1024)
+
+def get_subsystem(filename):
+    """Returns which part of the game a source file belongs to, like "engine" or "render.board", or "pygame", "numpy" or "python"."""
+    path = os.path.abspath(filename)
+    if path.startswith(PACKAGE_FOLDER + os.sep):
+        parts = os.path.splitext(os.path.relpath(path, PACKAGE_FOLDER))[0].split(os.sep)
+        return ".".join(parts[:-1] if parts[-1] == "__init__" and len(parts) > 1 else parts)
+    for library in ("pygame", "numpy"):
+        if f"{os.sep}{library}{os.sep}" in path:
+            return library
+    return "python"
+
+def get_slope(points):
+    """Returns the slope of the least squares line through (x, y) points, or None with fewer than 3 of them."""
+    if len(points) < 3:
+        return None
+    mean_x = sum(x for x, _ in points)/len(points)
+    mean_y = sum(y for _, y in points)/len(points)
+    spread = sum((x-mean_x)**2 for x, _ in points)
+    return sum((x-mean_x)*(y-mean_y) for x, y in points)/spread if spread else None
+
+class Event:
+    """A key event with only what keyboard_input_check() reads, so the random player needs no pygame."""
+    def __init__(self, type, scancode):
+        self.type = type
+        self.dict = {"scancode": scancode}
+
+class RandomPlayer:
+    """
+    Plays a Game with random key presses, held for a few frames each, like someone mashing the keyboard. It drives the
+    game through keyboard_input_check() as main() does and starts a new game RESTART_FRAMES after each one ends.
+
+    Attributes:
+        game: the Game being played.
+        held: {hotkey index: frames left} of the keys being held down.
+    """
+    def __init__(self, initial_level=1, seed=None):
+        self.game = Game()
+        self.game.initial_level = initial_level
+        self.random = random.Random(seed) # its own generator, so pressing keys doesn't change which pieces the game deals
+        self.held = {}
+        self.frames_waited = 0
+
+    def press(self, key, down):
+        keyboard_input_check(Event(KEYDOWN if down else KEYUP, hotkeys[key]), self.game)
+
+    def step(self):
+        """Plays one frame. Returns the UI color id main() would draw the frame with, like Bot.step()."""
+        ui_color_id = get_ui_color_id(self.game)
+        if self.game.mode != "Playing":
+            self.frames_waited += 1
+            if self.game.mode == "Home" or self.frames_waited >= RESTART_FRAMES:
+                for key in self.held:
+                    self.press(key, False)
+                self.held.clear()
+                self.game.init_game()
+                self.frames_waited = 0
+        else:
+            for key, frames_left in list(self.held.items()):
+                if frames_left <= 1:
+                    self.press(key, False)
+                    del self.held[key]
+                else:
+                    self.held[key] = frames_left-1
+            key = self.random.choice(MOVE_KEYS)
+            if key not in self.held and self.random.random() < 0.3:
+                self.held[key] = self.random.randint(*HELD_FRAMES)
+                self.press(key, True)
+        global_tick(self.game)
+        return ui_color_id
+
+class SoakMonitor:
+    """
+    Samples how much memory the process uses as a soak test goes on, see above.
+
+    Attributes:
+        frames: frames played so far, kept up to date by frame().
+        games: games started so far, counted by whoever runs the soak test.
+        samples: a dictionary for each sample taken (see sample()).
+        frame_times: LatencyHistogram of every frame's time, and window_times of the frames since the last sample.
+        max_growth: megabytes per hour of play a series may grow by before it is flagged.
+        warmup: hours of play left out of the trends.
+    """
+    def __init__(self, max_growth=DEFAULT_MAX_GROWTH, warmup=DEFAULT_WARMUP_HOURS, trace=True, clock=time.perf_counter):
+        self.max_growth = max_growth
+        self.warmup = warmup
+        self.trace = trace
+        self.clock = clock
+        self.frames = 0
+        self.games = 0
+        self.samples = []
+        self.frame_times = LatencyHistogram()
+        self.window_times = LatencyHistogram()
+        self.reference = None # the tracemalloc snapshot of the last warm-up sample, which hot spots are compared with
+        self.latest = None
+        self.started = clock()
+        self.started_tracing = trace and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def close(self):
+        """Stops tracemalloc, if this monitor started it."""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def frame(self, seconds):
+        """Records a frame played and how long it took."""
+        self.frames += 1
+        self.frame_times.add(seconds)
+        self.window_times.add(seconds)
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<unknown>")))
+
+    def sample(self):
+        """Takes a sample of the process now. Returns it, a dictionary that can be saved as JSON."""
+        gc_stats = gc.get_stats()
+        sample = {"play_hours": self.frames/FPS/3600, "wall_hours": (self.clock()-self.started)/3600, "frames": self.frames, "games": self.games,
+                  "resident_mb": get_resident_memory()/2**20, "objects": len(gc.get_objects()),
+                  "gc_collections": [generation["collections"] for generation in gc_stats], "gc_uncollectable": sum(generation["uncollectable"] for generation in gc_stats),
+                  "frame_ms": {"p50": self.window_times.percentile(0.5), "p95": self.window_times.percentile(0.95), "p99": self.window_times.percentile(0.99),
+                               "max": round(self.window_times.maximum, 3)}}
+        if self.trace:
+            self.latest = self.take_snapshot()
+            subsystems = {}
+            for statistic in self.latest.statistics("filename"):
+                subsystem = get_subsystem(statistic.traceback[0].filename)
+                subsystems[subsystem] = subsystems.get(subsystem, 0) + statistic.size
+            sample["traced_mb"] = sum(subsystems.values())/2**20
+            sample["subsystems_mb"] = {subsystem: size/2**20 for subsystem, size in sorted(subsystems.items())}
+            if self.reference is None or sample["play_hours"] <= self.warmup:
+                self.reference = self.latest
+        self.samples.append(sample)
+        self.window_times = LatencyHistogram()
+        return sample
+
+    def get_trends(self):
+        """Returns {series: growth in megabytes (or objects) per hour of play} over the samples after the warm-up, None where too few."""
+        samples = [sample for sample in self.samples if sample["play_hours"] > self.warmup]
+        series = {"resident_mb": [(sample["play_hours"], sample["resident_mb"]) for sample in samples],
+                  "objects": [(sample["play_hours"], sample["objects"]) for sample in samples]}
+        if self.trace:
+            series["traced_mb"] = [(sample["play_hours"], sample["traced_mb"]) for sample in samples]
+            for subsystem in sorted({subsystem for sample in samples for subsystem in sample["subsystems_mb"]}):
+                series[f"subsystems_mb.{subsystem}"] = [(sample["play_hours"], sample["subsystems_mb"].get(subsystem, 0.0)) for sample in samples]
+        return {name: get_slope(points) for name, points in series.items()}
+
+    def get_flagged(self):
+        """Returns the memory series growing faster than max_growth megabytes per hour of play."""
+        return [name for name, slope in self.get_trends().items() if name != "objects" and slope is not None and slope > self.max_growth]
+
+    def get_hot_spots(self):
+        """Returns the lines whose allocations grew the most since the warm-up, as dictionaries."""
+        if not self.trace or self.reference is None or self.latest is self.reference:
+            return []
+        hot_spots = []
+        for statistic in self.latest.compare_to(self.reference, "lineno")[:HOT_SPOTS]:
+            if statistic.size_diff <= 0:
+                break
+            frame = statistic.traceback[0]
+            hot_spots.append({"where": f"{frame.filename}:{frame.lineno}", "subsystem": get_subsystem(frame.filename),
+                              "growth_kb": round(statistic.size_diff/1024, 1), "blocks": statistic.count_diff})
+        return hot_spots
+
+    def describe(self):
+        """Returns lines of text about the latest sample and the trends so far, for printing as the soak test goes on."""
+        if not self.samples:
+            return []
+        sample = self.samples[-1]
+        lines = [f"{sample['play_hours']:.2f}h played ({sample['wall_hours']:.2f}h), {sample['games']} games: {sample['resident_mb']:.1f}MB resident"
+                 + (f", {sample['traced_mb']:.1f}MB traced" if self.trace else "") + f", {sample['objects']} objects, frames p99 {sample['frame_ms']['p99']:.0f}ms"]
+        trends = self.get_trends()
+        flagged = self.get_flagged()
+        lines += [f"{name}: {slope:+.3f}/h{' (growing too fast)' if name in flagged else ''}" for name, slope in trends.items()
+                  if slope is not None and (name in flagged or not name.startswith("subsystems_mb."))]
+        return lines
+
+    def report(self):
+        """Returns the samples, trends, flagged series and hot spots as a dictionary that can be saved as JSON."""
+        return {"max_growth_mb_per_hour": self.max_growth, "warmup_hours": self.warmup, "trends_per_hour": self.get_trends(),
+                "flagged": self.get_flagged(), "hot_spots": self.get_hot_spots(), "frame_times": self.frame_times.report(), "samples": self.samples}
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+def soak(player, monitor, frames=None, sample_frames=DEFAULT_SAMPLE_FRAMES, draw=None, on_sample=None):
+    """
+    Plays player (a Bot or RandomPlayer) for frames frames, or until interrupted if frames is None, sampling the process
+    every sample_frames frames and once more at the end. draw(game, ui_color_id) draws each frame, if given, and
+    on_sample(monitor) is called after each sample. Returns the monitor.
+    """
+    playing = False
+    try:
+        while frames is None or monitor.frames < frames:
+            start = monitor.clock()
+            ui_color_id = player.step()
+            if draw:
+                draw(player.game, ui_color_id)
+            monitor.frame(monitor.clock()-start)
+            if player.game.mode == "Playing" and not playing:
+                monitor.games += 1
+            playing = player.game.mode == "Playing"
+            if monitor.frames % sample_frames == 0:
+                monitor.sample()
+                if on_sample:
+                    on_sample(monitor)
+    except KeyboardInterrupt:
+        pass
+    if not monitor.samples or monitor.samples[-1]["frames"] != monitor.frames:
+        monitor.sample()
+        if on_sample:
+            on_sample(monitor)
+    return monitor
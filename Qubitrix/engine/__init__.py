@@ -0,0 +1,770 @@
+import math
+import random
+from copy import deepcopy
+
+from Qubitrix import audio
+from Qubitrix.controllers.abstract_controller import GameEvent
+from Qubitrix.diagnostics.latency import BASIC_INPUT_TYPES, MODIFIED_INPUT_TYPES, HOLD_INPUT_TYPE
+
+# Qubitrix - Rules Engine Module
+# The rules of the game: the grid, the pieces and how they move, rotate and lock, scoring and levels, and how inputs
+# map onto them. Nothing here draws anything or imports pygame, so bots, replay tools and worker processes can import
+# it cheaply (see tests/test_import_time.py). The game's sounds are played through Qubitrix.audio, which only loads
+# pygame's mixer the first time a sound is played, and drawing a Game is up to Qubitrix.render.
+
+KEYDOWN, KEYUP = 0x300, 0x301 # pygame's event types for keys (SDL's SDL_KEYDOWN and SDL_KEYUP), so handling key events needs no pygame
+
+FPS = 60
+RULES_VERSION = 1 # bump when a change to the rules makes recorded games play out differently (see replays.archive)
+WIDTH, DEPTH, HEIGHT = 4, 4, 12
+PIECES = [ # tetracubes, float (half) values will have to be converted to int.
+    {"centers": [[1,1,-4], [2,1,-4]], "cubes": [[0,1,-4],[1,1,-4],[2,1,-4],[3,1,-4]], "id": 1}, # I piece
+    {"centers": [[1.5,1.5,-3.5],[1.5,1.5,-4.5]], "cubes": [[1,1,-4],[1,2,-4],[2,1,-4],[2,2,-4]], "id": 2}, # O piece
+    {"centers": [[1,1,-4]], "cubes": [[1,1,-3],[1,1,-4],[1,1,-5],[2,1,-5]], "id": 3}, # L piece
+    {"centers": [[1,1,-4],[2,1,-4]], "cubes": [[1,1,-3],[1,1,-4],[2,1,-4],[2,1,-5]], "id": 4}, # Z piece
+    {"centers": [[1,1,-4]], "cubes": [[1,1,-3],[1,1,-4],[2,1,-4],[1,1,-5]], "id": 5}, # T piece
+    {"centers": [[1.5,1.5,-3.5]], "cubes": [[1,1,-3],[1,2,-3],[1,2,-4],[2,2,-3]], "id": 6}, # Y piece
+    {"centers": [[1.5,1.5,-3.5]], "cubes": [[2,1,-3],[1,2,-3],[1,2,-4],[2,2,-3]], "id": 7}, # Chiral piece A
+    {"centers": [[1.5,1.5,-3.5]], "cubes": [[1,1,-3],[1,2,-3],[2,2,-4],[2,2,-3]], "id": 8} # Chiral piece B
+]
+NEXT_PIECE_COUNT = 5
+VISUAL_GRID_ROT_EASING = 12/FPS
+GAME_OVER_SCREEN_ANIM_TIME = 0.5 # in seconds
+ANALOG_DEADZONE_WIDTH = 0.55 # setting this above 0.7 will make diagonals impossible
+MULT_BUFFER_DRAIN_COEFFICIENT = 0.014 # affects the speed at which the multiplier buffer drains
+MULT_DRAIN_COEFFICIENT = 1.8 # affects the speed at which the multiplier itself drains with an empty buffer
+MULT_BUFFER_SIZE = 0.4 # how much score multiplier is required to fill or drain the bar fully
+PLANE_CLEAR_SCORE_BONUSES = (0, 100, 250, 500, 1000) # for 0-4 planes
+SPIN_CLEAR_SCORE_FACTOR = 3 # multiply the above bonuses by this amount for spin clears
+PLANE_CLEAR_MULT_BONUSES = (0, 0.15, 0.32, 0.5, 0.7) # for 0-4 planes
+SPIN_CLEAR_MULT_FACTOR = 2 # multiply the above bonuses by this amount for spin clears
+MAXIMUM_SELECTABLE_LEVEL = 40
+SELECTABLE_LEVEL_GRID_WIDTH = 10
+BASE_LEVEL_CLEAR_REQ = 4 # How many plane clears it takes to increment the level counter from level 1
+STAGE_LENGTH = 4 # How many levels are required to shift the color palette and increase the plane clear requirement by 1
+TICK_DURATION_SCALE_EXPONENT = 1.25
+PLACEMENT_LENIENCY_SCALE_EXPONENT = 0.42
+SECLUDED_SPACE_MERCY_COEFFICIENT = 0.04
+
+hotkeys = [7, 26, 4, 22, 14, 15, 44, 225, 51, 41] # d,w,a,s,k,l,space,lshift,semicolon,esc by default. to do: add settings for this
+controller_bindings = [14, 11, 13, 12, 2, 1, 0, 9, 3, 15, 10] # see above, but index 10 is for an alternate lower button
+kick_orders = {} # displacements tried by rotate_piece when a rotation has to be moved, keyed by the rotated piece's size and the preferred direction
+
+def use_piece_set(piece_set):
+    """
+    Plays with a piece set from pieces.polycubes.load_piece_set instead of the default tetracubes. This has to happen
+    before any Game is created. The kick orders of every orientation of every piece are cached here as well, so rotating
+    any piece costs the same from the first rotation on.
+    """
+    global PIECES
+    PIECES = piece_set["pieces"]
+    for extents in piece_set["extents"]:
+        for extent in extents:
+            for direction in range(4):
+                get_kick_order(extent, direction)
+
+def get_level_requirement(level):
+    return math.ceil((level)*(BASE_LEVEL_CLEAR_REQ-0.5+0.5*(level)/STAGE_LENGTH))
+
+def copy_piece(piece):
+    """Returns a copy of a piece whose cubes and centers can be moved without moving the original's."""
+    return {"centers": [list(center) for center in piece["centers"]], "cubes": [list(cube) for cube in piece["cubes"]], "id": piece["id"]}
+
+def get_piece_bounds(cubes):
+    """Returns the smallest and the largest coordinates of a piece's cubes on each axis, as two [x, y, z] lists."""
+    axes = tuple(zip(*cubes))
+    return [min(axis) for axis in axes], [max(axis) for axis in axes]
+
+def get_kick_order(coordinate_ranges, direction):
+    """
+    Returns the (x, y, z) displacements rotate_piece tries, in order, when a rotated piece fits nowhere near where it
+    was rotated. They only depend on how wide, deep and tall the rotated piece is and on the preferred direction (0-3,
+    like a movement input relative to the grid), so they are sorted once per combination and cached.
+    """
+    key = (tuple(coordinate_ranges), direction)
+    if key not in kick_orders:
+        horizontal_displacements = [(x, y) for y in range(-coordinate_ranges[1], coordinate_ranges[1]+1) for x in range(-coordinate_ranges[0], coordinate_ranges[0]+1)]
+        preferred_displacement = [[0.001,-0.0001],[0.0001,0.001],[-0.001,0.0001],[-0.0001,-0.001]][direction] # displacements are checked for first in these positions based on the input given... (0.001 values are to prioritize [0,0] displacement forst, then in that direction; 0.0001 for a clockwise check thereafter)
+        horizontal_displacements = sorted(horizontal_displacements, key=lambda displacement: ((displacement[0]-preferred_displacement[0])**2+(displacement[1]-preferred_displacement[1])**2)) # then by Euclidean distance between those positions
+        kick_orders[key] = [(x, y, z) for z in range(-coordinate_ranges[2], coordinate_ranges[2]+1)[::-1] for x, y in horizontal_displacements] # Z axis (bottom to top) is done first
+    return kick_orders[key]
+
+class Game:
+    def __init__(self, sounds=True):
+        from Qubitrix.environments.observation import ObservationBuffer # imports NumPy, which importing the engine shouldn't
+        self.mode = "Home"
+        self.rotate_modifier = False
+        self.key_hold_times = [0, 0, 0, 0, 0, 0, 0] # for each movement hotkey
+        self.initial_level = 1
+        self.observation = ObservationBuffer(WIDTH, DEPTH, HEIGHT, len(PIECES[0]["cubes"]), NEXT_PIECE_COUNT) # NumPy copy of the state for external readers
+        self.stats = None # a StatsStore to record games to, if any
+        self.latency_tracer = None # a LatencyTracer to tag handled inputs for, if any
+        self.archive = None # a replays.archive.GameRecorder to record placements to, if any
+        self.particles = None # a render.particles.ParticleSystem to show clears, placements and spins with, if any
+        self.sounds = sounds # False for games nobody hears, which then never load pygame's mixer (see Qubitrix.audio)
+        self.init_sounds()
+    def init_game(self):
+        self.grid = [[[0 for _ in range(HEIGHT)] for _ in range(DEPTH)] for _ in range(WIDTH)] # indexing: [x][y][z] where z is height
+        self.mode = "Playing"
+        self.score = 0
+        self.total_planes_cleared = 0
+        self.plane_clear_level_progress = get_level_requirement(self.initial_level-1)
+        self.total_plane_clear_types = [0, 0, 0, 0]
+        self.total_spin_clear_types = [0, 0, 0]
+        self.total_spins = 0
+        self.secluded_spaces = 0
+        self.level = self.initial_level
+        self.check_for_level_increase()
+        self.score_multiplier = 1.0
+        self.highest_score_multiplier = 1.0
+        self.score_mult_buffer = 0.0
+        self.score_mult_cap = 1.0 + self.level/5
+        self.repeat_input_delay = FPS/7.5
+        self.next_pieces = []
+        self.get_new_piece()
+        self.held_piece = {}
+        self.grid_rotation = 0
+        self.visual_grid_rotation = 0.0
+        self.game_over_screen_time = 0
+        if self.stats:
+            self.stats_session = self.stats.start_session(self.initial_level)
+        if self.archive:
+            self.archive.start_game(self)
+        self.publish_observation()
+    @property
+    def ghost_piece_grounded(self):
+        return self.piece_fully_grounded(self.ghost_piece)
+    @property
+    def leaderboard(self):
+        return self.stats.leaderboard if self.stats else [] # served from memory, see StatsStore
+    def init_sounds(self):
+        if self.sounds:
+            audio.preload() # preload all wav files into the Effects manager
+    def play_sound(self, name, maxtime):
+        if self.sounds:
+            audio.play(name, maxtime)
+    def publish_observation(self):
+        if self.observation: # None when nothing reads it, like when verifying replays
+            self.observation.publish(self) # readers get views of this through self.observation.latest()
+    def change_initial_level(self, amount):
+        self.initial_level += amount
+        self.initial_level = min(max(self.initial_level, 1), MAXIMUM_SELECTABLE_LEVEL)
+    def increase_score(self, points):
+        self.score += points * self.score_multiplier
+    def check_for_level_increase(self):
+        while self.plane_clear_level_progress >= get_level_requirement(self.level):
+            self.level += 1
+        self.score_mult_cap = 1.0 + self.level/5
+        self.refresh_tickspeed()
+    def score_mult_bonus(self, amount):
+        self.score_mult_buffer += amount
+        if self.score_mult_buffer > MULT_BUFFER_SIZE:
+            self.score_multiplier += self.score_mult_buffer - MULT_BUFFER_SIZE
+            self.score_mult_buffer = MULT_BUFFER_SIZE
+            self.score_multiplier = min(self.score_multiplier, self.score_mult_cap)
+        self.highest_score_multiplier = max(self.highest_score_multiplier, self.score_multiplier)
+    def refresh_tickspeed(self):
+        self.tick_duration = FPS/(1.5*((2+self.level)/3)**TICK_DURATION_SCALE_EXPONENT)*(1+self.secluded_spaces*SECLUDED_SPACE_MERCY_COEFFICIENT) # show mercy when there is a large number of secluded spaces to fill
+        self.placement_leniency = FPS/(1.5*((2+self.level)/3)**PLACEMENT_LENIENCY_SCALE_EXPONENT)
+        self.repeat_input_times = [ # faster for soft dropping and slower for other inputs
+            *[min(FPS/7.5, self.placement_leniency/4)]*6, # d,w,a,s,k,l
+            min(FPS/20, self.tick_duration/2) # space
+        ]
+    def load_upcoming_pieces(self):
+        while len(self.next_pieces) <= NEXT_PIECE_COUNT:
+            piece_bag = PIECES + [PIECES[random.randrange(0, len(PIECES)-1)]] # adds a "bag" of a set of pieces with an extra random piece to come next
+            random.shuffle(piece_bag)
+            self.next_pieces.extend(piece_bag)
+    def reset_piece_state(self):
+        self.tick_time = 0
+        self.place_time = 0
+        self.in_hard_drop = False
+        self.lowest_center_elevation = self.current_piece["centers"][0][2]
+        self.lowest_spin_elevation = self.current_piece["centers"][0][2]
+        self.piece_spin_on_last_movement = False
+        self.get_ghost_piece()
+    def get_new_piece(self):
+        self.load_upcoming_pieces()
+        self.current_piece = deepcopy(self.next_pieces.pop(0)) # get the first piece in the queue
+        self.hold_piece_used = False
+        self.get_secluded_spaces()
+        self.reset_piece_state()
+    def hold_piece(self):
+        if not self.hold_piece_used: # only if it is not already used this turn
+            self.hold_piece_used = True
+            if self.latency_tracer:
+                self.latency_tracer.tag(HOLD_INPUT_TYPE)
+            if self.archive:
+                self.archive.record_input(GameEvent.HOLD_PIECE)
+            current_piece_index = self.current_piece["id"] - 1 # for indexing in the PIECES list
+            self.current_piece = self.held_piece
+            self.held_piece = deepcopy(PIECES[current_piece_index])
+            if not self.current_piece: # empty dict
+                self.load_upcoming_pieces()
+                self.current_piece = deepcopy(self.next_pieces.pop(0)) # get the first piece in the queue
+            self.reset_piece_state()
+            self.play_sound("hold_piece", 300) # play the sound effect for holding the piece
+    def clear_planes(self):
+        planes_cleared = 0
+        for z in range(HEIGHT): # for each horizontal plane
+            cubes = 0
+            for y in range(DEPTH):
+                for x in range(WIDTH):
+                    if self.grid[x][y][z] > 0:
+                        cubes += 1 # count the number of cubes in that plane
+            if cubes == DEPTH*WIDTH: # if the plane is full
+                planes_cleared += 1
+                if self.particles:
+                    self.particles.plane_cleared(z, [[self.grid[x][y][z] for y in range(DEPTH)] for x in range(WIDTH)], self.piece_spin_on_last_movement)
+                    cleared_z = z
+                for y in range(DEPTH):
+                    for x in range(WIDTH):
+                        self.grid[x][y].pop(z) # remove the plane
+                        self.grid[x][y].insert(0, 0) # insert an empty plane at the top
+        score_before_clear = self.score
+        self.increase_score(PLANE_CLEAR_SCORE_BONUSES[min(planes_cleared, 4)] * (SPIN_CLEAR_SCORE_FACTOR if self.piece_spin_on_last_movement else 1))
+        if self.particles and planes_cleared:
+            self.particles.popup(self.score-score_before_clear, ((WIDTH-1)/2, (DEPTH-1)/2, cleared_z))
+        self.total_planes_cleared += planes_cleared
+        self.plane_clear_level_progress += planes_cleared
+        self.check_for_level_increase()
+        self.score_mult_bonus(PLANE_CLEAR_MULT_BONUSES[min(planes_cleared, 4)] * (SPIN_CLEAR_MULT_FACTOR if self.piece_spin_on_last_movement else 1))
+        if (planes_cleared > 0) and (type(planes_cleared) == int): # ensure that only integers may be used in the sound names
+            if not self.piece_spin_on_last_movement:
+                self.play_sound(f"{min(planes_cleared, 4)}_plane_clear", 1000)
+                self.total_plane_clear_types[min(planes_cleared, 4)-1] += 1
+            else:
+                self.play_sound(f"{min(planes_cleared, 3)}_spin_clear", 1000)
+                self.total_spin_clear_types[min(planes_cleared, 3)-1] += 1
+        return planes_cleared
+    def get_secluded_spaces(self):
+        self.secluded_spaces = 0 # this could just be a returned variable, perhaps modify?
+        visible_depths = [[[0 for _ in range(DEPTH if rot%2 else WIDTH)] for _ in range(HEIGHT)] for rot in range(4)] # Indexing: [Face rotation (in the order below)][z][x or y, depending on face - this is "a" in the below code]
+        # The below function provides how deep empty spaces go in each row from 4 perspectives relative to the default grid rotation:
+        # Front face, left face (but flipped horizontally for later code to easily index cells), back face (also flipped), right face
+        for rot in range(4):
+            for z in range(HEIGHT):
+                for a in range(DEPTH if rot%2 else WIDTH): # Swaps indexing of X and Y axes if rotation is odd
+                    depth = 0
+                    for b in range(WIDTH if rot%2 else DEPTH): # b's indexing is inverted if rot >= 2
+                        if self.grid[(a, b, a, WIDTH-b-1)[rot]][(b, a, DEPTH-b-1, a)[rot]][z] <= 0: # Index based on the order of faces listed above
+                            depth += 1
+                        else:
+                            break
+                    visible_depths[rot][z][a] = depth
+            for z in range(HEIGHT-1): # excluding topmost layer, done from bottom to top
+                for a in range(DEPTH if rot%2 else WIDTH):
+                    if visible_depths[rot][HEIGHT-z-1][a] < visible_depths[rot][HEIGHT-z-2][a]: # If the lower row has a lesser depth than the upper row...
+                        visible_depths[rot][HEIGHT-z-1][a] = visible_depths[rot][HEIGHT-z-2][a] - 1 # set the lower row to the upper row's value minus one, as it is visible that far from the top.
+        for z in range(HEIGHT-1): # topmost plane (z=0) cannot be secluded, thus z+1 will be used
+            for y in range(DEPTH):
+                for x in range(WIDTH):
+                    if self.grid[x][y][z+1] <= 0: # For every empty cube in the grid
+                        secluded_directions = 0
+                        for dir in range(4): # for each of the 4 directions - while this may be a lot of checks, for typical board sizes this takes less than 1ms on a typical system. Even on lower-end systems, this should not cause considerable lag compared to that of rendering.
+                            if visible_depths[dir][z+1][y if dir%2 else x] < (y, x, DEPTH-y-1, WIDTH-x-1)[dir]:
+                                secluded_directions += 1 # If the visible depth is less than the depth of the cube in a given direction, it is secluded in that direction.
+                        if secluded_directions >= 3:
+                            self.grid[x][y][z+1] = -1 # secluded spaces in the game grid have an ID of -1
+                            self.secluded_spaces += 1
+    def check_piece_elevation(self):
+        if self.current_piece["centers"][0][2] > self.lowest_center_elevation:
+            self.lowest_center_elevation = self.current_piece["centers"][0][2]
+            self.place_time = 0 # reset the time to place the piece if its center gets lowered beyond any previous depths
+    def lower_piece(self, piece, tick_modification=True, manual=False):
+        self.piece_spin_on_last_movement = False
+        for n in range(len(piece["cubes"])):
+            piece["cubes"][n][2] += 1 # lower the piece
+        for n in range(len(piece["centers"])):
+            piece["centers"][n][2] += 1 # lower the rotation center
+        if tick_modification:
+            if self.tick_time < self.tick_duration*0.75:
+                if self.current_piece["centers"][0][2] > self.lowest_center_elevation:
+                    self.increase_score(1) # increase score for manual lowering if enough time is saved (and it was not a previously reached depth this turn)
+            self.tick_time -= self.tick_duration
+            self.tick_time = max(self.tick_time, 0)
+        if manual:
+            self.play_sound("lower_piece", 100) # play the sound effect for manually lowering the piece
+        self.check_piece_elevation()
+    def place_piece(self, hard=False):
+        planes_cleared = 0
+        piece_id = self.current_piece["id"]
+        placed_cubes = [tuple(cube) for cube in self.current_piece["cubes"]] # before clearing planes lowers them
+        for n in range(len(self.current_piece["cubes"])):
+            cube = sorted(self.current_piece["cubes"], key = lambda cube: -cube[2])[n] # checks the bottom-most cubes first
+            if cube[2] >= 0:
+                self.grid[cube[0]][cube[1]][cube[2]] = self.current_piece["id"]
+            elif cube[2] >= -1:
+                planes_cleared += self.clear_planes()
+                for _ in range(planes_cleared):
+                    self.lower_piece(self.current_piece)
+                    cube = sorted(self.current_piece["cubes"], key = lambda cube: -cube[2])[n]
+                    self.grid[cube[0]][cube[1]][cube[2]] = self.current_piece["id"] # place the lowered piece
+                if planes_cleared == 0:
+                    self.mode = "Finished" # game over
+                    self.rotate_modifier = False # to initially show the game over screen animation
+            else:
+                self.mode = "Finished" # game over
+                self.rotate_modifier = False
+        planes_cleared += self.clear_planes()
+        spin = self.piece_spin_on_last_movement
+        if self.particles:
+            self.particles.piece_locked(placed_cubes, piece_id, hard)
+        self.get_new_piece()
+        self.refresh_tickspeed()
+        if self.stats: # only queues the writes, see StatsStore
+            self.stats.record_piece(self.stats_session, piece_id, self, planes_cleared, spin)
+            if self.mode == "Finished":
+                self.stats.end_session(self.stats_session, self)
+        if self.archive:
+            self.archive.record_piece(self, piece_id, placed_cubes, planes_cleared, spin)
+        if hard:
+            self.play_sound("place_hard", 300) # play the sound effect for hard dropping the piece
+        else:
+            self.play_sound("place_soft", 200) 
+    def score_multiplier_tick(self):
+        self.score_mult_buffer -= self.score_multiplier**PLACEMENT_LENIENCY_SCALE_EXPONENT * MULT_BUFFER_DRAIN_COEFFICIENT / FPS
+        if self.score_mult_buffer < 0:
+            self.score_multiplier += self.score_mult_buffer * MULT_DRAIN_COEFFICIENT * self.score_multiplier
+            self.score_mult_buffer = 0
+            self.score_multiplier = max(self.score_multiplier, 1)
+    def tick(self):
+        for n in range(len(self.key_hold_times)):
+            if self.key_hold_times[n] > 0:
+                self.key_hold_times[n] += 1
+            if self.key_hold_times[n] >= self.repeat_input_times[n]+self.repeat_input_delay:
+                self.key_hold_times[n] = int(self.key_hold_times[n] - self.repeat_input_times[n])
+                if not self.rotate_modifier:
+                    self.basic_input(n, repeat=True)
+                elif n != 6: # excludes holding down hard drop
+                    self.modified_input(n, repeat=True)
+        self.score_multiplier_tick()
+        if not self.piece_grounded(self.current_piece):
+            self.tick_time += 1
+        else:
+            self.place_time += 1
+        while (self.tick_time >= self.tick_duration) and not self.piece_grounded(self.current_piece):
+            self.lower_piece(self.current_piece)
+        if (self.place_time >= self.tick_duration + self.placement_leniency) and self.piece_grounded(self.current_piece):
+            self.place_piece()
+        if self.in_hard_drop == True:
+            self.drop_piece()
+        self.ease_grid_rotation()
+        self.publish_observation()
+    def ease_grid_rotation(self):
+        visual_grid_rot_offset = (self.visual_grid_rotation - self.grid_rotation + 2) % 4 - 2
+        if visual_grid_rot_offset >= 0:
+            visual_grid_rot_offset = max(((visual_grid_rot_offset**0.5)-VISUAL_GRID_ROT_EASING), 0)**2 # visual easing for grid rotation
+            self.visual_grid_rotation = self.grid_rotation + visual_grid_rot_offset
+        else:
+            visual_grid_rot_offset = max((((-visual_grid_rot_offset)**0.5)-VISUAL_GRID_ROT_EASING), 0)**2
+            self.visual_grid_rotation = self.grid_rotation - visual_grid_rot_offset
+    def game_over_screen_tick(self):
+        self.game_over_screen_time += 1/FPS
+    def check_for_collision(self, cube, x, y, z):
+        if (0 <= cube[0]+x <= WIDTH-1) and (0 <= cube[1]+y <= DEPTH-1) and (0 <= cube[2]+z <= HEIGHT-1):
+            return (self.grid[cube[0]+x][cube[1]+y][cube[2]+z] > 0)  # if colliding with a tile within the confines of the grid (preventing Python list wrap-around shenanigans)
+        else:
+            return not ((0 <= cube[0]+x <= WIDTH-1) and (0 <= cube[1]+y <= DEPTH-1) and (cube[2]+z <= HEIGHT-1)) # allowing the piece to be above the grid without being flagged as colliding
+    def piece_grounded(self, piece):
+        for n in range(len(piece["cubes"])):
+            cube = piece["cubes"][n]
+            if cube[2] >= HEIGHT-1: # bottom of grid (or lower as a failsafe)
+                return True
+            if self.check_for_collision(cube, 0, 0, 1): # above another piece, second check to prevent Python interpreting negative values as being from the end of the list
+                return True
+        return False
+    def piece_fully_grounded(self, piece):
+        grounded_cubes = 0
+        for n in range(len(piece["cubes"])):
+            cube = piece["cubes"][n]
+            if (cube[2] >= HEIGHT-1) or self.check_for_collision(cube, 0, 0, 1) or [piece["cubes"][n][0], piece["cubes"][n][1], piece["cubes"][n][2]+1] in piece["cubes"]: # additional case for there being a cube in the ghost piece above another
+                grounded_cubes += 1
+        return len(piece["cubes"]) == grounded_cubes
+    def piece_fits(self, cubes, lowest, highest, x, y, z):
+        """
+        Returns whether a piece's cubes, whose smallest and largest coordinates are lowest and highest, would be free and
+        within the grid (being above it is allowed) if moved by (x, y, z). Checks the bounds first, then stops at the
+        first colliding cube.
+        """
+        if not ((0 <= lowest[0]+x) and (highest[0]+x <= WIDTH-1) and (0 <= lowest[1]+y) and (highest[1]+y <= DEPTH-1) and (highest[2]+z <= HEIGHT-1)):
+            return False
+        grid = self.grid
+        for cube in cubes:
+            if cube[2]+z >= 0 and grid[cube[0]+x][cube[1]+y][cube[2]+z] > 0:
+                return False
+        return True
+    def piece_held_by_overhang(self, piece):
+        for n in range(len(piece["cubes"])):
+            cube = piece["cubes"][n]
+            if self.check_for_collision(cube, 0, 0, -1): # below another piece
+                return True
+        return False
+    def move_piece(self, piece, rot):
+        self.piece_spin_on_last_movement = False
+        x, y = [1, 0, -1, 0][(rot+self.grid_rotation)%4], [0, 1, 0, -1][(rot+self.grid_rotation)%4] # get the movement in each axis based on the input and current grid rotation
+        for n in range(len(piece["cubes"])):
+            cube = piece["cubes"][n]
+            if not (0 <= cube[0]+x <= WIDTH-1) or not (0 <= cube[1]+y <= DEPTH-1) or not (cube[2] <= HEIGHT-1): # if outside at least one of the boundaries
+                return False
+            if self.check_for_collision(cube, x, y, 0): # collisions with tiles in-bounds
+                return False
+        for n in range(len(piece["cubes"])):
+            piece["cubes"][n] = [piece["cubes"][n][axis] + [x, y, 0][axis] for axis in range(3)] # move the piece
+        for n in range(len(piece["centers"])):
+            piece["centers"][n] = [piece["centers"][n][axis] + [x, y, 0][axis] for axis in range(3)] # move all of the possible rotation centers
+        self.get_ghost_piece()
+        if self.piece_fully_grounded(self.ghost_piece):
+            self.play_sound("move_piece_gold", 300) # play the sound effect for moving the piece if it is fully grounded
+        else:
+            self.play_sound("move_piece", 200) # play the sound effect for moving the piece
+        return True
+    def force_move_piece(self, piece, x, y, z): # absolute positioning, no collision checking 
+        piece["cubes"] = [[cube[0]+x, cube[1]+y, cube[2]+z] for cube in piece["cubes"]] # move the piece
+        piece["centers"] = [[center[0]+x, center[1]+y, center[2]+z] for center in piece["centers"]] # move all of the possible rotation centers
+        self.check_piece_elevation()
+    def drop_piece(self, instant_placement=False):
+        while True:
+            if not self.piece_grounded(self.current_piece):
+                self.lower_piece(self.current_piece)
+            else:
+                if instant_placement:
+                    self.place_piece(hard=True)
+                return
+    def raise_piece_to_initial_center(self, modified_piece):
+        for n in range(int(max(modified_piece["centers"][0][2]-self.current_piece["centers"][0][2], 0))): # how much the center of the modified piece has moved down compared to the original, if any
+            cube_placements_found = 0
+            for n in range(len(modified_piece["cubes"])):
+                cube = modified_piece["cubes"][n]
+                if (self.check_for_collision(cube, 0, 0, -1), (0 <= cube[0] <= WIDTH-1), (0 <= cube[1] <= DEPTH-1), (cube[2]-1 <= HEIGHT-1)) == (False, True, True, True): # if the cube is able to be placed and is within bounds after moving upwards
+                    cube_placements_found += 1
+            if cube_placements_found == len(modified_piece["cubes"]):
+                self.force_move_piece(modified_piece, 0, 0, -1)
+            else:
+                return # no further checks given
+    def detect_spin(self, modified_piece):
+        spin_check_displacements = [(0, 0, -1), (0, 1, 0), (0, -1, 0), (1, 0, 0), (-1, 0, 0)] # The piece can only be movable downwards in its rotation to have a spin detected.
+        lowest, highest = get_piece_bounds(modified_piece["cubes"])
+        for relative_x, relative_y, relative_z in spin_check_displacements:
+            if self.piece_fits(modified_piece["cubes"], lowest, highest, relative_x, relative_y, relative_z):
+                return # the piece should not be movable in any of the given directions - otherwise, it is not considered a spin
+        if self.current_piece["centers"][0][2] > self.lowest_spin_elevation: # only if the spin as at a lower point than the last spin this turn (prevents repeated point gain)
+            self.lowest_spin_elevation = self.current_piece["centers"][0][2]
+            final_spin_displacement = sum((abs(self.current_piece["centers"][0][axis]-modified_piece["centers"][0][axis]) for axis in range(3)))
+            score_before_spin = self.score
+            self.increase_score(20+10*final_spin_displacement)
+            if self.particles:
+                self.particles.piece_spun(modified_piece["cubes"], modified_piece["centers"][0], modified_piece["id"], self.score-score_before_spin)
+            self.score_mult_bonus(0.14+0.07*final_spin_displacement)
+            self.piece_spin_on_last_movement = True
+            self.play_sound("piece_spin", 300) # play the sound effect for spinning the piece
+            self.total_spins += 1
+    def get_ghost_piece(self):
+        self.ghost_piece = copy_piece(self.current_piece)
+        lowest, highest = get_piece_bounds(self.ghost_piece["cubes"])
+        drop = 0
+        while self.piece_fits(self.ghost_piece["cubes"], lowest, highest, 0, 0, drop+1): # the piece is grounded where it can't move down any further
+            drop += 1
+        if drop:
+            self.force_move_piece(self.ghost_piece, 0, 0, drop)
+            self.piece_spin_on_last_movement = False # as lowering the ghost one plane at a time used to
+    def commit_piece_rotation(self, modified_piece):
+        self.raise_piece_to_initial_center(modified_piece)
+        self.detect_spin(modified_piece)
+        self.current_piece = modified_piece
+        self.get_ghost_piece()
+        if self.piece_fully_grounded(self.ghost_piece):
+            self.play_sound("rotate_piece_gold", 300) # play the sound effect for rotating the piece if it is fully grounded
+        else:
+            self.play_sound("rotate_piece", 200) # play the sound effect for rotating the piece
+    def rotate_piece(self, input):
+        self.piece_spin_on_last_movement = False
+        if input < 4:
+            input = (input + self.grid_rotation) % 4 # setting input to be relative to the grid's current rotation
+        axis, rot = [(1,-1),(0,-1),(1,1),(0,1),(2,1),(2,-1)][input] # axes of rotation and directions for each input
+        movable_axes = [0, 1, 2]
+        movable_axes.remove(axis)
+        if len(self.current_piece["centers"]) > 1: # for deciding which center a piece with an ambiguous center should rotate around
+            if self.current_piece["centers"][0][2] != self.current_piece["centers"][1][2]: # first priority check: whichever center point is lower
+                self.current_piece["centers"] = sorted(self.current_piece["centers"], key=lambda position: -position[2])
+            elif (input < 4): # second priority check: whichever center point is closest to the movement direction
+                self.current_piece["centers"] = sorted(self.current_piece["centers"], key=lambda position: position[input%2] * (-1 if input < 2 else 1))
+        rotated_piece = copy_piece(self.current_piece)
+        first_axis, second_axis = movable_axes
+        cos_rot, sin_rot = math.cos(rot*math.pi/2), math.sin(rot*math.pi/2)
+        center_a, center_b = rotated_piece["centers"][0][first_axis], rotated_piece["centers"][0][second_axis]
+        for position in rotated_piece["cubes"] + rotated_piece["centers"][1:]: # the alternate centers (index 1 onwards) turn with the cubes
+            a, b = position[first_axis]-center_a, position[second_axis]-center_b # relative to the axis on the two movable axes
+            position[first_axis], position[second_axis] = a*cos_rot+b*sin_rot+center_a, b*cos_rot-a*sin_rot+center_b # rotate around the axis and move back to its position
+        for cube in rotated_piece["cubes"]:
+            cube[first_axis], cube[second_axis] = round(cube[first_axis]), round(cube[second_axis]) # make sure the cubes' coordinates are integers (preventing floating point rounding errors)
+        lowest, highest = get_piece_bounds(rotated_piece["cubes"])
+        if not (lowest[0] >= 0 and lowest[1] >= 0 and highest[0] <= WIDTH-1 and highest[1] <= DEPTH-1): # only rotations past a wall need pushing back
+            for invert_coordinates, border, push_axis, movement in [(True, 0, 0, [1,0,0]), (True, 0, 1, [0,1,0]), (False, WIDTH-1, 0, [-1,0,0]), (False, DEPTH-1, 1, [0,-1,0])]: # puch the piece out of meach of the 4 boundaries - first two checks have to be greater than or equal to 0, so the coordinate is inverted
+                while True:
+                    for n in range(len(rotated_piece['cubes'])):
+                        pushed = False
+                        cube = rotated_piece['cubes'][n]
+                        if not (cube[push_axis] * (-1 if invert_coordinates else 1) <= border):
+                            pushed = True
+                            self.force_move_piece(rotated_piece, *movement)
+                    if not pushed:
+                        break
+            lowest, highest = get_piece_bounds(rotated_piece["cubes"])
+        coordinate_ranges = [highest[n]-lowest[n]+1 for n in range(3)] # how wide, deep, and tall the rotated piece is
+        rotated_cubes = rotated_piece["cubes"]
+        if not self.piece_held_by_overhang(self.current_piece): # special case for things such as t-spin triples
+            if rotated_piece["centers"][0][0]%1 == 0: # if the piece's last used center is at an integer location
+                rotated_piece["centers"][0] = [int(round(coordinate)) for coordinate in rotated_piece["centers"][0]] # to not make them randomly floats
+            for relative_z in (0, 1, -1): # correct downward first if initial position fails, then upward.
+                initial_horiz_displacements = [(0, 0)]
+                if (input < 4) and (relative_z > 0): # another special case for spinning pieces into the ground with a displacement parallel to the rotation direction
+                    initial_horiz_displacements += [(-rot, 0), (rot, 0)] if first_axis == 0 else [(0, -rot), (0, rot)]
+                for relative_x, relative_y in initial_horiz_displacements:
+                    if self.piece_fits(rotated_cubes, lowest, highest, relative_x, relative_y, relative_z):
+                        self.force_move_piece(rotated_piece, relative_x, relative_y, relative_z)
+                        self.commit_piece_rotation(rotated_piece)
+                        return
+        # if the piece needs to be moved, and has not already returned in a valid position
+        original_cubes_touched = None # all cubes the unrotated piece has touched, made once a candidate fits
+        fits_apart = False # whether the rotated piece fits somewhere it doesn't touch the unrotated one
+        kick_order = get_kick_order(coordinate_ranges, input if input < 4 else (self.grid_rotation+1)%4) # cw/ccw rotations always correct backwards relative to the camera
+        horizontal_kick_order = [(x, y) for x, y, _ in kick_order[:len(kick_order)//(2*coordinate_ranges[2]+1)] # the order repeats for every z, so only the
+                                 if -lowest[0] <= x <= WIDTH-1-highest[0] and -lowest[1] <= y <= DEPTH-1-highest[1]] # displacements keeping the piece in bounds are tried
+        for z in range(min(coordinate_ranges[2], HEIGHT-1-highest[2]), -coordinate_ranges[2]-1, -1):
+            for x, y in horizontal_kick_order:
+                if self.piece_fits(rotated_cubes, lowest, highest, x, y, z):
+                    if original_cubes_touched is None:
+                        original_cubes_touched = {(cube[0]+dx, cube[1]+dy, cube[2]+dz) for cube in self.current_piece["cubes"] for dx, dy, dz in [(0,0,0), (1,0,0), (0,1,0), (0,0,1), (-1,0,0), (0,-1,0), (0,0,-1)]} # the cubes and their adjacent neighbors
+                    if any((cube[0]+x, cube[1]+y, cube[2]+z) in original_cubes_touched for cube in rotated_cubes): # if the current piece is in contact with the rotated and translated piece
+                        self.force_move_piece(rotated_piece, x, y, z)
+                        self.commit_piece_rotation(rotated_piece)
+                        return
+                    fits_apart = True
+        if fits_apart: # moving the piece there was tried and undone. force_move_piece checked the current piece's elevation
+            self.check_piece_elevation() # while doing so, which can restart place_time, and blocked rotations still do that
+        self.play_sound("rotation_blocked", 400) # return statement cancels this
+    def basic_input(self, input, repeat=False):
+        if self.latency_tracer and input < 7:
+            self.latency_tracer.tag(BASIC_INPUT_TYPES[input], input, repeat, self.repeat_input_times[input]/FPS)
+        if self.archive and input < 7:
+            self.archive.record_input(GameEvent(input)) # basic inputs are numbered like the first GameEvents
+        match input:
+            case 0: # right
+                self.move_piece(self.current_piece, input)
+                self.key_hold_times[2] = 0 # prevent opposite directions from both being held
+            case 1: # up
+                self.move_piece(self.current_piece, input)
+                self.key_hold_times[3] = 0
+            case 2: # left
+                self.move_piece(self.current_piece, input)
+                self.key_hold_times[0] = 0
+            case 3: # down
+                self.move_piece(self.current_piece, input)
+                self.key_hold_times[1] = 0
+            case 4: # grid clockwise
+                self.grid_rotation = (self.grid_rotation+1)%4
+                self.key_hold_times[5] = 0
+            case 5: # grid counterclockwise
+                self.grid_rotation = (self.grid_rotation-1)%4
+                self.key_hold_times[4] = 0
+            case 6: # lower
+                if not self.piece_grounded(self.current_piece):
+                    self.lower_piece(self.current_piece, manual=True)
+                else:
+                    self.place_piece()
+        if (input < 7) and (repeat == False):
+            self.key_hold_times[input] = 1
+    def modified_input(self, input, repeat=False):
+        if self.latency_tracer and input < 7:
+            self.latency_tracer.tag(MODIFIED_INPUT_TYPES[input], input, repeat, (self.repeat_input_times[input]+self.repeat_input_delay)/FPS) # the hold time restarts below, so each repeat waits for the initial delay again
+        if self.archive and input < 7:
+            self.archive.record_input(GameEvent(GameEvent.ROTATE_PIECE_RIGHT.value + input)) # modified inputs are numbered like the GameEvents from ROTATE_PIECE_RIGHT
+        match input:
+            case 0: # rotate right
+                self.rotate_piece(input)
+                self.key_hold_times[2] = 0 # prevent opposite directions from both being held
+            case 1: # rotate up
+                self.rotate_piece(input)
+                self.key_hold_times[3] = 0
+            case 2: # rotate left
+                self.rotate_piece(input)
+                self.key_hold_times[0] = 0
+            case 3: # rotate down
+                self.rotate_piece(input)
+                self.key_hold_times[1] = 0
+            case 4: # rotate clockwise
+                self.rotate_piece(input)
+                self.key_hold_times[5] = 0
+            case 5: # rotate counterclockwise
+                self.rotate_piece(input)
+                self.key_hold_times[4] = 0
+            case 6: # drop
+                if not self.piece_grounded(self.current_piece):
+                    self.drop_piece()
+                    self.in_hard_drop = True
+                    self.play_sound("sonic_drop", 300) # play the sound effect for hard dropping the piece
+                else:
+                    self.place_piece(hard=True)
+        self.key_hold_times[input] = 1
+
+def toggle_pause_game(game):
+    if game.archive and game.mode in ("Playing", "Paused"):
+        game.archive.record_input(GameEvent.PAUSE_GAME)
+    match game.mode:
+        case "Playing":
+            game.mode = "Paused"
+        case "Paused":
+            if game.rotate_modifier == True:
+                game.mode = "Home" # exit game
+            else:
+                game.mode = "Playing"
+        case "Finished":
+            game.mode = "Home" # exit game
+
+def controller_input_check(controller, controller_button_states, controller_analog_states, game):
+    for button_id in controller_bindings:
+        input = controller_bindings.index(button_id)
+        if not controller.get_button(button_id) and controller_button_states[controller_bindings.index(button_id)]: # button release when it is currently held
+            match input:
+                case 7:
+                    game.rotate_modifier = False
+                    if game.mode == "Playing":
+                        if game.in_hard_drop: # only defined if the game has been initialized
+                            game.drop_piece(instant_placement=True) # fully drop upon releasing the modifier key
+                case 8:
+                    ... # hold piece, only action is on button down
+                case 9:
+                    ... # pause game, only action is on button down
+                case 10:
+                    game.key_hold_times[6] = 0
+                case _:
+                    game.key_hold_times[input] = 0
+            controller_button_states[input] = False
+        elif ((game.mode == "Playing") or (input in (7, 9)) or ((game.mode == "Finished") and (input in (4, 5)) and game.rotate_modifier == True)) and controller.get_button(button_id) and (not controller_button_states[controller_bindings.index(button_id)]): # only if button is pressed and not currently held
+            if game.rotate_modifier == False:
+                match input:
+                    case 7:
+                        game.rotate_modifier = True
+                    case 8:
+                        game.hold_piece()
+                    case 9:
+                        toggle_pause_game(game)
+                    case 10:
+                        game.basic_input(6)
+                    case _:
+                        game.basic_input(input)
+            else:
+                match input:
+                    case 7:
+                        game.rotate_modifier = True
+                    case 8:
+                        game.hold_piece()
+                    case 9:
+                        toggle_pause_game(game)
+                    case 10:
+                        game.modified_input(6)
+                    case _:
+                        if not ((game.mode == "Finished") and (input in (4, 5))):
+                            game.modified_input(input)
+                        else:
+                            game.basic_input(input) # for rotating the board when hiding the game over screen
+            controller_button_states[input] = True
+        if game.mode == "Home" and controller.get_button(button_id) and (not controller_button_states[controller_bindings.index(button_id)]): # home menu button presses
+            match input:
+                case 6:
+                    game.init_game()
+                case _:
+                    if input < 4:
+                        game.change_initial_level((1, -SELECTABLE_LEVEL_GRID_WIDTH, -1, SELECTABLE_LEVEL_GRID_WIDTH)[input])
+            controller_button_states[input] = True
+    for input, axis, dir in (0, 0, 1), (1, 1, -1), (2, 0, -1), (3, 1, 1), (4, 2, -1), (5, 2, 1), (8, 4, 1): # to do: add other controller support here. analog controls only for the first 6 inputs and the hold input currently
+        if controller.get_axis(axis) * dir < ANALOG_DEADZONE_WIDTH and controller_analog_states[input]: # button release when it is currently held
+            if input < 6:
+                game.key_hold_times[input] = 0
+            controller_analog_states[input] = False
+        elif ((game.mode == "Playing") or ((game.mode == "Finished") and (input in (4, 5)) and game.rotate_modifier == True)) and controller.get_axis(axis) * dir > ANALOG_DEADZONE_WIDTH and (not controller_analog_states[input]): # only if button is pressed and not currently held
+            if input < 6:
+                if game.rotate_modifier == False:
+                    game.basic_input(input)
+                else:
+                    if not ((game.mode == "Finished") and (input in (4, 5))):
+                        game.modified_input(input)
+                    else:
+                        game.basic_input(input) # for rotating the board when hiding the game over screen
+            else:
+                game.hold_piece()
+            controller_analog_states[input] = True
+        if game.mode == "Home" and controller.get_axis(axis) * dir > ANALOG_DEADZONE_WIDTH and (not controller_analog_states[input]): # home menu button presses
+            match input:
+                case 6:
+                    game.init_game()
+                case _:
+                    if input < 4:
+                        game.change_initial_level((1, -SELECTABLE_LEVEL_GRID_WIDTH, -1, SELECTABLE_LEVEL_GRID_WIDTH)[input])
+            controller_analog_states[input] = True
+
+def keyboard_input_check(event, game):
+    if event.type == KEYUP:
+        try:
+            input = hotkeys.index(event.dict["scancode"])
+            match input:
+                case 7:
+                    game.rotate_modifier = False
+                    if game.mode == "Playing":
+                        if game.in_hard_drop: # only defined if the game has been initialized
+                            game.drop_piece(instant_placement=True) # fully drop upon releasing the modifier key
+                case 8: # hold piece, only action is on KEYDOWN
+                    pass
+                case 9: # pause game, only action is on KEYDOWN
+                    pass
+                case _:
+                    game.key_hold_times[input] = 0
+        except ValueError:
+            pass
+    if event.type == KEYDOWN:
+        # print(event.dict["scancode"]) # debug for scancodes
+        try:
+            input = hotkeys.index(event.dict["scancode"])
+            match input:
+                case 7:
+                    game.rotate_modifier = True
+                case 8:
+                    if game.mode == "Playing":
+                        game.hold_piece()
+                case 9:
+                    toggle_pause_game(game)
+                case _:
+                    if game.mode == "Playing":
+                        if game.rotate_modifier == False:
+                            game.basic_input(input)
+                        else:
+                            game.modified_input(input)
+                    elif (game.mode == "Finished") and (input in (4, 5)) and game.rotate_modifier == True: # for inspecting the grid upon pressing the modifier key on the game over screen
+                        game.basic_input(input)
+                    elif game.mode == "Home": # start game
+                        match input:
+                            case 6:
+                                game.init_game()
+                            case _:
+                                if input < 4:
+                                    game.change_initial_level((1, -SELECTABLE_LEVEL_GRID_WIDTH, -1, SELECTABLE_LEVEL_GRID_WIDTH)[input])
+        except ValueError:
+            pass
+
+def global_tick(game):
+    if game.particles and game.mode in ("Playing", "Finished"):
+        game.particles.update(1/FPS)
+    match game.mode:
+        case "Playing":
+            game.tick()
+        case "Paused":
+            game.ease_grid_rotation() # to prevent the grid from being stuck at an improper angle when paused
+        case "Finished":
+            game.ease_grid_rotation()
+            game.game_over_screen_tick()
+
+def get_ui_color_id(game):
+    if game.mode == "Home":
+        return min(math.ceil(game.initial_level/STAGE_LENGTH), 9)
+    return min(math.ceil(game.level/STAGE_LENGTH), 9)
@@ -0,0 +1,109 @@
+import numpy as np
+
+from Qubitrix.engine import WIDTH, DEPTH, HEIGHT
+
+# Qubitrix - Board Features Module
+# Bots, tuning sweeps and analytics all judge boards by the same handful of metrics. This module computes them for a
+# whole stack of boards at once, so scoring every candidate placement of every environment is a few array operations
+# instead of a Python loop per board.
+#
+# Boards are given either as an (N, WIDTH, DEPTH, HEIGHT) array indexed like Game.grid (anything above 0 is a cube,
+# so Game's -1 secluded markers count as empty) or as (N, WIDTH, DEPTH) column bitmasks like VectorEnv.columns,
+# where bit z of a column is set if cell z of it holds a cube. As in Game, z = 0 is the top of the grid. Either way the
+# work is done on column bitmasks, so most steps are one integer operation per column rather than one per cell.
+
+NEAR_COMPLETE_GAP = 2 # planes missing at most this many cubes (but at least one) count as near complete
+BYTE_POPCOUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int32) # np.bitwise_count needs NumPy 2
+
+def feature_names(width=WIDTH, depth=DEPTH, height=HEIGHT):
+    """Returns the name of every column of the matrix extract_features() returns, in order."""
+    return ([f"height_{x}_{y}" for x in range(width) for y in range(depth)]
+            + ["max_height", "total_height", "holes", "secluded_spaces", "wells", "roughness", "near_complete_planes"]
+            + [f"plane_fill_{z}" for z in range(height)])
+
+def get_column_dtype(height):
+    """Returns the smallest unsigned integer type that holds a column of height cells as a bitmask."""
+    for bits in (8, 16, 32, 64):
+        if height <= bits:
+            return np.dtype(f"<u{bits//8}")
+    raise ValueError(f"Columns of {height} cells do not fit in a 64-bit bitmask")
+
+def pack_columns(occupancy):
+    """Returns (N, WIDTH, DEPTH) column bitmasks from an (N, WIDTH, DEPTH, HEIGHT) occupancy array."""
+    dtype = get_column_dtype(occupancy.shape[3])
+    packed = np.packbits(occupancy, axis=3, bitorder="little")
+    packed = np.pad(packed, ((0, 0), (0, 0), (0, 0), (0, dtype.itemsize-packed.shape[3])))
+    return np.ascontiguousarray(packed).view(dtype)[..., 0]
+
+def count_bits(columns):
+    """Returns how many bits are set in each of an array of unsigned integers, looking them up a byte at a time."""
+    columns = np.ascontiguousarray(columns)
+    return BYTE_POPCOUNTS[columns.view(np.uint8)].reshape(columns.shape + (columns.itemsize,)).sum(axis=-1, dtype=np.int32)
+
+def unpack_columns(columns, height=HEIGHT):
+    """Returns an (N, WIDTH, DEPTH, height) occupancy array from (N, WIDTH, DEPTH) column bitmasks."""
+    return ((columns[..., None].astype(np.uint64) >> np.arange(height, dtype=np.uint64)) & 1).astype(bool)
+
+def get_visible_cells(empty, axis, reverse, all_planes):
+    """
+    Returns bitmasks of the cells that are visible from one side of the grid, looking along an axis.
+    A cell is visible from a side if the cells in front of it in its plane are empty, or the cells in front of and
+    including it in the plane above are, since a row is visible as deep as one less than the row above it.
+    """
+    if reverse:
+        empty = np.flip(empty, axis=axis)
+    empty_through = np.bitwise_and.accumulate(empty, axis=axis)
+    empty_before = np.concatenate((np.full_like(np.take(empty_through, [0], axis=axis), all_planes), np.take(empty_through, range(empty.shape[axis]-1), axis=axis)), axis=axis)
+    visible = empty_before | (empty_through << 1) # shifting moves each plane's bits to the plane below it
+    return np.flip(visible, axis=axis) if reverse else visible
+
+def get_secluded_columns(columns, height=HEIGHT):
+    """
+    Returns bitmasks of the cells Game.get_secluded_spaces() would mark as secluded, from column bitmasks.
+
+    The rules are the same: from each of the 4 sides, a row of a plane is visible as deep as its first cube, and as deep
+    as one less than the same row of the plane above it. An empty cell below the top plane is secluded when it is
+    hidden from at least 3 of the 4 sides, i.e. visible from at most one.
+    """
+    all_planes = columns.dtype.type(2**height-1)
+    empty = ~columns & all_planes
+    front, left, back, right = (get_visible_cells(empty, axis, reverse, all_planes) for axis, reverse in ((2, False), (1, False), (2, True), (1, True)))
+    visible_twice = (front & (left | back | right)) | (left & (back | right)) | (back & right)
+    return empty & ~visible_twice & (all_planes - 1) # the topmost plane (bit 0) cannot be secluded
+
+def extract_features(boards, height=HEIGHT):
+    """
+    Returns an (N, F) int32 matrix of features for a stack of boards, with columns named by feature_names().
+    height is only used for column bitmasks, an occupancy array has its own. The features are:
+        height_x_y: the height of each column, counting from the bottom of the grid up to and including its top cube.
+        max_height, total_height: the highest column and the sum of all of them.
+        holes: empty cells below the top cube of their column.
+        secluded_spaces: the number of cells Game.get_secluded_spaces() marks on the board.
+        wells: how far every column is below the lowest of its 4 neighbours, summed. The walls count as full height.
+        roughness: the height differences between neighbouring columns, summed.
+        near_complete_planes: planes missing between 1 and NEAR_COMPLETE_GAP cubes.
+        plane_fill_z: how many cubes each plane holds.
+    """
+    boards = np.asarray(boards)
+    if boards.ndim == 3:
+        columns = boards
+    else:
+        columns, height = pack_columns(boards > 0), boards.shape[3]
+    count, width, depth = columns.shape
+    cubes = count_bits(columns)
+    lowest_cubes = columns & (~columns + 1) # the top cube of each column, as z = 0 is the top
+    heights = np.where(columns == 0, 0, height - count_bits(lowest_cubes - 1)).astype(np.int32)
+    holes = heights - cubes
+    padded = np.pad(heights, ((0, 0), (1, 1), (1, 1)), constant_values=height)
+    lowest_neighbours = np.minimum(np.minimum(padded[:, :-2, 1:-1], padded[:, 2:, 1:-1]), np.minimum(padded[:, 1:-1, :-2], padded[:, 1:-1, 2:]))
+    wells = np.maximum(lowest_neighbours - heights, 0)
+    roughness = np.abs(np.diff(heights, axis=1)).sum(axis=(1, 2)) + np.abs(np.diff(heights, axis=2)).sum(axis=(1, 2))
+    plane_fills = np.stack([((columns >> columns.dtype.type(z)) & 1).sum(axis=(1, 2), dtype=np.int32) for z in range(height)], axis=1)
+    missing = width*depth - plane_fills
+    near_complete = ((missing >= 1) & (missing <= NEAR_COMPLETE_GAP)).sum(axis=1)
+    secluded = count_bits(get_secluded_columns(columns, height)).sum(axis=(1, 2), dtype=np.int32)
+    return np.concatenate((
+        heights.reshape(count, -1),
+        np.stack((heights.max(axis=(1, 2)), heights.sum(axis=(1, 2)), holes.sum(axis=(1, 2)), secluded, wells.sum(axis=(1, 2)), roughness, near_complete), axis=1),
+        plane_fills,
+    ), axis=1).astype(np.int32)
@@ -0,0 +1,98 @@
+import random
+
+from Qubitrix.engine import Game, FPS, HEIGHT, PLANE_CLEAR_SCORE_BONUSES, SPIN_CLEAR_SCORE_FACTOR, global_tick, get_ui_color_id
+from Qubitrix.environments.placement_cache import NO_HOLD
+from Qubitrix.environments.solver import PLANE_SIZE, Solver, board_from_grid, clear_full_planes, cubes_from_mask, get_shaded
+
+# Qubitrix - Bot Module
+# A simple player for filling boards with live games, like on a spectator wall (see render.spectator_wall). It plays
+# a Game frame by frame like a person would see it: after thinking for a moment about each new piece it picks one of
+# the places the solver says the piece can be put, greedily, and drops the piece straight there. The game starts
+# again a few seconds after it ends.
+#
+# Placements are ranked by the plane clear points they earn, then by how few empty cells they leave under cubes,
+# then by how low the stack ends up. A bot given a PlacementCache (see environments.placement_cache) looks the best
+# placement up there first, and stores what it works out for other bots and later runs to find.
+
+DEFAULT_THINK_FRAMES = 20
+RESTART_FRAMES = 3*FPS
+
+def rank_placement(board, mask, spin):
+    """Returns how good a placement is, higher is better (see above)."""
+    next_board, planes_cleared = clear_full_planes(board | mask)
+    points = PLANE_CLEAR_SCORE_BONUSES[min(planes_cleared, 4)]*(SPIN_CLEAR_SCORE_FACTOR if spin else 1)
+    top = ((next_board & -next_board).bit_length()-1) // PLANE_SIZE if next_board else HEIGHT # the highest plane with a cube, z grows downwards
+    return points, -get_shaded(next_board).bit_count(), top
+
+class Bot:
+    """
+    Plays a Game by itself.
+
+    Attributes:
+        game: the Game being played.
+        think_frames: how many frames each piece waits at least before being placed. Each piece waits up to twice as
+            long, at random, so that bots started together don't all place their pieces on the same frame.
+        frames_waited: frames since the current piece appeared, or since the game ended.
+        cache: a PlacementCache shared with other bots, or None.
+    """
+    def __init__(self, initial_level=1, think_frames=DEFAULT_THINK_FRAMES, solver=None, cache=None, sounds=False):
+        self.game = Game(sounds) # silent by default, nobody listens to a board on a wall and it needs no audio device
+        self.game.initial_level = initial_level
+        self.game.observation = None # nothing reads it
+        self.think_frames = think_frames
+        self.thinking_random = random.Random(random.getrandbits(32)) # its own generator, so thinking doesn't change which pieces the game deals
+        self.think_time = think_frames
+        self.solver = solver or Solver(table_size=10_000, spins=False) # only get_placements is used
+        if cache and self.solver.spins:
+            raise ValueError("A placement cache can't be used with spins, mirrored pieces don't spin around mirrored centers")
+        self.cache = cache
+        self.frames_waited = 0
+        self.piece = None
+
+    def step(self):
+        """Plays one frame. Returns the UI color id main() would draw the frame with, like Replay.step()."""
+        ui_color_id = get_ui_color_id(self.game)
+        if self.game.mode != "Playing":
+            self.frames_waited += 1
+            if self.game.mode == "Home" or self.frames_waited >= RESTART_FRAMES:
+                self.game.init_game()
+                self.frames_waited = 0
+        elif self.game.current_piece is not self.piece: # a new piece
+            self.piece = self.game.current_piece
+            self.frames_waited = 0
+            self.think_time = self.think_frames + self.thinking_random.randrange(self.think_frames+1)
+        else:
+            self.frames_waited += 1
+            if self.frames_waited >= self.think_time:
+                self.place()
+        global_tick(self.game)
+        return ui_color_id
+
+    def place(self):
+        """Puts the current piece (or the held one, if it is better) in its best placement."""
+        board = board_from_grid(self.game.grid)
+        options = [(False, self.game.current_piece["id"])]
+        if not self.game.hold_piece_used:
+            options.append((True, (self.game.held_piece or self.game.next_pieces[0])["id"]))
+        pieces = (options[0][1], options[1][1] if len(options) > 1 else NO_HOLD)
+        best = self.cache.get(board, pieces) if self.cache else None
+        if best is None:
+            for hold, piece_id in options:
+                for mask, spin in self.solver.get_placements(board, piece_id):
+                    rank = rank_placement(board, mask, spin)
+                    if best is None or rank > best[0]:
+                        best = (rank, hold, mask)
+            if best is None: # nowhere to go, let gravity end the game
+                return
+            if self.cache:
+                self.cache.put(board, pieces, *best)
+        _, hold, mask = best
+        if hold:
+            self.game.hold_piece()
+        self.game.current_piece["cubes"] = cubes_from_mask(mask)
+        self.game.place_piece(hard=True)
+
+def make_bot(seed, **options):
+    """Returns a Bot whose game is dealt pieces from Python's random module seeded with seed."""
+    random.seed(seed)
+    return Bot(**options)
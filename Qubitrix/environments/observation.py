@@ -0,0 +1,77 @@
+import numpy as np
+
+# Qubitrix - Observation Export Module
+# Game stores its board as nested Python lists, which are slow for tools to walk every frame. Once per frame the game
+# publishes its state into one of two preallocated NumPy buffers here, and readers (bots, overlays, telemetry, possibly
+# on other threads) get read-only views of the most recently published buffer instead of touching Game's lists.
+#
+# The two buffers take turns: the game writes into the one readers were not given last, then makes it the published
+# one. Each buffer carries a sequence number that is odd while it is being written, so a reader that held on to a
+# buffer for longer than a frame can tell whether it was overwritten underneath it (a "seqlock").
+
+class Observation:
+    """
+    Read-only views of one published frame.
+
+    Attributes:
+        frame: the number of the frame these views were published on.
+        grid: piece ids of the settled cubes, shape (WIDTH, DEPTH, HEIGHT), indexed [x][y][z] like Game.grid.
+        secluded: True for the empty cells marked as secluded spaces.
+        current_piece, ghost_piece, held_piece: cube positions, shape (cubes, 3). held_piece is only meaningful if held_piece_id > 0.
+        current_piece_id, held_piece_id: piece ids, 0 when there is no piece.
+        next_pieces: ids of the upcoming pieces, nearest first.
+    """
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._sequence = buffer.sequence
+        self.frame = self._sequence // 2
+        for name in ObservationBuffer.ARRAYS:
+            view = getattr(buffer, name).view()
+            view.flags.writeable = False
+            setattr(self, name, view)
+        self.current_piece_id, self.held_piece_id = (int(piece_id) for piece_id in buffer.piece_ids)
+
+    def is_valid(self):
+        """Returns whether the game has not started overwriting these views since they were taken."""
+        return self._sequence % 2 == 0 and self._buffer.sequence == self._sequence
+
+class ObservationBuffer:
+    """Double-buffered NumPy copy of a game's observable state, published once per frame by Game.publish_observation()."""
+    ARRAYS = ("grid", "secluded", "current_piece", "ghost_piece", "held_piece", "next_pieces")
+
+    class _Frame:
+        def __init__(self, width, depth, height, cube_count, next_piece_count):
+            self.sequence = 0 # twice the frame number, plus one while being written
+            self.grid = np.zeros((width, depth, height), dtype=np.int8)
+            self.secluded = np.zeros((width, depth, height), dtype=bool)
+            self.current_piece = np.zeros((cube_count, 3), dtype=np.int16)
+            self.ghost_piece = np.zeros((cube_count, 3), dtype=np.int16)
+            self.held_piece = np.zeros((cube_count, 3), dtype=np.int16)
+            self.next_pieces = np.zeros(next_piece_count, dtype=np.int8)
+            self.piece_ids = np.zeros(2, dtype=np.int8) # current, held
+
+    def __init__(self, width, depth, height, cube_count, next_piece_count):
+        self.frame = 0
+        self._frames = [self._Frame(width, depth, height, cube_count, next_piece_count) for _ in range(2)]
+        self._published = self._frames[0]
+
+    def publish(self, game):
+        """Copies the game's state into the unpublished buffer and publishes it as the next frame."""
+        frame = self._frames[1] if self._published is self._frames[0] else self._frames[0]
+        frame.sequence = 2*(self.frame+1) - 1 # odd: being written
+        np.copyto(frame.grid, game.grid)
+        np.less(frame.grid, 0, out=frame.secluded)
+        np.maximum(frame.grid, 0, out=frame.grid)
+        frame.current_piece[:] = game.current_piece["cubes"]
+        frame.ghost_piece[:] = game.ghost_piece["cubes"]
+        if game.held_piece:
+            frame.held_piece[:] = game.held_piece["cubes"]
+        frame.piece_ids[:] = game.current_piece["id"], game.held_piece.get("id", 0)
+        frame.next_pieces[:] = [piece["id"] for piece in game.next_pieces[:len(frame.next_pieces)]]
+        self.frame += 1
+        frame.sequence = 2*self.frame
+        self._published = frame
+
+    def latest(self):
+        """Returns views of the most recently published frame. Check is_valid() after reading them if they were read on another thread."""
+        return Observation(self._published)
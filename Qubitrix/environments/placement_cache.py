@@ -0,0 +1,158 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from Qubitrix import engine
+from Qubitrix.engine import RULES_VERSION, WIDTH, DEPTH, HEIGHT
+from Qubitrix.environments.board_features import get_column_dtype
+from Qubitrix.environments.solver import PLANE_SIZE, cubes_from_mask, get_columns
+from Qubitrix.environments.symmetry import canonicalize, get_symmetries
+
+# Qubitrix - Placement Cache Module
+# Bots in long runs and tuning sweeps keep meeting positions they have already worked out, often turned or mirrored
+# (see environments.symmetry). A placement cache remembers the best placement found for each position, with how good
+# it was, in a file that any number of processes can map into memory and share, so a position worked out once by one
+# of them is never worked out again by any of them.
+#
+# A position is a board and a few piece ids (a bot's current piece and the one the hold would give it), and is stored
+# in its canonical form: its column bitmasks and piece ids after the symmetry that makes them smallest, with the
+# placement's cubes turned the same way. Looking a position up turns the stored cubes back.
+#
+# The file starts with HEADER (magic bytes, format version, RULES_VERSION, board size, piece ids per position, cubes
+# per piece, a checksum of the piece set and the number of slots), followed by a fixed number of slots holding one
+# get_record_dtype() record each, so it never grows. A position's key picks a bucket of BUCKET_SLOTS slots; when the
+# bucket is full, the key also picks which of its positions is replaced. Processes write their records straight into the shared mapping without locking, and
+# every record carries a checksum, so a record caught half written (or written by two processes at once) is a miss,
+# never a wrong answer.
+
+MAGIC = b"QBXP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHBBBBB3xIQ") # magic, format version, rules version, width, depth, height, pieces per position, cubes per piece, piece set checksum, slots
+DEFAULT_SLOTS = 2**18 # about 19 MB with the default board
+BUCKET_SLOTS = 4
+NO_HOLD = 0 # the piece id of a position where the hold can't be used
+
+def get_record_dtype(width, depth, height, piece_count, cube_count):
+    return np.dtype([("key", "<u8"), ("columns", get_column_dtype(height), (width*depth,)), ("pieces", "u1", (piece_count,)), ("hold", "u1"),
+                     ("cubes", "i1", (cube_count, 3)), ("evaluation", "<i4", (3,)), ("check", "<u4")])
+
+def get_piece_set_checksum(pieces=None):
+    """Returns a checksum of the cubes of every piece in a piece set, so a cache isn't shared between piece sets."""
+    return zlib.crc32(json.dumps([(piece["id"], piece["cubes"]) for piece in pieces or engine.PIECES]).encode())
+
+class PlacementCache:
+    """
+    A file of the best placements found for positions, mapped into memory. See above.
+
+    Attributes:
+        records: the record slots, a NumPy array backed by the mapped file. Empty slots have a key of 0.
+        symmetries: the environments.symmetry.Symmetry list positions are canonicalized with.
+        hits, misses, stores: lookups that found a placement, lookups that didn't, and placements stored, by this process.
+    """
+    def __init__(self, path, piece_count=2, slots=DEFAULT_SLOTS):
+        """Opens the cache at path, creating it with room for slots positions of piece_count pieces if it doesn't exist yet."""
+        self.path = path
+        cube_count = max(len(piece["cubes"]) for piece in engine.PIECES)
+        settings = (RULES_VERSION, WIDTH, DEPTH, HEIGHT, piece_count, cube_count, get_piece_set_checksum())
+        if not os.path.exists(path):
+            self.create(path, settings, slots)
+        with open(path, "r+b") as file:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size or header[:4] != MAGIC:
+                raise ValueError(f"{path} is not a placement cache")
+            fields = HEADER.unpack(header)
+            if fields[1] != VERSION:
+                raise ValueError(f"Unsupported placement cache version {fields[1]}")
+            if fields[2:9] != settings:
+                raise ValueError(f"{path} holds positions of other rules, another board size or another piece set")
+            self.map = mmap.mmap(file.fileno(), 0) # shared, so other processes see what this one writes
+        self.dtype = get_record_dtype(WIDTH, DEPTH, HEIGHT, piece_count, cube_count)
+        self.records = np.frombuffer(self.map, self.dtype, fields[9], HEADER.size)
+        self.buckets = len(self.records) // BUCKET_SLOTS
+        self.symmetries = get_symmetries()
+        self.last = (None, None) # the last position canonicalized, and the result
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def create(path, settings, slots):
+        """Writes an empty cache next to path and moves it into place, unless another process got there first."""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, *settings, slots))
+            file.truncate(HEADER.size + slots*get_record_dtype(*settings[1:6]).itemsize)
+        try:
+            os.link(temporary, path) # fails if the cache exists, unlike a rename
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporary)
+
+    def canonicalize(self, board, pieces):
+        """Returns the canonical (columns, pieces, symmetry) of a position, and its key. A put() after a get() of the same position reuses them."""
+        if self.last[0] != (board, pieces):
+            columns, canonical_pieces, symmetry = canonicalize(get_columns(board), pieces, self.symmetries)
+            key = int.from_bytes(hashlib.blake2b(np.array(columns + canonical_pieces, np.uint64).tobytes(), digest_size=8).digest(), "little") or 1
+            self.last = ((board, pieces), (columns, canonical_pieces, symmetry, key))
+        return self.last[1]
+
+    def get_check(self, record):
+        return zlib.crc32(record.tobytes()[:-4])
+
+    def get(self, board, pieces):
+        """
+        Returns (evaluation, hold, mask) stored for a bitboard and piece ids, with mask (the placement's bitboard) turned
+        to match the board, or None if the position isn't in the cache.
+        """
+        columns, canonical_pieces, symmetry, key = self.canonicalize(board, pieces)
+        bucket = key % self.buckets * BUCKET_SLOTS
+        for record in self.records[bucket:bucket+BUCKET_SLOTS]:
+            record = record.copy() # another process may be writing it
+            if (record["key"] == key and tuple(record["columns"].tolist()) == columns and tuple(record["pieces"].tolist()) == canonical_pieces
+                    and record["check"] == self.get_check(record)):
+                self.hits += 1
+                mask = 0
+                for x, y, z in record["cubes"].tolist():
+                    mask |= 1 << z*PLANE_SIZE + symmetry.columns[x*DEPTH + y]
+                return tuple(record["evaluation"].tolist()), bool(record["hold"]), mask
+        self.misses += 1
+        return None
+
+    def put(self, board, pieces, evaluation, hold, mask):
+        """Stores the best placement found for a bitboard and piece ids: its evaluation (3 ints), whether it holds first, and its bitboard."""
+        columns, canonical_pieces, symmetry, key = self.canonicalize(board, pieces)
+        bucket = key % self.buckets * BUCKET_SLOTS
+        keys = self.records["key"][bucket:bucket+BUCKET_SLOTS].tolist()
+        slot = keys.index(key) if key in keys else keys.index(0) if 0 in keys else (key >> 32) % BUCKET_SLOTS
+        record = np.zeros((), self.dtype)
+        record["key"], record["columns"], record["pieces"], record["hold"], record["evaluation"] = key, columns, canonical_pieces, hold, evaluation
+        record["cubes"] = [(turned // DEPTH, turned % DEPTH, z) for turned, z in
+                           ((symmetry.to_turned[x*DEPTH + y], z) for x, y, z in cubes_from_mask(mask))]
+        record["check"] = self.get_check(record)
+        self.records[bucket+slot] = record
+        self.stores += 1
+
+    def describe(self):
+        """Returns lines of text about how often the cache is hit, for the debug overlay."""
+        lookups = self.hits + self.misses
+        return [f"Placement cache: {self.hits}/{lookups} hits ({self.hits/max(lookups, 1):.0%}), {self.stores} stored"]
+
+    def close(self):
+        """Unmaps the file, unless arrays taken from records are still in use; those keep it mapped until they are freed."""
+        self.records = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
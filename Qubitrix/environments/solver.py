@@ -0,0 +1,666 @@
+import random
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from Qubitrix import engine
+from Qubitrix.engine import WIDTH, DEPTH, HEIGHT, NEXT_PIECE_COUNT, PLANE_CLEAR_SCORE_BONUSES, SPIN_CLEAR_SCORE_FACTOR
+from Qubitrix.environments.vector_env import get_rotation_matrices
+
+# Qubitrix - Solver Module
+# Searches the sequence of pieces a player can see (the current piece, the held piece and the next pieces) for the
+# placements that clear the board completely, or that score the most for plane clears. It powers puzzles and analysis.
+#
+# Boards are Python integers used as bitboards: bit z*WIDTH*DEPTH + x*DEPTH + y is set when Game.grid[x][y][z] holds
+# a cube, so each plane is a run of WIDTH*DEPTH bits, moving a piece is a shift, and clearing a plane is cutting its
+# bits out of the integer. A piece can be put anywhere it can be dropped to from above, slid to along the surface it
+# lands on (tucked under overhangs), or spun into with a quarter turn around its center, in place or kicked by one
+# cell. A spin counts when the piece then can't move up or sideways, which is the rule Game.detect_spin uses.
+#
+# The search is a depth-first search. States (board, pieces still to come, held piece, whether the hold can be used)
+# are hashed with Zobrist keys into a transposition table of bounded size, which evicts the least recently used entry
+# when full, so the same board reached by placing pieces in another order is only searched once. A Solver is made for
+# the piece set in use when it is created (see engine.use_piece_set), and its keys cover queues of any length.
+#
+# The best score search is a branch and bound search: a placement is only searched further if the points it scores,
+# plus the most the pieces after it could conceivably score (get_score_bound), beat the best line found so far.
+# Placements that clear planes are tried first, and the last placement of a line is scored without searching on.
+
+PLANE_SIZE = WIDTH*DEPTH
+PLANE = (1 << PLANE_SIZE) - 1
+ALL_CELLS = (1 << PLANE_SIZE*HEIGHT) - 1
+DEFAULT_TIME_LIMIT = 0.1 # in seconds
+DEFAULT_TABLE_SIZE = 200_000 # entries
+KICKS = ((0, 0, 0), (0, 0, 1), (0, 0, -1)) # in place, then one cell down and one cell up, like Game tries first
+SPIN_CHECKS = ((0, 0, -1), (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1)) # a spun piece must not be able to move up, sideways or down
+QUARTER_TURNS = (np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]]), np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]]), np.array([[0, 0, 1], [0, 1, 0], [-1, 0, 0]])) # around X, Z and Y
+
+def get_cell_mask(predicate):
+    """Returns a bitboard of the cells (x, y, z) for which predicate is true."""
+    return sum(1 << z*PLANE_SIZE + x*DEPTH + y for x in range(WIDTH) for y in range(DEPTH) for z in range(HEIGHT) if predicate(x, y, z))
+
+NOT_LAST_X = get_cell_mask(lambda x, y, z: x < WIDTH-1)
+NOT_FIRST_X = get_cell_mask(lambda x, y, z: x > 0)
+NOT_LAST_Y = get_cell_mask(lambda x, y, z: y < DEPTH-1)
+NOT_FIRST_Y = get_cell_mask(lambda x, y, z: y > 0)
+PLANE_STARTS = get_cell_mask(lambda x, y, z: x == y == 0) # the first bit of every plane
+PLANE_SHIFTS = [z*PLANE_SIZE for z in range(HEIGHT)]
+BELOW_GRID = PLANE << HEIGHT*PLANE_SIZE # the plane under the bottom one, which pieces rest on
+
+zobrist_random = random.Random(0x51ED) # its own generator, so the keys don't depend on (or disturb) the game's
+ZOBRIST_CELLS = [zobrist_random.getrandbits(64) for _ in range(PLANE_SIZE*HEIGHT)]
+ZOBRIST_HEIGHTS = [zobrist_random.getrandbits(64) for _ in range(HEIGHT+1)]
+ZOBRIST_HOLD_AVAILABLE = zobrist_random.getrandbits(64)
+
+def board_from_grid(grid):
+    """Returns the bitboard of a grid indexed like Game.grid. Secluded space markers count as empty."""
+    return sum(1 << z*PLANE_SIZE + x*DEPTH + y for x in range(WIDTH) for y in range(DEPTH) for z in range(HEIGHT) if grid[x][y][z] > 0)
+
+def cubes_from_mask(mask):
+    """Returns the [x, y, z] cubes of a bitboard."""
+    cubes = []
+    while mask:
+        bit = (mask & -mask).bit_length()-1
+        cubes.append([bit % PLANE_SIZE // DEPTH, bit % DEPTH, bit // PLANE_SIZE])
+        mask &= mask-1
+    return cubes
+
+def get_columns(board):
+    """Returns a bitmask for every column (at x*DEPTH + y) of a bitboard, with bit z set if the column has a cube at z."""
+    columns = [0]*PLANE_SIZE
+    while board:
+        bit = (board & -board).bit_length()-1
+        columns[bit % PLANE_SIZE] |= 1 << bit // PLANE_SIZE
+        board &= board-1
+    return columns
+
+def get_bottom_planes(height):
+    """Returns the bitboard of every cell in the bottom height planes."""
+    return ALL_CELLS >> (HEIGHT-height)*PLANE_SIZE << (HEIGHT-height)*PLANE_SIZE
+
+def get_below_cubes(board):
+    """Returns the cells of a bitboard that have a cube somewhere above them, empty or not."""
+    below = board << PLANE_SIZE
+    for planes in (1, 2, 4, 8, 16, 32):
+        if planes >= HEIGHT:
+            break
+        below |= below << planes*PLANE_SIZE
+    return below & ALL_CELLS
+
+def get_shaded(board):
+    """Returns the empty cells of a bitboard that have a cube somewhere above them."""
+    return get_below_cubes(board) & ~board
+
+def get_column_tops(board, below=None):
+    """Returns the z of the highest cube of every column (at x*DEPTH + y) of a bitboard, HEIGHT if it is empty."""
+    tops = [HEIGHT]*PLANE_SIZE
+    highest = board & ~(get_below_cubes(board) if below is None else below)
+    while highest:
+        bit = (highest & -highest).bit_length()-1
+        tops[bit % PLANE_SIZE] = bit // PLANE_SIZE
+        highest &= highest-1
+    return tops
+
+def get_floor(column, z):
+    """Returns the z of the first cube below z in a column bitmask, or HEIGHT if there is none."""
+    below = column >> z+1
+    return z+1 + (below & -below).bit_length()-1 if below else HEIGHT
+
+def get_zobrist_key(board):
+    key = 0
+    while board:
+        key ^= ZOBRIST_CELLS[(board & -board).bit_length()-1]
+        board &= board-1
+    return key
+
+def get_full_planes(board):
+    """Returns the first bit of every full plane of a bitboard, found by ANDing each bit with the bits after it in its plane."""
+    full, span = board, 1
+    while span < PLANE_SIZE:
+        step = min(span, PLANE_SIZE-span)
+        full &= full >> step # bit n of full is now set if bits n to n+span+step-1 of the board all are
+        span += step
+    return full & PLANE_STARTS
+
+def clear_full_planes(board):
+    """Removes the full planes of a bitboard, moving the planes above them down like Game.clear_planes. Returns (board, planes cleared)."""
+    if not get_full_planes(board):
+        return board, 0
+    planes_cleared = 0
+    for z in range(HEIGHT):
+        if (board >> z*PLANE_SIZE) & PLANE == PLANE:
+            below = board >> (z+1)*PLANE_SIZE << (z+1)*PLANE_SIZE
+            above = board & ((1 << z*PLANE_SIZE)-1)
+            board = below | (above << PLANE_SIZE)
+            planes_cleared += 1
+    return board, planes_cleared
+
+def flood_fill(seed, region):
+    """Returns the cells of region connected to seed through their faces."""
+    filled = seed
+    while True:
+        grown = (filled | ((filled & NOT_LAST_Y) << 1) | ((filled & NOT_FIRST_Y) >> 1) | ((filled & NOT_LAST_X) << DEPTH) | ((filled & NOT_FIRST_X) >> DEPTH)
+                 | (filled << PLANE_SIZE) | (filled >> PLANE_SIZE)) & region
+        if grown == filled:
+            return filled
+        filled = grown
+
+class PieceShape:
+    """
+    Every orientation of a piece, with what the quarter turns around its center turn each one into.
+
+    Attributes:
+        masks: the bitboard of each orientation with its lowest x, y and z at 0.
+        extents: how far each orientation reaches past that corner along each axis.
+        centers: twice the position of the center relative to that corner, so that half cell centers are integers.
+        cubes: the (x, y, z) offsets of each orientation's cubes from that corner.
+        twins: for each orientation, the orientations with the same cubes (around a different center).
+        turns: for each orientation, the orientation each of the 6 quarter turns gives.
+        turned_from: for each orientation, the (orientation, turn) pairs that give it.
+    """
+    def __init__(self, piece):
+        center = np.array(piece["centers"][0])
+        offsets = (np.array(piece["cubes"]) - center)*2 # doubled, relative to the center
+        self.masks, self.extents, self.centers, self.cubes, keys = [], [], [], [], []
+        matrix_orientations = []
+        for matrix in get_rotation_matrices():
+            rotated = offsets @ matrix.T
+            key = tuple(sorted(map(tuple, rotated.tolist())))
+            if key not in keys:
+                keys.append(key)
+                corner = rotated.min(axis=0)
+                cubes = (rotated - corner)//2
+                self.masks.append(sum(1 << int(z)*PLANE_SIZE + int(x)*DEPTH + int(y) for x, y, z in cubes))
+                self.extents.append(tuple(int(n) for n in cubes.max(axis=0)))
+                self.centers.append(tuple(int(n) for n in -corner))
+                self.cubes.append([tuple(int(n) for n in cube) for cube in cubes])
+            matrix_orientations.append((matrix, keys.index(key)))
+        self.twins = [[other for other in range(len(self.masks)) if self.masks[other] == self.masks[orientation]] for orientation in range(len(self.masks))]
+        self.drop_profiles = [] # (orientation, x, y, [mask at each z]) for every distinct shape and footprint
+        profiles = [] # [(column, how far below the corner the column's lowest cube is + 1), ...] for each of them
+        for orientation in range(len(self.masks)):
+            if self.twins[orientation][0] == orientation:
+                bottoms = {}
+                for dx, dy, dz in self.cubes[orientation]:
+                    bottoms[dx, dy] = max(bottoms.get((dx, dy), 0), dz+1)
+                for x in range(WIDTH-self.extents[orientation][0]):
+                    for y in range(DEPTH-self.extents[orientation][1]):
+                        self.drop_profiles.append((orientation, x, y, [self.masks[orientation] << z*PLANE_SIZE + x*DEPTH + y for z in range(HEIGHT-self.extents[orientation][2])]))
+                        profiles.append([((x+dx)*DEPTH+y+dy, bottom) for (dx, dy), bottom in bottoms.items()])
+        columns = max(len(profile) for profile in profiles)
+        profiles = np.array([profile + profile[-1:]*(columns-len(profile)) for profile in profiles]) # padded by repeating a column
+        self.drop_columns, self.drop_bottoms = profiles[:, :, 0].T.copy(), profiles[:, :, 1].T.copy() # [footprint column][profile], so a board's column tops give every drop at once
+        self.spin_candidates = {} # get_spin_candidates' results, built for each cell the first time a spin into it is looked for or by Solver
+        self.covering_masks = {} # get_covering_masks' results, for the few cells the solver asks about: the empty cells of nearly full planes
+        self.turns = [[] for _ in self.masks]
+        self.turned_from = [[] for _ in self.masks]
+        for matrix, orientation in matrix_orientations:
+            if len(self.turns[orientation]) == 0:
+                for turn in QUARTER_TURNS:
+                    for direction in (turn, turn.T): # the transpose is the opposite turn
+                        rotated = offsets @ (direction @ matrix).T
+                        self.turns[orientation].append(keys.index(tuple(sorted(map(tuple, rotated.tolist())))))
+                        self.turned_from[self.turns[orientation][-1]].append((orientation, len(self.turns[orientation])-1))
+
+    def fits(self, board, orientation, x, y, z):
+        """Returns the piece's bitboard at a position, or 0 if it is outside the grid or overlaps a cube."""
+        extent = self.extents[orientation]
+        if x < 0 or y < 0 or z < 0 or x+extent[0] >= WIDTH or y+extent[1] >= DEPTH or z+extent[2] >= HEIGHT:
+            return 0
+        mask = self.masks[orientation] << z*PLANE_SIZE + x*DEPTH + y
+        return 0 if mask & board else mask
+
+    def can_move(self, board, orientation, x, y, z):
+        """Returns whether the piece can be at a position, which unlike fits() includes being partly above the grid."""
+        if z >= 0:
+            return bool(self.fits(board, orientation, x, y, z))
+        extent = self.extents[orientation]
+        return x >= 0 and y >= 0 and x+extent[0] < WIDTH and y+extent[1] < DEPTH and not (self.masks[orientation] >> -z*PLANE_SIZE << x*DEPTH + y) & board
+
+    def get_placements(self, board, tucks=True, spins=True, region=ALL_CELLS):
+        """Returns {mask: spin} for every resting position of the piece that can be reached on a board and lies within region."""
+        below = get_below_cubes(board)
+        tops = np.array(get_column_tops(board, below))
+        drop_z = tops[self.drop_columns[0]] - self.drop_bottoms[0] # how far each footprint drops from above the grid
+        for columns, bottoms in zip(self.drop_columns[1:], self.drop_bottoms[1:]):
+            drop_z = np.minimum(drop_z, tops[columns] - bottoms)
+        drop_z = drop_z.tolist()
+        shaded = below & ~board
+        covered = (board << PLANE_SIZE) & ~board & region # empty cells with a cube right above them
+        if not (shaded and tucks or covered and spins): # every placement is a drop, the positions are not needed
+            return {mask: False for mask in (self.drop_profiles[n][3][drop_z[n]] for n in np.flatnonzero(np.array(drop_z) >= 0).tolist()) if not mask & ~region}
+        resting = {}
+        for (orientation, x, y, masks), z in zip(self.drop_profiles, drop_z):
+            if z >= 0:
+                resting[orientation, x, y, z] = masks[z]
+        if shaded and tucks: # a piece slid somewhere with nothing above it could have been dropped there, so only slides under overhangs are new
+            columns = get_columns(board)
+            to_slide = list(resting)
+            while to_slide:
+                orientation, x, y, z = position = to_slide.pop()
+                mask = resting[position]
+                if not (((mask & NOT_LAST_X) << DEPTH) | ((mask & NOT_FIRST_X) >> DEPTH) | ((mask & NOT_LAST_Y) << 1) | ((mask & NOT_FIRST_Y) >> 1)) & shaded:
+                    continue # no overhang to slide under next to it
+                for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                    if self.fits(board, orientation, x+dx, y+dy, z) & shaded:
+                        dropped = (orientation, x+dx, y+dy, min(get_floor(columns[(x+dx+cx)*DEPTH+y+dy+cy], z+cz)-1-cz for cx, cy, cz in self.cubes[orientation]))
+                        if dropped not in resting:
+                            resting[dropped] = self.masks[orientation] << dropped[3]*PLANE_SIZE + (x+dx)*DEPTH + y+dy
+                            to_slide.append(dropped)
+        placements = {mask: False for mask in resting.values() if not mask & ~region}
+        if covered and spins: # a spun piece can't move up, so it has a cube right above it
+            resting_twins = None
+            candidates = set()
+            while covered:
+                cell = covered & -covered
+                candidates.update(self.get_spin_candidates(cell.bit_length()-1))
+                covered ^= cell
+            for _, orientation, x, y, z, mask, moved in sorted(candidates): # in the order of the orientations, then z, x and y
+                if (not mask & board and not mask & ~region and mask not in placements
+                        and all(moved_mask is None or moved_mask & board for moved_mask in moved)): # it can't move up, sideways or down
+                    if resting_twins is None:
+                        resting_twins = {(twin, x, y, z) for orientation, x, y, z in resting for twin in self.twins[orientation]}
+                    if self.can_spin_into(board, resting_twins, orientation, x, y, z):
+                        placements[mask] = True
+        return placements
+
+    def get_spin_candidates(self, cell):
+        """
+        Returns (sort key, orientation, x, y, z, mask, moved masks) for every position in the grid where the piece covers a
+        cell. The moved masks are what can_move() checks for each of SPIN_CHECKS: the moved piece's cubes in the grid, or
+        None if it would be outside the grid's sides or bottom.
+        """
+        candidates = self.spin_candidates.get(cell)
+        if candidates is None:
+            candidates = []
+            cx, cy, cz = cell % PLANE_SIZE // DEPTH, cell % DEPTH, cell // PLANE_SIZE
+            for orientation, cubes in enumerate(self.cubes):
+                if self.twins[orientation][0] != orientation:
+                    continue
+                extent = self.extents[orientation]
+                for dx, dy, dz in cubes:
+                    x, y, z = cx-dx, cy-dy, cz-dz
+                    mask = self.fits(0, orientation, x, y, z)
+                    if mask:
+                        moved = []
+                        for mx, my, mz in SPIN_CHECKS:
+                            nx, ny, nz = x+mx, y+my, z+mz
+                            if nx < 0 or ny < 0 or nx+extent[0] >= WIDTH or ny+extent[1] >= DEPTH or nz+extent[2] >= HEIGHT:
+                                moved.append(None)
+                            elif nz >= 0:
+                                moved.append(self.masks[orientation] << nz*PLANE_SIZE + nx*DEPTH + ny)
+                            else:
+                                moved.append(self.masks[orientation] >> -nz*PLANE_SIZE << nx*DEPTH + ny) # partly above the grid
+                        candidates.append(((orientation, z, x, y), orientation, x, y, z, mask, tuple(moved)))
+            self.spin_candidates[cell] = candidates
+        return candidates
+
+    def get_covering_masks(self, cells):
+        """Returns the bitboards of the positions in the grid where the piece covers every cell of a bitboard."""
+        masks = self.covering_masks.get(cells)
+        if masks is None:
+            anchor = (cells & -cells).bit_length()-1
+            x, y, z = anchor % PLANE_SIZE // DEPTH, anchor % DEPTH, anchor // PLANE_SIZE
+            masks = {self.fits(0, orientation, x-cx, y-cy, z-cz) for orientation, cubes in enumerate(self.cubes) if self.twins[orientation][0] == orientation
+                     for cx, cy, cz in cubes}
+            masks = self.covering_masks[cells] = [mask for mask in masks if mask and not cells & ~mask]
+        return masks
+
+    def can_spin_into(self, board, resting, orientation, x, y, z):
+        """Returns whether a quarter turn of the piece from one of the resting positions puts it at a position."""
+        for target in self.twins[orientation]:
+            center = (2*x+self.centers[target][0], 2*y+self.centers[target][1], 2*z+self.centers[target][2])
+            for source, turn in self.turned_from[target]:
+                for kick, (kx, ky, kz) in enumerate(KICKS):
+                    corner = [(center[axis]-2*(kx, ky, kz)[axis]-self.centers[source][axis])//2 for axis in range(3)]
+                    if (source, *corner) in resting:
+                        turned_corner = [(center[axis]-2*(kx, ky, kz)[axis]-self.centers[target][axis])//2 for axis in range(3)]
+                        if not any(self.fits(board, target, turned_corner[0]+ex, turned_corner[1]+ey, turned_corner[2]+ez) for ex, ey, ez in KICKS[:kick]): # the turn would have stopped at an earlier kick
+                            return True
+        return False
+
+piece_shapes = {} # the PieceShape of every piece solvers were made for, keyed by its cubes and centers, so solvers of the same piece set share them
+
+def get_piece_shape(piece):
+    key = (str(piece["cubes"]), str(piece["centers"]))
+    if key not in piece_shapes:
+        piece_shapes[key] = PieceShape(piece)
+    return piece_shapes[key]
+
+class TranspositionTable:
+    """A bounded map from Zobrist keys to search results that evicts the least recently used entry when it is full."""
+    def __init__(self, capacity=DEFAULT_TABLE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, board):
+        """Returns the result stored for a key, or None. The board is checked too, so key collisions are misses."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != board:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, board, result):
+        self.entries[key] = (board, result)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+class Solution:
+    """
+    The result of a search.
+
+    Attributes:
+        placements: the moves found, in order, as (piece id, whether the hold was used, [[x, y, z], ...] cubes, spin).
+            Best score searches leave out the moves after the last one that can still score.
+        score: the plane clear points they earn, before the score multiplier.
+        planes_cleared: how many planes they clear.
+        complete: whether the search finished. If it ran out of time, the solution is the best one found so far.
+        nodes: how many states were searched.
+        horizon: for best score searches, how many placements ahead the solution is the best for. If the search ran
+            out of time, this is less than the pieces (and the held piece) allow.
+
+    A Solution is true if it has placements, so a perfect clear search that ran out of time is as false as one that
+    found there is no clear, and complete tells them apart.
+    """
+    def __init__(self, placements, score, planes_cleared, complete, nodes, horizon=0):
+        self.placements = placements
+        self.score = score
+        self.planes_cleared = planes_cleared
+        self.complete = complete
+        self.nodes = nodes
+        self.horizon = horizon
+
+    def __bool__(self):
+        return bool(self.placements)
+
+class OutOfTime(Exception):
+    pass
+
+class Solver:
+    """
+    Searches piece sequences for perfect clears and for the best scoring placements.
+
+    The pieces are the current piece followed by the next pieces. The hold can be used once per piece, swapping the
+    piece for the held one (or for the piece after it, if nothing is held), as in Game.
+
+    Attributes:
+        shapes: the PieceShape of every piece id of the piece set the solver was made for.
+        cube_count: how many cubes each of those pieces has.
+    """
+    def __init__(self, table_size=DEFAULT_TABLE_SIZE, tucks=True, spins=True, pieces=None):
+        self.table = TranspositionTable(table_size)
+        self.placement_cache = TranspositionTable(table_size)
+        self.tucks = tucks
+        self.spins = spins
+        pieces = pieces or engine.PIECES
+        self.shapes = {piece["id"]: get_piece_shape(piece) for piece in pieces}
+        if spins:
+            for shape in self.shapes.values(): # built once per shape here rather than out of the first search's time
+                for cell in range(PLANE_SIZE*HEIGHT):
+                    shape.get_spin_candidates(cell)
+        self.cube_count = len(pieces[0]["cubes"])
+        self.zobrist_held = [zobrist_random.getrandbits(64) for _ in range(max(self.shapes)+1)]
+        self.zobrist_queue = [] # [place in the queue][piece id], grown to the longest queue searched
+        self.zobrist_depths = [] # [placements left to search]
+
+    @staticmethod
+    def from_game(game):
+        """Returns the (board, pieces, held piece, whether the hold can be used) arguments describing a Game in progress."""
+        pieces = [game.current_piece["id"]] + [piece["id"] for piece in game.next_pieces[:NEXT_PIECE_COUNT]]
+        return board_from_grid(game.grid), pieces, game.held_piece.get("id", 0), not game.hold_piece_used
+
+    def prepare_search(self, pieces, held, time_limit):
+        """Checks the pieces of a search are in the solver's piece set, makes sure there are keys for them and starts the clock."""
+        unknown = [piece_id for piece_id in pieces + ([held] if held else []) if piece_id not in self.shapes]
+        if unknown:
+            raise ValueError(f"Unknown piece ids {unknown}, the solver was made for a piece set with ids {min(self.shapes)} to {max(self.shapes)}")
+        while len(self.zobrist_queue) < len(pieces)+2:
+            self.zobrist_queue.append([zobrist_random.getrandbits(64) for _ in self.zobrist_held])
+            self.zobrist_depths.append(zobrist_random.getrandbits(64))
+        self.deadline = time.perf_counter() + time_limit
+        self.nodes = 0
+
+    def get_placements(self, board, piece_id, height=HEIGHT):
+        """Returns [(mask, spin), ...] for the places a piece can be put on a board, keeping to the bottom height planes."""
+        if piece_id not in self.shapes:
+            raise ValueError(f"Unknown piece id {piece_id}, the solver was made for a piece set with ids {min(self.shapes)} to {max(self.shapes)}")
+        key = get_zobrist_key(board) ^ self.zobrist_held[piece_id] ^ ZOBRIST_HEIGHTS[height]
+        placements = self.placement_cache.get(key, board)
+        if placements is None:
+            placements = list(self.shapes[piece_id].get_placements(board, self.tucks, self.spins, get_bottom_planes(height)).items())
+            self.placement_cache.put(key, board, placements)
+        return placements
+
+    def get_moves(self, pieces, position, held, can_hold):
+        """Returns (piece id, hold used, next position, next held piece) for each way of playing the next piece."""
+        moves = []
+        if position < len(pieces):
+            moves.append((pieces[position], False, position+1, held))
+        if can_hold and held and held != (pieces[position] if position < len(pieces) else 0):
+            moves.append((held, True, position+1, pieces[position] if position < len(pieces) else 0))
+        elif can_hold and not held and position+1 < len(pieces):
+            moves.append((pieces[position+1], True, position+2, pieces[position]))
+        return moves
+
+    def get_state_key(self, board_key, pieces, position, held, can_hold):
+        """
+        Returns the Zobrist key of a search state. The pieces still to come are part of it rather than the position in the
+        sequence, so results stay valid for the next search once the game has moved on by a piece.
+        """
+        key = board_key ^ self.zobrist_held[held] ^ (ZOBRIST_HOLD_AVAILABLE if can_hold else 0)
+        for n, piece_id in enumerate(pieces[position:]):
+            key ^= self.zobrist_queue[n][piece_id]
+        return key
+
+    def check_time(self):
+        """Raises OutOfTime once the time limit of the search has run out. Checked before every piece's placements are found and every placement is searched."""
+        if time.perf_counter() > self.deadline:
+            raise OutOfTime
+
+    def solve_perfect_clear(self, board, pieces, held=0, can_hold=True, time_limit=DEFAULT_TIME_LIMIT):
+        """
+        Finds the shortest sequence of placements that leaves the board empty. Always returns a Solution, which is
+        true only if a perfect clear was found: its placements are the clear if there is one, and there are none if
+        there is no clear (complete is True) or the time limit ran out first (complete is False).
+
+        A perfect clear fills every plane up to some height and nothing above it, so the search is repeated for each
+        height, lowest first. That fixes how many pieces the clear takes, keeps every placement below that height, and
+        means every enclosed empty region below it has to be a multiple of a piece's size to ever be filled.
+        """
+        self.prepare_search(pieces, held, time_limit)
+        filled = board.bit_count()
+        lowest_height = HEIGHT - (((board & -board).bit_length()-1) // PLANE_SIZE) if board else 1
+        try:
+            for height in range(lowest_height, HEIGHT+1):
+                cells_to_fill = height*PLANE_SIZE - filled
+                if cells_to_fill % self.cube_count:
+                    continue
+                if cells_to_fill // self.cube_count > len(pieces) + (1 if held else 0):
+                    break
+                placements = self.search_perfect_clear(board, get_zobrist_key(board), pieces, 0, held, can_hold, height, cells_to_fill // self.cube_count)
+                if placements is not None:
+                    return self.make_solution(placements, True)
+        except OutOfTime:
+            return Solution([], 0, 0, False, self.nodes)
+        return Solution([], 0, 0, True, self.nodes)
+
+    def search_perfect_clear(self, board, key, pieces, position, held, can_hold, height, pieces_left):
+        """Returns the placements that fill the bottom height planes exactly with pieces_left pieces, or None."""
+        self.nodes += 1
+        state_key = self.get_state_key(key, pieces, position, held, can_hold) ^ ZOBRIST_HEIGHTS[height]
+        stored = self.table.get(state_key, board)
+        if stored is not None:
+            return stored or None # an empty list means there is no solution from here
+        result = None
+        for piece_id, hold, next_position, next_held in self.get_moves(pieces, position, held, can_hold):
+            self.check_time()
+            for mask, spin in self.get_placements(board, piece_id, height):
+                next_board, planes_cleared = clear_full_planes(board | mask)
+                move = (piece_id, hold, mask, spin, planes_cleared)
+                if next_board == 0:
+                    result = [move]
+                    break
+                if pieces_left == 1 or not self.regions_fillable(next_board, height-planes_cleared):
+                    continue
+                next_key = key ^ get_zobrist_key(mask) if planes_cleared == 0 else get_zobrist_key(next_board)
+                rest = self.search_perfect_clear(next_board, next_key, pieces, next_position, next_held, True, height-planes_cleared, pieces_left-1)
+                if rest is not None:
+                    result = [move] + rest
+                    break
+            if result is not None:
+                break
+        self.table.put(state_key, board, result or [])
+        return result
+
+    def regions_fillable(self, board, height):
+        """Returns whether every enclosed empty region in the bottom height planes could be filled by whole pieces."""
+        empty = ~board & get_bottom_planes(height)
+        while empty:
+            region = flood_fill(empty & -empty, empty)
+            if region.bit_count() % self.cube_count:
+                return False
+            empty &= ~region
+        return True
+
+    def solve_best_score(self, board, pieces, held=0, can_hold=True, time_limit=DEFAULT_TIME_LIMIT):
+        """
+        Finds the placements of the pieces that score the most points for plane clears (PLANE_CLEAR_SCORE_BONUSES,
+        times SPIN_CLEAR_SCORE_FACTOR for spin clears), searching one more placement ahead each time the previous search
+        finishes. Each search only looks for lines that beat the one before. If the time limit runs out, the best
+        solution of the deepest finished search is returned, with complete set to False and its horizon telling how far
+        ahead it looked: the placements are only the best ones that many placements ahead. The time limit holds for
+        every search, so if it runs out before the search one placement ahead finishes, there are no placements and the
+        horizon is 0.
+        """
+        self.prepare_search(pieces, held, time_limit)
+        key = get_zobrist_key(board)
+        placements_left = len(pieces) + (1 if held else 0)
+        best = Solution([], 0, 0, False, 0)
+        try:
+            for depth in range(1, placements_left+1):
+                score, placements = self.search_best_score(board, key, pieces, 0, held, can_hold, depth, best.score if best.placements else -1)
+                if score > best.score or not best.placements:
+                    best = self.make_solution(placements, False)
+                best.horizon = depth
+            best.complete = True
+        except OutOfTime:
+            pass
+        best.nodes = self.nodes
+        return best
+
+    def search_best_score(self, board, key, pieces, position, held, can_hold, depth, alpha):
+        """
+        Returns (score, placements) for the best way of playing the rest of the pieces in up to depth placements, if it
+        scores more than alpha. Otherwise the score is only an upper bound no more than alpha, with no placements, as the
+        placements that can't beat alpha are not searched.
+        """
+        self.nodes += 1
+        moves = self.get_moves(pieces, position, held, can_hold)
+        if not moves:
+            return 0, []
+        placements_left = min(depth, len(pieces)-position + (1 if held else 0))
+        finishing = None
+        if placements_left == 1 and alpha >= 0: # only the placements that finish a plane can beat alpha, which is quicker to look at than the table
+            finishing = self.get_finishing_masks(board, [move[0] for move in moves])
+            if not finishing:
+                return 0, []
+        else:
+            bound = self.get_score_bound(board, placements_left)
+            if bound <= alpha or (bound == 0 and position > 0): # nothing scores, any way of playing on is the best one
+                return bound, []
+            state_key = self.get_state_key(key, pieces, position, held, can_hold) ^ self.zobrist_depths[depth]
+            stored = self.table.get(state_key, board)
+            if stored is not None and (stored[2] or stored[0] <= alpha):
+                return stored[:2]
+        children = []
+        for piece_id, hold, next_position, next_held in moves:
+            self.check_time()
+            if finishing is None:
+                placements = self.get_placements(board, piece_id)
+            else:
+                placements = self.get_finishing_placements(board, piece_id, finishing.get(piece_id, ()))
+            for mask, spin in placements:
+                next_board, planes_cleared = clear_full_planes(board | mask)
+                points = PLANE_CLEAR_SCORE_BONUSES[min(planes_cleared, 4)]*(SPIN_CLEAR_SCORE_FACTOR if spin else 1)
+                children.append((points, mask.bit_length(), piece_id, hold, mask, spin, planes_cleared, next_board, next_position, next_held))
+        children.sort(reverse=True, key=lambda child: child[:2]) # clears first, then the lowest placements
+        result = (0, []) if not children else (-1, [])
+        most_points_after = self.get_clear_score_bound((placements_left-1)*self.cube_count) # every cube finishing a plane
+        for points, _, piece_id, hold, mask, spin, planes_cleared, next_board, next_position, next_held in children:
+            self.check_time()
+            threshold = max(alpha, result[0])
+            if points + most_points_after <= threshold:
+                break # the children are sorted by points, so none of the rest can beat the best line either
+            bound = self.get_score_bound(next_board, placements_left-1) if placements_left > 1 else 0
+            if points + bound <= threshold:
+                continue
+            score, rest = 0, []
+            if bound:
+                next_key = key ^ get_zobrist_key(mask) if planes_cleared == 0 else get_zobrist_key(next_board)
+                score, rest = self.search_best_score(next_board, next_key, pieces, next_position, next_held, True, depth-1, threshold-points)
+            if points + score > threshold:
+                result = (points + score, [(piece_id, hold, mask, spin, planes_cleared)] + rest)
+        exact = result[0] > alpha
+        if not exact:
+            result = (alpha, [])
+        if finishing is None:
+            self.table.put(state_key, board, (*result, exact))
+        return result
+
+    def get_finishing_masks(self, board, piece_ids):
+        """Returns {piece id: masks} of the positions where each piece fits and fills the empty cells of a plane, for the pieces that have any."""
+        finishing = {}
+        for z in range(HEIGHT):
+            empty = ~(board >> z*PLANE_SIZE) & PLANE
+            if 0 < empty.bit_count() <= self.cube_count:
+                for piece_id in piece_ids:
+                    masks = [mask for mask in self.shapes[piece_id].get_covering_masks(empty << z*PLANE_SIZE) if not mask & board]
+                    if masks:
+                        finishing.setdefault(piece_id, set()).update(masks)
+        return finishing
+
+    def get_finishing_placements(self, board, piece_id, masks):
+        """
+        Returns [(mask, spin), ...] for the masks that are placements of a piece on a board. Every placement is only
+        found if some mask can't simply be dropped into, as one with nothing above it that rests on a cube or the floor can.
+        """
+        shaded = get_shaded(board)
+        dropped = [(mask, False) for mask in masks if not mask & shaded and (mask << PLANE_SIZE) & (board | BELOW_GRID)]
+        if len(dropped) == len(masks):
+            return dropped
+        placements = dict(self.get_placements(board, piece_id))
+        return [(mask, placements[mask]) for mask in masks if mask in placements]
+
+    def get_score_bound(self, board, placements):
+        """
+        Returns the most points that placements pieces could score on a board: as many as if their cubes went exactly
+        where the fullest planes are missing cubes.
+        """
+        cubes = placements*self.cube_count
+        planes = 0
+        missing = [PLANE_SIZE - ((board >> shift) & PLANE).bit_count() for shift in PLANE_SHIFTS]
+        if min(missing) <= cubes:
+            for missing in sorted(missing):
+                if missing > cubes:
+                    break
+                cubes -= missing
+                planes += 1
+        return self.get_clear_score_bound(planes + cubes // PLANE_SIZE) # and the rest filling the empty planes coming down after clears
+
+    def get_clear_score_bound(self, planes):
+        """Returns the most points clearing some planes can score: cleared 4 at a time, which scores the most, by spins if spins are on."""
+        return (PLANE_CLEAR_SCORE_BONUSES[4]*(planes // 4) + PLANE_CLEAR_SCORE_BONUSES[planes % 4])*(SPIN_CLEAR_SCORE_FACTOR if self.spins else 1)
+
+    def make_solution(self, placements, complete):
+        moves = [(piece_id, hold, cubes_from_mask(mask), spin) for piece_id, hold, mask, spin, _ in placements]
+        score = sum(PLANE_CLEAR_SCORE_BONUSES[min(planes, 4)]*(SPIN_CLEAR_SCORE_FACTOR if spin else 1) for _, _, _, spin, planes in placements)
+        return Solution(moves, score, sum(planes for *_, planes in placements), complete, self.nodes)
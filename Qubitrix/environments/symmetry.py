@@ -0,0 +1,83 @@
+from Qubitrix import engine
+from Qubitrix.engine import WIDTH, DEPTH
+from Qubitrix.pieces.polycubes import get_orientations
+
+# Qubitrix - Board Symmetry Module
+# Turning the grid never changes what can happen on it (Game.grid_rotation only changes which way the inputs move the
+# piece), so a board, the same board turned a quarter turn and the same board seen in a mirror all have the same
+# placements, and the same best one. On the default 4x4 footprint that makes up to 8 versions of every position. In a
+# mirror a piece becomes its mirror image, which for the chiral pieces 7 and 8 is the other one of the pair.
+#
+# The symmetries only move columns around, so they work on the column bitmasks of solver.get_columns() (bit z of a
+# column is set when it has a cube at z) and a board turns or flips by reordering them. canonicalize() picks the
+# smallest of the versions of a position, so every one of them is stored and looked up as the same position (see
+# environments.placement_cache).
+
+class Symmetry:
+    """
+    A turn or mirror image of the grid's footprint.
+
+    Attributes:
+        columns: for each column of the turned board (at x*depth + y), which column of the original board it shows.
+        to_turned: the reverse, for each column of the original board, where the turn moves it.
+        pieces: for each piece id (0 being no piece), which piece it becomes. Only mirror images change pieces.
+        mirrored: whether it is a mirror image.
+    """
+    def __init__(self, move, mirrored, pieces, width, depth):
+        """move(x, y) returns where the symmetry moves the column at (x, y)."""
+        self.to_turned = [0]*(width*depth)
+        self.columns = [0]*(width*depth)
+        for x in range(width):
+            for y in range(depth):
+                turned_x, turned_y = move(x, y)
+                self.to_turned[x*depth + y] = turned_x*depth + turned_y
+                self.columns[turned_x*depth + turned_y] = x*depth + y
+        self.mirrored = mirrored
+        self.pieces = pieces
+
+    def turn(self, columns, pieces):
+        """Returns the column bitmasks and the piece ids of a position as this symmetry shows them, as tuples."""
+        return tuple(columns[column] for column in self.columns), tuple(self.pieces[piece_id] for piece_id in pieces)
+
+def get_mirror_pieces(pieces=None):
+    """
+    Returns a list mapping each piece id (and 0) to the id of its mirror image, or None if the mirror image of some piece
+    isn't in the piece set, in which case mirrored boards aren't equivalent.
+    """
+    pieces = pieces or engine.PIECES
+    shapes = {min(get_orientations(piece["cubes"])): piece["id"] for piece in pieces}
+    mirrors = [0]*(max(shapes.values())+1)
+    for piece in pieces:
+        mirror = shapes.get(min(get_orientations([(-x, y, z) for x, y, z in piece["cubes"]])))
+        if mirror is None:
+            return None
+        mirrors[piece["id"]] = mirror
+    return mirrors
+
+def get_symmetries(pieces=None, width=WIDTH, depth=DEPTH, mirrors=True):
+    """
+    Returns every Symmetry of a board, the identity first: the 4 quarter turns of a square footprint (just the half turn
+    of another), and as many mirror images if mirrors is set and every piece's mirror image is in the piece set.
+    """
+    mirror_pieces = get_mirror_pieces(pieces) if mirrors else None
+    identity = list(range(max(piece["id"] for piece in pieces or engine.PIECES)+1))
+    moves = [lambda x, y: (x, y), lambda x, y: (width-1-x, depth-1-y)]
+    if width == depth:
+        moves += [lambda x, y: (depth-1-y, x), lambda x, y: (y, width-1-x)]
+    symmetries = [Symmetry(move, False, identity, width, depth) for move in moves]
+    if mirror_pieces:
+        symmetries += [Symmetry(lambda x, y, move=move: move(width-1-x, y), True, mirror_pieces, width, depth) for move in moves]
+    return symmetries
+
+def canonicalize(columns, pieces, symmetries):
+    """
+    Returns (columns, pieces, symmetry) for the smallest version of a position under symmetries: its column bitmasks,
+    its piece ids (such as the current piece and the one the hold gives) and the Symmetry that turns the position into
+    it. Every version of the same position gets the same columns and pieces.
+    """
+    best = None
+    for symmetry in symmetries:
+        turned = symmetry.turn(columns, pieces)
+        if best is None or turned < best[:2]:
+            best = (*turned, symmetry)
+    return best
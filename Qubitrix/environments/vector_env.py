@@ -0,0 +1,620 @@
+import functools
+import math
+
+import numpy as np
+
+from Qubitrix.engine import (WIDTH, DEPTH, HEIGHT, PIECES, NEXT_PIECE_COUNT, PLANE_CLEAR_SCORE_BONUSES, PLANE_CLEAR_MULT_BONUSES,
+                             SPIN_CLEAR_SCORE_FACTOR, SPIN_CLEAR_MULT_FACTOR, MULT_BUFFER_SIZE, get_level_requirement, get_kick_order)
+from Qubitrix.controllers.abstract_controller import GameEvent
+from Qubitrix.environments.board_features import extract_features
+from Qubitrix.pieces.polycubes import get_rotation_matrices
+
+# Qubitrix - Vectorized Environment Module
+# This module steps many boards at once for training agents. Every board is a slice of a handful of NumPy arrays
+# instead of its own Game object, so one call to step() advances all of them with a few array operations.
+#
+# One step places one piece: the action picks whether to hold first, which orientation to use and where to put
+# the piece's footprint, and the piece is then sonic dropped and placed the same way Game does it when the player
+# rotates and moves the piece above the stack and hard drops it. An action can also turn the dropped piece once
+# before placing it, which is how pieces get spun into gaps under overhangs. step_events() instead applies one
+# GameEvent per board, like a player pressing keys. Both follow Game's rules exactly, spins, kicks and points
+# included. Per-frame timers (gravity, placement leniency and the multiplier drain) are not simulated, as no frames
+# pass between steps.
+
+LEVEL_TABLE_SIZE = 4096 # levels beyond this are unreachable in practice
+MAX_ORIENTATIONS = 24 # the number of rotations of a cube
+PLACEMENTS = MAX_ORIENTATIONS * WIDTH * DEPTH # placement indices per piece, unused ones are masked out
+TURNS = 7 # no turn, then the 6 rotation inputs of Game.rotate_piece
+ACTIONS = TURNS * 2 * PLACEMENTS
+QUEUE_CAPACITY = NEXT_PIECE_COUNT + 2*(len(PIECES)+1) # room for the visible queue plus two bags
+
+def get_orientation_matrices(cubes):
+    """Returns the rotation matrices giving every distinct orientation of a piece, starting with the identity."""
+    matrices = []
+    seen = set()
+    for matrix in get_rotation_matrices():
+        rotated = np.array(cubes) @ matrix.T
+        rotated -= rotated.min(axis=0)
+        key = tuple(sorted(map(tuple, rotated.tolist())))
+        if key not in seen:
+            seen.add(key)
+            matrices.append(matrix)
+    return matrices
+
+def get_orientations(cubes):
+    """
+    Returns every distinct orientation of a piece as a list of cube offsets with the smallest offset on each axis at 0.
+    The first orientation is always the one the piece spawns in, and the cube order of the original piece is kept.
+    """
+    orientations = []
+    for matrix in get_orientation_matrices(cubes):
+        rotated = np.array(cubes) @ matrix.T
+        orientations.append(rotated - rotated.min(axis=0))
+    return orientations
+
+def compile_placements(pieces=PIECES, width=WIDTH, depth=DEPTH):
+    """
+    Builds the placement tables used by VectorEnv, indexed by piece id (0 is unused) and placement index.
+    A placement index is orientation*width*depth + x*depth + y, where (x, y) is the corner of the piece's footprint.
+
+    Returns:
+        cells: the cubes of every placement before dropping, shape (len(pieces)+1, placements, cubes, 3).
+            Each placement starts with its lowest cube as high as the lowest cube of the spawned piece.
+        legal: whether each placement fits inside the grid, shape (len(pieces)+1, placements).
+        spawn_placements: the placement matching where each piece spawns, used in place of illegal actions.
+        centers: the rotation centers of every placement, turned and moved with the cubes. Pieces with fewer centers
+            than others repeat their last one, shape (len(pieces)+1, placements, max centers, 3).
+    """
+    placements = MAX_ORIENTATIONS * width * depth
+    cube_count = len(pieces[0]["cubes"])
+    center_count = max(len(piece["centers"]) for piece in pieces)
+    cells = np.zeros((len(pieces)+1, placements, cube_count, 3), dtype=np.int64)
+    legal = np.zeros((len(pieces)+1, placements), dtype=bool)
+    spawn_placements = np.zeros(len(pieces)+1, dtype=np.int64)
+    centers = np.zeros((len(pieces)+1, placements, center_count, 3))
+    for piece in pieces:
+        spawn_cubes = np.array(piece["cubes"])
+        spawn_centers = np.array(piece["centers"] + piece["centers"][-1:]*(center_count-len(piece["centers"])), dtype=float)
+        spawn_bottom = spawn_cubes[:, 2].max()
+        for orientation, matrix in enumerate(get_orientation_matrices(piece["cubes"])):
+            rotated = spawn_cubes @ matrix.T
+            offsets = rotated - rotated.min(axis=0)
+            center_offsets = spawn_centers @ matrix.T - rotated.min(axis=0)
+            extent = offsets.max(axis=0)
+            for x in range(width - extent[0]):
+                for y in range(depth - extent[1]):
+                    placement = orientation*width*depth + x*depth + y
+                    cells[piece["id"], placement] = offsets + (x, y, spawn_bottom - extent[2])
+                    centers[piece["id"], placement] = center_offsets + (x, y, spawn_bottom - extent[2])
+                    legal[piece["id"], placement] = True
+        spawn_placements[piece["id"]] = spawn_cubes[:, 0].min()*depth + spawn_cubes[:, 1].min() # orientation 0
+    return cells, legal, spawn_placements, centers
+
+PLACEMENT_CELLS, PLACEMENT_LEGAL, SPAWN_PLACEMENTS, PLACEMENT_CENTERS = compile_placements()
+SPAWN_CUBES = PLACEMENT_CELLS[np.arange(len(PIECES)+1), SPAWN_PLACEMENTS] # the spawn placement puts pieces back where they spawn
+SPAWN_CENTERS = PLACEMENT_CENTERS[np.arange(len(PIECES)+1), SPAWN_PLACEMENTS]
+CENTER_COUNTS = np.array([0] + [len(piece["centers"]) for piece in PIECES])
+LEVEL_REQUIREMENTS = np.array([get_level_requirement(level) for level in range(LEVEL_TABLE_SIZE)])
+SCORE_BONUSES = np.array(PLANE_CLEAR_SCORE_BONUSES, dtype=float)
+# Occupancy is also kept as one bitmask per column, with bit z set when the cube at height z is filled. Finding the
+# top of a column or counting full planes is then a table lookup instead of a reduction over the grid.
+PLANE_BITS = (1 << np.arange(HEIGHT)).astype(np.uint16)
+COLUMN_TOPS = np.array([(column & -column).bit_length()-1 if column else HEIGHT for column in range(2**HEIGHT)], dtype=np.int64)
+POPCOUNTS = np.array([bin(column).count("1") for column in range(2**HEIGHT)], dtype=np.int64)
+MULT_BONUSES = np.array(PLANE_CLEAR_MULT_BONUSES, dtype=float)
+# Movement and rotation tables, in the order Game.move_piece, Game.rotate_piece and Game.detect_spin use them
+MOVES = np.array([(1, 0, 0), (0, 1, 0), (-1, 0, 0), (0, -1, 0)])
+ROTATIONS = np.array([(1, -1), (0, -1), (1, 1), (0, 1), (2, 1), (2, -1)]) # axis and direction of each rotation input
+MOVABLE_AXES = np.array([(1, 2), (0, 2), (0, 1)]) # the two axes a rotation around each axis moves
+QUARTER_TURN_COS = np.array([math.cos(-math.pi/2), 0.0, math.cos(math.pi/2)]) # indexed by direction+1, the same floats Game rotates with
+QUARTER_TURN_SIN = np.array([math.sin(-math.pi/2), 0.0, math.sin(math.pi/2)])
+PUSH_BOUNDARIES = ((-1, 0, 0, MOVES[0]), (-1, 0, 1, MOVES[1]), (1, WIDTH-1, 0, MOVES[2]), (1, DEPTH-1, 1, MOVES[3])) # sign, border, axis, push
+FIRST_TRIES = np.array([(0, 0, 0), (0, 0, 1), (0, 0, 1), (0, 0, 1), (0, 0, -1)]) # the 2nd and 3rd ones down also move along the turn
+SPIN_CHECKS = np.array([(0, 0, -1), (0, 1, 0), (0, -1, 0), (1, 0, 0), (-1, 0, 0)])
+KICK_CHUNK_SIZE = 32 # kicks tried at once, most rotations find theirs among the first ones
+kick_displacements = {} # get_kick_order's displacements as arrays, with the same keys
+
+def reduce_last_axis(ufunc, array):
+    """
+    Returns ufunc.reduce(array, axis=-1). NumPy reduces many short rows, like the cubes of each piece, far slower than
+    it combines the slices along them, so this does the latter.
+    """
+    return functools.reduce(ufunc, np.moveaxis(array, -1, 0))
+
+def get_kick_displacements(coordinate_ranges, direction):
+    key = (tuple(coordinate_ranges), direction)
+    if key not in kick_displacements:
+        kick_displacements[key] = np.array(get_kick_order(list(coordinate_ranges), direction))
+    return kick_displacements[key]
+
+class VectorEnv:
+    """
+    Holds num_envs games as NumPy arrays and steps them all at once.
+
+    Actions are integers in range(ACTIONS): turn*2*PLACEMENTS + hold*PLACEMENTS + placement, where a hold of 1 swaps
+    the current piece with the held piece (or the next piece if nothing is held) before placing it. A turn of 0
+    drops the piece straight down, and a turn of 1-6 drops it, then rotates it like Game.rotate_piece(turn-1) (which
+    can kick it aside and score a spin) and drops it again. Placements that do not fit for the piece are replaced by
+    the piece's spawn placement; legal_actions() gives the mask of the ones that do for the first 2*PLACEMENTS
+    actions, and a turned action is legal wherever its unturned one is. Finished games are reset automatically, and
+    their final stats are kept in the final_* arrays until the next step.
+
+    Attributes:
+        piece_cubes: the current piece's cubes in each env, shape (num_envs, cubes, 3).
+        piece_centers: its rotation centers as floats, the one it turns around first, shape (num_envs, centers, 3).
+        lowest_center_elevation, lowest_spin_elevation: the same per-piece limits as Game's, for drop points and spins.
+        spin: whether the last movement of each piece was a spin, which multiplies the next clear's bonuses.
+    """
+    def __init__(self, num_envs, initial_level=1, seed=None):
+        self.num_envs = num_envs
+        self.initial_level = initial_level
+        self.rng = np.random.default_rng(seed)
+        self.grid = np.zeros((num_envs, WIDTH, DEPTH, HEIGHT), dtype=np.int8) # indexing: [env][x][y][z] like Game.grid
+        self.columns = np.zeros((num_envs, WIDTH, DEPTH), dtype=np.uint16) # occupancy bitmasks, see PLANE_BITS
+        self.current_piece = np.zeros(num_envs, dtype=np.int8)
+        self.held_piece = np.zeros(num_envs, dtype=np.int8) # 0 when nothing is held
+        self.hold_used = np.zeros(num_envs, dtype=bool)
+        self.next_pieces = np.zeros((num_envs, QUEUE_CAPACITY), dtype=np.int8)
+        self.queue_length = np.zeros(num_envs, dtype=np.int64)
+        self.piece_cubes = np.zeros((num_envs,) + SPAWN_CUBES.shape[1:], dtype=np.int64)
+        self.piece_centers = np.zeros((num_envs,) + SPAWN_CENTERS.shape[1:])
+        self.lowest_center_elevation = np.zeros(num_envs)
+        self.lowest_spin_elevation = np.zeros(num_envs)
+        self.spin = np.zeros(num_envs, dtype=bool)
+        self.grid_rotation = np.zeros(num_envs, dtype=np.int64)
+        self.score = np.zeros(num_envs)
+        self.level = np.zeros(num_envs, dtype=np.int64)
+        self.plane_clear_level_progress = np.zeros(num_envs, dtype=np.int64)
+        self.total_planes_cleared = np.zeros(num_envs, dtype=np.int64)
+        self.total_plane_clear_types = np.zeros((num_envs, 4), dtype=np.int64)
+        self.total_spin_clear_types = np.zeros((num_envs, 3), dtype=np.int64)
+        self.total_spins = np.zeros(num_envs, dtype=np.int64)
+        self.score_multiplier = np.ones(num_envs)
+        self.highest_score_multiplier = np.ones(num_envs)
+        self.score_mult_buffer = np.zeros(num_envs)
+        self.score_mult_cap = np.ones(num_envs)
+        self.final_score = np.zeros(num_envs)
+        self.final_level = np.zeros(num_envs, dtype=np.int64)
+        self.reset()
+
+    def reset(self, envs=None):
+        """Starts new games in the given envs (a boolean mask or index array), or in all of them."""
+        envs = np.arange(self.num_envs) if envs is None else np.flatnonzero(envs) if np.asarray(envs).dtype == bool else np.asarray(envs)
+        self.grid[envs] = 0
+        self.columns[envs] = 0
+        self.score[envs] = 0
+        self.total_planes_cleared[envs] = 0
+        self.total_plane_clear_types[envs] = 0
+        self.total_spin_clear_types[envs] = 0
+        self.total_spins[envs] = 0
+        self.level[envs] = self.initial_level
+        self.plane_clear_level_progress[envs] = get_level_requirement(self.initial_level-1)
+        self.check_for_level_increase(envs)
+        self.score_multiplier[envs] = 1.0
+        self.highest_score_multiplier[envs] = 1.0
+        self.score_mult_buffer[envs] = 0.0
+        self.grid_rotation[envs] = 0
+        self.held_piece[envs] = 0
+        self.queue_length[envs] = 0
+        self.get_new_piece(envs)
+        return self.observe()
+
+    def observe(self):
+        """Returns the observation arrays. next_pieces only contains the visible part of the queue."""
+        return {"grid": self.grid.copy(), "current_piece": self.current_piece.copy(), "held_piece": self.held_piece.copy(),
+                "next_pieces": self.next_pieces[:, :NEXT_PIECE_COUNT].copy(), "piece_cubes": self.piece_cubes.copy()}
+
+    def features(self):
+        """Returns the board features of every environment, see board_features.extract_features()."""
+        return extract_features(self.columns)
+
+    def legal_actions(self):
+        """Returns a boolean mask of shape (num_envs, 2*PLACEMENTS) of the actions that place the piece as requested."""
+        hold_pieces = np.where(self.held_piece > 0, self.held_piece, self.next_pieces[:, 0])
+        return np.concatenate((PLACEMENT_LEGAL[self.current_piece], PLACEMENT_LEGAL[hold_pieces]), axis=1)
+
+    def select(self, envs):
+        """
+        Returns an index for an array of distinct env indices: a slice when it holds every env, as most steps affect
+        all of them and NumPy copies slices much faster than it gathers indices. The slice gives views, not copies.
+        """
+        return slice(None) if len(envs) == self.num_envs else envs
+
+    def load_upcoming_pieces(self, envs):
+        """Appends a shuffled bag (every piece plus a random extra one) to each queue that is running low, like Game."""
+        envs = envs[self.queue_length[envs] <= NEXT_PIECE_COUNT]
+        while len(envs):
+            bag_size = len(PIECES)+1
+            bags = np.empty((len(envs), bag_size), dtype=np.int8)
+            bags[:, :-1] = np.arange(1, len(PIECES)+1)
+            bags[:, -1] = self.rng.integers(0, 7, len(envs)) + 1 # Game draws the extra piece from the first 7 pieces
+            bags = np.take_along_axis(bags, self.rng.random(bags.shape).argsort(axis=1), axis=1)
+            self.next_pieces[envs[:, None], self.queue_length[envs, None] + np.arange(bag_size)] = bags
+            self.queue_length[envs] += bag_size
+            envs = envs[self.queue_length[envs] <= NEXT_PIECE_COUNT]
+
+    def pop_next_piece(self, envs):
+        """Removes and returns the first piece in each of the given envs' queues."""
+        self.load_upcoming_pieces(envs)
+        rows = self.select(envs)
+        pieces = self.next_pieces[rows, 0].copy()
+        self.next_pieces[rows, :-1] = self.next_pieces[rows, 1:]
+        self.queue_length[rows] -= 1
+        return pieces
+
+    def reset_piece_state(self, envs):
+        """Puts the current pieces where they spawn, like Game.reset_piece_state."""
+        rows = self.select(envs)
+        pieces = self.current_piece[rows]
+        self.piece_cubes[rows] = SPAWN_CUBES.take(pieces, axis=0) # take() gathers along one axis faster than indexing does
+        self.piece_centers[rows] = SPAWN_CENTERS.take(pieces, axis=0)
+        self.lowest_center_elevation[rows] = SPAWN_CENTERS[:, 0, 2].take(pieces)
+        self.lowest_spin_elevation[rows] = SPAWN_CENTERS[:, 0, 2].take(pieces)
+        self.spin[rows] = False
+
+    def get_new_piece(self, envs):
+        self.current_piece[self.select(envs)] = self.pop_next_piece(envs)
+        self.hold_used[self.select(envs)] = False
+        self.reset_piece_state(envs)
+
+    def hold_piece(self, envs):
+        """Swaps the current pieces with the held ones (or the next ones if nothing is held), once per piece like Game."""
+        envs = envs[~self.hold_used[envs]]
+        self.hold_used[envs] = True
+        held = self.held_piece[envs]
+        self.held_piece[envs] = self.current_piece[envs]
+        self.current_piece[envs] = held
+        empty = envs[held == 0]
+        self.current_piece[empty] = self.pop_next_piece(empty)
+        self.reset_piece_state(envs)
+
+    def get_columns(self, envs, x, y):
+        """Returns the bitmasks of the given columns. Indexing the flattened array is quicker than indexing three axes."""
+        return self.columns.reshape(-1)[(envs*WIDTH + x)*DEPTH + y]
+
+    def set_cubes(self, envs, cubes, ids, placed):
+        """
+        Writes the pieces' cubes (shape (len(envs), cubes, 3)) for which placed is True into the grid with the given ids,
+        and sets their bits in the bitmasks of the columns they are in. Negative z wraps around like Game's lists do.
+        """
+        columns = (envs[:, None]*WIDTH + cubes[:, :, 0])*DEPTH + cubes[:, :, 1]
+        bits = PLANE_BITS.take(cubes[:, :, 2]) * placed
+        for n in range(cubes.shape[1]): # one cube per env at a time, as cubes of a piece can share a column
+            self.columns.reshape(-1)[columns[:, n]] |= bits[:, n]
+        cells = columns*HEIGHT + cubes[:, :, 2] % HEIGHT
+        if placed.all(): # pieces only stick out of the grid when the game ends
+            self.grid.reshape(-1)[cells.ravel()] = np.repeat(ids, cubes.shape[1])
+        else:
+            self.grid.reshape(-1)[cells[placed]] = np.broadcast_to(ids[:, None], placed.shape)[placed]
+
+    def occupied(self, envs, x, y, z):
+        """Returns whether the given cells are filled, for x and y within the grid. Cells above or below it are empty."""
+        inside = (z >= 0) & (z < HEIGHT)
+        return inside & ((self.get_columns(envs, x, y) >> np.where(inside, z, 0)) & 1 == 1)
+
+    def piece_fits(self, envs, cubes):
+        """
+        Returns whether pieces with the given cubes (shape (..., cubes, 3), with envs broadcasting against the leading
+        axes) would be free and within the grid, being above it allowed, like Game.piece_fits.
+        """
+        x, y, z = cubes[..., 0], cubes[..., 1], cubes[..., 2]
+        within = (x >= 0) & (x < WIDTH) & (y >= 0) & (y < DEPTH) & (z < HEIGHT)
+        free = ~self.occupied(envs, np.minimum(np.maximum(x, 0), WIDTH-1), np.minimum(np.maximum(y, 0), DEPTH-1), z)
+        return reduce_last_axis(np.logical_and, within & free)
+
+    def get_drop_distances(self, envs, cubes):
+        """Returns how far pieces with the given cubes (shape (len(envs), cubes, 3), within the columns) can drop."""
+        z = cubes[:, :, 2]
+        shift = np.maximum(z+1, 0)
+        below = self.get_columns(envs[:, None], cubes[:, :, 0], cubes[:, :, 1]).astype(np.int64) >> shift
+        floors = np.where(below > 0, shift + COLUMN_TOPS[below], HEIGHT) # the highest occupied z under each cube, or the floor
+        return reduce_last_axis(np.minimum, floors - z - 1)
+
+    def check_piece_elevation(self, envs):
+        self.lowest_center_elevation[envs] = np.maximum(self.lowest_center_elevation[envs], self.piece_centers[envs, 0, 2])
+
+    def get_ghost_pieces(self, envs):
+        """Does what Game.get_ghost_piece does to the piece state: it checks the elevation and ends spins if the piece can drop."""
+        dropping = envs[self.get_drop_distances(envs, self.piece_cubes[envs]) > 0]
+        self.check_piece_elevation(dropping)
+        self.spin[dropping] = False
+
+    def increase_score(self, envs, points):
+        rows = self.select(envs)
+        self.score[rows] += points * self.score_multiplier[rows]
+
+    def check_for_level_increase(self, envs):
+        # Game increments the level while the progress meets the requirement, which is where the progress would be sorted into the table
+        rows = self.select(envs)
+        self.level[rows] = np.maximum(self.level[rows], np.searchsorted(LEVEL_REQUIREMENTS, self.plane_clear_level_progress[rows], side="right"))
+        self.score_mult_cap[rows] = 1.0 + self.level[rows]/5
+
+    def score_mult_bonus(self, envs, amount):
+        rows = self.select(envs)
+        buffer = self.score_mult_buffer[rows] + amount
+        overflow = buffer > MULT_BUFFER_SIZE
+        multiplier = self.score_multiplier[rows].copy()
+        multiplier[overflow] = np.minimum(multiplier[overflow] + (buffer[overflow] - MULT_BUFFER_SIZE), self.score_mult_cap[rows][overflow])
+        buffer[overflow] = MULT_BUFFER_SIZE
+        self.score_multiplier[rows] = multiplier
+        self.score_mult_buffer[rows] = buffer
+        self.highest_score_multiplier[rows] = np.maximum(self.highest_score_multiplier[rows], multiplier)
+
+    def clear_planes(self, envs):
+        """Removes full planes from the given envs, shifting the planes above them down, and scores them. Returns the number cleared."""
+        rows = self.select(envs)
+        full_planes = reduce_last_axis(np.bitwise_and, self.columns[rows].reshape(len(envs), WIDTH*DEPTH))
+        planes_cleared = POPCOUNTS[full_planes]
+        clearing = planes_cleared > 0
+        if clearing.any():
+            # Game pops each full plane and inserts an empty one at the top, which keeps the other planes in order
+            full = (full_planes[clearing, None] & PLANE_BITS) > 0 # (clearing envs, HEIGHT)
+            order = np.argsort(~full, axis=1, kind="stable")
+            shifted = np.take_along_axis(self.grid[envs[clearing]], order[:, None, None, :], axis=3)
+            shifted[np.broadcast_to(np.take_along_axis(full, order, axis=1)[:, None, None, :], shifted.shape)] = 0
+            self.grid[envs[clearing]] = shifted
+            self.columns[envs[clearing]] = (shifted != 0).astype(np.uint16) @ PLANE_BITS
+        spins = self.spin[rows]
+        clear_type = np.minimum(planes_cleared, 4)
+        self.increase_score(envs, SCORE_BONUSES[clear_type] * np.where(spins, SPIN_CLEAR_SCORE_FACTOR, 1))
+        self.total_planes_cleared[rows] += planes_cleared
+        self.plane_clear_level_progress[rows] += planes_cleared
+        self.check_for_level_increase(envs)
+        self.score_mult_bonus(envs, MULT_BONUSES[clear_type] * np.where(spins, SPIN_CLEAR_MULT_FACTOR, 1))
+        self.total_plane_clear_types[envs[clearing & ~spins], clear_type[clearing & ~spins]-1] += 1
+        self.total_spin_clear_types[envs[clearing & spins], np.minimum(planes_cleared, 3)[clearing & spins]-1] += 1
+        return planes_cleared
+
+    def lower_pieces(self, envs, distance):
+        """
+        Lowers the current pieces of the given envs by distance planes, like calling Game.lower_piece that many times,
+        which scores a point for each plane the piece's center reaches below where it has been before.
+        """
+        self.spin[envs[distance > 0]] = False
+        rows = self.select(envs)
+        centers = self.piece_centers[rows]
+        lowest = self.lowest_center_elevation[rows]
+        heights = centers[:, :, 2]*2
+        if (np.floor(heights) != heights).any(): # turned alternate centers can be a rounding error off half a cube, so they have to add up one plane at a time like in Game
+            points = np.zeros(len(envs), dtype=np.int64)
+            for plane in range(distance.max(initial=0)):
+                lowering = distance > plane
+                centers[lowering, :, 2] += 1
+                points += lowering & (centers[:, 0, 2] > lowest)
+                lowest = np.where(lowering, np.maximum(lowest, centers[:, 0, 2]), lowest)
+        else: # otherwise every plane below the lowest elevation so far scores
+            points = distance - np.minimum(np.maximum(np.floor(lowest - centers[:, 0, 2]), 0), distance).astype(np.int64)
+            centers[:, :, 2] += distance[:, None]
+            lowest = np.where(distance > 0, np.maximum(lowest, centers[:, 0, 2]), lowest)
+        score, multiplier = self.score[rows], self.score_multiplier[rows]
+        for plane in range(points.max(initial=0)): # repeated addition keeps the floating point score identical to Game's
+            score += multiplier * (points > plane) # adding 0.0 leaves the others' scores as they are
+        self.score[rows] = score
+        self.piece_cubes[rows, :, 2] += distance[:, None]
+        self.piece_centers[rows] = centers
+        self.lowest_center_elevation[rows] = lowest
+
+    def move_pieces(self, envs, inputs):
+        """Moves the current pieces one cube along the grid like Game.move_piece, if they fit there."""
+        self.spin[envs] = False
+        moves = MOVES[(inputs + self.grid_rotation[envs]) % 4]
+        cubes = self.piece_cubes[envs] + moves[:, None]
+        moved = self.piece_fits(envs[:, None], cubes)
+        envs = envs[moved]
+        self.piece_cubes[envs] = cubes[moved]
+        self.piece_centers[envs] += moves[moved, None]
+        self.get_ghost_pieces(envs)
+
+    def order_centers(self, envs, inputs):
+        """Puts the center each piece turns around first, like Game.rotate_piece does even when the rotation is then blocked."""
+        counts = CENTER_COUNTS[self.current_piece[envs]]
+        centers = self.piece_centers[envs]
+        by_height = (counts > 1) & (centers[:, 0, 2] != centers[:, 1, 2]) # the lower center first
+        by_direction = (counts > 1) & ~by_height & (inputs < 4) # the center furthest along the turn first
+        rows = np.flatnonzero(by_height | by_direction)
+        if len(rows):
+            keys = np.where(by_height[rows, None], -centers[rows, :, 2],
+                            centers[rows, :, inputs[rows] % 2] * np.where(inputs[rows] < 2, -1, 1)[:, None])
+            keys[np.arange(keys.shape[1]) >= counts[rows, None]] = np.inf # repeated centers stay last
+            order = np.argsort(keys, axis=1, kind="stable") # Python's sort is stable too
+            self.piece_centers[envs[rows]] = np.take_along_axis(centers[rows], order[:, :, None], axis=1)
+
+    def rotate_pieces(self, envs, inputs):
+        """
+        Turns the current pieces of the given envs like Game.rotate_piece(input) for each input (0-5), with the same
+        choice of center, pushing off the walls, kicks, points and spin detection. Pieces whose rotation fits nowhere
+        stay where they were.
+        """
+        self.spin[envs] = False
+        inputs = np.where(inputs < 4, (inputs + self.grid_rotation[envs]) % 4, inputs)
+        axes, directions = ROTATIONS[inputs, 0], ROTATIONS[inputs, 1]
+        first_axes, second_axes = MOVABLE_AXES[axes, 0], MOVABLE_AXES[axes, 1]
+        self.order_centers(envs, inputs)
+        original = self.piece_cubes[envs]
+        centers = self.piece_centers[envs]
+        rows = np.arange(len(envs))
+        cube_count = original.shape[1]
+
+        # the cubes and the alternate centers turn around the first center, with the same floating point steps as Game
+        positions = np.concatenate((original.astype(float), centers[:, 1:]), axis=1)
+        center_a, center_b = centers[rows, 0, first_axes][:, None], centers[rows, 0, second_axes][:, None]
+        a, b = positions[rows, :, first_axes] - center_a, positions[rows, :, second_axes] - center_b
+        cos, sin = QUARTER_TURN_COS[directions+1][:, None], QUARTER_TURN_SIN[directions+1][:, None]
+        positions[rows, :, first_axes] = a*cos + b*sin + center_a
+        positions[rows, :, second_axes] = b*cos - a*sin + center_b
+        cubes = np.rint(positions[:, :cube_count]).astype(np.int64) # rounds half to even like round()
+        centers[:, 1:] = positions[:, cube_count:]
+
+        # pushing off the walls repeats while the last cube checked was outside, as in Game
+        checked = ((cubes[:, :, :2].min(axis=1) < 0) | (cubes[:, :, :2].max(axis=1) > (WIDTH-1, DEPTH-1))).any(axis=1)
+        if checked.any():
+            pushed_cubes, pushed_centers = cubes[checked], centers[checked]
+            for sign, border, axis, push in PUSH_BOUNDARIES:
+                repeating = np.ones(len(pushed_cubes), dtype=bool)
+                while repeating.any():
+                    for n in range(cube_count):
+                        outside = repeating & (pushed_cubes[:, n, axis]*sign > border)
+                        pushed_cubes[outside] += push
+                        pushed_centers[outside] += push
+                    repeating = outside
+            cubes[checked], centers[checked] = pushed_cubes, pushed_centers
+
+        # pieces not held by an overhang first try in place, one cube down (also moved along the turn) and one cube up
+        held = self.occupied(envs[:, None], original[:, :, 0], original[:, :, 1], original[:, :, 2]-1).any(axis=1)
+        rounding = ~held & (centers[:, 0, 0] % 1 == 0)
+        centers[rounding, 0] = np.rint(centers[rounding, 0])
+        tries = np.repeat(FIRST_TRIES[None], len(envs), axis=0)
+        tries[rows, 2, first_axes] = -directions
+        tries[rows, 3, first_axes] = directions
+        fits = self.piece_fits(envs[:, None, None], cubes[:, None] + tries[:, :, None])
+        fits[:, 2:4] &= (inputs < 4)[:, None]
+        fits &= ~held[:, None]
+        committed = fits.any(axis=1)
+        displacements = tries[rows, fits.argmax(axis=1)]
+
+        # the rest kick to the first fitting displacement that still touches the unturned piece
+        kicking = np.flatnonzero(~committed)
+        if len(kicking):
+            ranges = cubes[kicking].max(axis=1) - cubes[kicking].min(axis=1) + 1
+            kick_directions = np.where(inputs[kicking] < 4, inputs[kicking], (self.grid_rotation[envs[kicking]]+1) % 4)
+            keys, groups = np.unique(np.column_stack((ranges, kick_directions)), axis=0, return_inverse=True)
+            for group, key in enumerate(keys):
+                members = kicking[groups.ravel() == group]
+                kicks = get_kick_displacements(key[:3].tolist(), int(key[3]))
+                for start in range(0, len(kicks), KICK_CHUNK_SIZE):
+                    chunk = kicks[start:start+KICK_CHUNK_SIZE]
+                    candidates = cubes[members][:, None] + chunk[None, :, None] # (members, kicks, cubes, 3)
+                    fits = self.piece_fits(envs[members][:, None, None], candidates)
+                    touching = (np.abs(candidates[:, :, :, None] - original[members][:, None, None]).sum(axis=-1) <= 1).any(axis=(2, 3))
+                    found = fits & touching
+                    kicked = found.any(axis=1)
+                    committed[members[kicked]] = True
+                    displacements[members[kicked]] = chunk[found[kicked].argmax(axis=1)]
+                    checked[members] |= fits.any(axis=1) # moving there was tried, which checked the elevation
+                    members = members[~kicked]
+                    if not len(members):
+                        break
+        self.check_piece_elevation(envs[checked | committed])
+
+        turned = envs[committed]
+        cubes = cubes[committed] + displacements[committed, None]
+        centers = centers[committed] + displacements[committed, None]
+        original_centers = self.piece_centers[turned, 0]
+        raises = np.floor(np.maximum(centers[:, 0, 2] - original_centers[:, 2], 0)).astype(np.int64) # raise_piece_to_initial_center
+        rising = np.ones(len(turned), dtype=bool)
+        for plane in range(raises.max(initial=0)):
+            rising &= (raises > plane) & self.piece_fits(turned[:, None], cubes - (0, 0, 1)) # stops at the first raise that doesn't fit
+            cubes[rising, :, 2] -= 1
+            centers[rising, :, 2] -= 1
+        immobile = ~self.piece_fits(turned[:, None, None], cubes[:, None] + SPIN_CHECKS[:, None]).any(axis=1)
+        spinning = immobile & (original_centers[:, 2] > self.lowest_spin_elevation[turned]) # detect_spin
+        spun = turned[spinning]
+        self.lowest_spin_elevation[spun] = original_centers[spinning, 2]
+        displacement = np.abs(original_centers[spinning] - centers[spinning, 0])
+        displacement = displacement[:, 0] + displacement[:, 1] + displacement[:, 2]
+        self.increase_score(spun, 20 + 10*displacement)
+        self.score_mult_bonus(spun, 0.14 + 0.07*displacement)
+        self.spin[spun] = True
+        self.total_spins[spun] += 1
+        self.piece_cubes[turned] = cubes
+        self.piece_centers[turned] = centers
+        self.get_ghost_pieces(turned)
+
+    def place_overflowing_piece(self, env):
+        """
+        Places a piece that did not fully enter the grid but may still fit after a plane clear, mirroring Game.place_piece cube by cube.
+        Returns whether the game is over. This only happens at the top of a full stack, so it is not vectorized.
+        """
+        envs = np.array([env])
+        planes_cleared = 0
+        finished = False
+        for n in range(self.piece_cubes.shape[1]):
+            x, y, z = sorted(self.piece_cubes[env].tolist(), key=lambda cube: -cube[2])[n]
+            if z >= 0:
+                self.set_cubes(envs, np.array([[[x, y, z]]]), self.current_piece[envs], np.ones((1, 1), dtype=bool))
+            elif z >= -1:
+                planes_cleared += int(self.clear_planes(envs)[0])
+                for _ in range(planes_cleared):
+                    self.lower_pieces(envs, np.ones(1, dtype=np.int64))
+                    x, y, z = sorted(self.piece_cubes[env].tolist(), key=lambda cube: -cube[2])[n]
+                    self.set_cubes(envs, np.array([[[x, y, z]]]), self.current_piece[envs], np.ones((1, 1), dtype=bool))
+                if planes_cleared == 0:
+                    finished = True
+            else:
+                finished = True
+        return finished
+
+    def place_pieces(self, envs):
+        """Places the current pieces of the given envs where they are and deals the next ones. Returns whose games ended."""
+        cubes = self.piece_cubes[self.select(envs)]
+        inside = cubes[:, :, 2] >= 0
+        self.set_cubes(envs, cubes, self.current_piece[self.select(envs)], inside)
+        # Game places the cubes inside the grid first, so a piece sticking out of the top with no full plane below it always ends the game
+        finished = ~reduce_last_axis(np.logical_and, inside)
+        if finished.any():
+            for n in np.flatnonzero(finished & (np.bitwise_and.reduce(self.columns[envs].reshape(len(envs), WIDTH*DEPTH), axis=1) > 0)):
+                finished[n] = self.place_overflowing_piece(envs[n])
+        self.clear_planes(envs)
+        self.get_new_piece(envs)
+        return finished
+
+    def finish_step(self, previous_score, dones):
+        rewards = self.score - previous_score
+        self.final_score[dones] = self.score[dones]
+        self.final_level[dones] = self.level[dones]
+        if dones.any():
+            self.reset(dones)
+        return self.observe(), rewards, dones
+
+    def step(self, actions):
+        """
+        Applies one action to every env.
+
+        Returns:
+            observations: see observe(), taken after finished games are reset.
+            rewards: the score gained by each env this step.
+            dones: whether each env's game ended this step. final_score and final_level hold the ended games' results.
+        """
+        actions = np.asarray(actions)
+        envs = np.arange(self.num_envs)
+        previous_score = self.score.copy()
+        self.hold_piece(envs[actions // PLACEMENTS % 2 == 1])
+        placements = actions % PLACEMENTS
+        pieces = self.current_piece.astype(np.int64)
+        placements = pieces*PLACEMENTS + np.where(PLACEMENT_LEGAL.reshape(-1).take(pieces*PLACEMENTS + placements), placements, SPAWN_PLACEMENTS.take(pieces))
+        self.piece_cubes = PLACEMENT_CELLS.reshape((-1,) + PLACEMENT_CELLS.shape[2:]).take(placements, axis=0) # (envs, cubes, 3)
+        self.piece_centers = PLACEMENT_CENTERS.reshape((-1,) + PLACEMENT_CENTERS.shape[2:]).take(placements, axis=0)
+        self.lowest_center_elevation = self.piece_centers[:, 0, 2].copy()
+        self.lowest_spin_elevation = self.piece_centers[:, 0, 2].copy()
+        self.spin[:] = False
+        self.lower_pieces(envs, self.get_drop_distances(envs, self.piece_cubes))
+        turns = actions // (2*PLACEMENTS)
+        turning = envs[turns > 0]
+        if len(turning):
+            self.rotate_pieces(turning, turns[turning]-1)
+            self.lower_pieces(turning, self.get_drop_distances(turning, self.piece_cubes[turning]))
+        return self.finish_step(previous_score, self.place_pieces(envs))
+
+    def step_events(self, events):
+        """
+        Applies one GameEvent, given by its value, to every env, as Game's basic_input, modified_input and hold_piece do.
+        Pausing, quitting and revealing the grid do nothing. Returns the same as step().
+        """
+        events = np.asarray(events)
+        envs = np.arange(self.num_envs)
+        previous_score = self.score.copy()
+        moving = envs[events <= GameEvent.MOVE_PIECE_BACKWARD.value]
+        self.move_pieces(moving, events[moving])
+        self.grid_rotation = (self.grid_rotation + (events == GameEvent.ROTATE_GRID_CLOCKWISE.value)
+                              - (events == GameEvent.ROTATE_GRID_COUNTERCLOCKWISE.value)) % 4
+        self.hold_piece(envs[events == GameEvent.HOLD_PIECE.value])
+        turning = envs[(events >= GameEvent.ROTATE_PIECE_RIGHT.value) & (events <= GameEvent.ROTATE_PIECE_COUNTERCLOCKWISE.value)]
+        self.rotate_pieces(turning, events[turning] - GameEvent.ROTATE_PIECE_RIGHT.value)
+        lowering = events == GameEvent.LOWER_PIECE.value
+        dropping = envs[lowering | (events == GameEvent.SONIC_DROP_PIECE.value)]
+        distance = self.get_drop_distances(dropping, self.piece_cubes[dropping])
+        self.lower_pieces(dropping, np.where(lowering[dropping], np.minimum(distance, 1), distance))
+        dones = np.zeros(self.num_envs, dtype=bool)
+        placing = dropping[distance == 0] # grounded pieces get placed instead
+        dones[placing] = self.place_pieces(placing)
+        return self.finish_step(previous_score, dones)
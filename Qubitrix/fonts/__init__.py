@@ -7,17 +7,33 @@ import pygame
 
 font_dir = os.path.dirname(__file__) 
 font_path = os.path.join(font_dir, "qubitrix-font.ttf")
+font_bundle_name = "fonts/qubitrix-font.ttf" # the font's name in an asset bundle, see assets.bundle
+bundle = None
+
+def use_bundle(asset_bundle):
+    """
+    Makes fonts read from the asset bundle (an assets.bundle.AssetBundle, or None for the font file).
+    """
+    global bundle
+    bundle = asset_bundle
+
+def get_font_file():
+    """
+    Returns what pygame.font.Font should read the font from: a file object from the asset bundle, or the font's path.
+    """
+    font_file = bundle.open_file(font_bundle_name) if bundle else None
+    return font_file if font_file is not None else font_path
 
 def get_small_font(WINDOW_HEIGHT):
     """
     Returns a small font based on the window height.
     The font size is set to 1/24th of the window height.
     """
-    return pygame.font.Font(font_path, int(WINDOW_HEIGHT / 24))
+    return pygame.font.Font(get_font_file(), int(WINDOW_HEIGHT / 24))
 
 def get_large_font(WINDOW_HEIGHT):
     """
     Returns a large font based on the window height.
     The font size is set to 1/12th of the window height.
     """
-    return pygame.font.Font(font_path, int(WINDOW_HEIGHT / 12))
+    return pygame.font.Font(get_font_file(), int(WINDOW_HEIGHT / 12))
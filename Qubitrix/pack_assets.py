@@ -0,0 +1,50 @@
+import os
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy") # decoding needs an initialized mixer, not a sound device
+
+import argparse
+import sys
+
+from pygame import mixer
+
+if __package__ in (None, ""): # run as a script from inside the Qubitrix folder, so import it as the package it is
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Qubitrix.assets.bundle import DEFAULT_BUNDLE_PATH, build_bundle
+
+# Qubitrix - Asset Packer
+# Builds the asset bundle the game loads its sounds and font from (see assets.bundle):
+#
+#     python pack_assets.py
+#
+# Sounds are decoded for the mixer format given here, which has to match the one the game's mixer runs at for the
+# bundled sounds to be used; the defaults are pygame's, which the game uses. Run it again after changing any sound or
+# the font. The game falls back to the loose files when there is no bundle.
+
+QUBITRIX_FOLDER = os.path.dirname(os.path.abspath(__file__))
+BUNDLED_FOLDERS = {"sounds": ".wav", "fonts": ".ttf"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack Qubitrix's sounds and fonts into one asset bundle")
+    parser.add_argument("--output", default=DEFAULT_BUNDLE_PATH, help="where to write the bundle (the game looks for it at the default)")
+    parser.add_argument("--frequency", type=int, default=44100, help="sample rate to decode the sounds at")
+    parser.add_argument("--size", type=int, default=-16, help="sample format to decode the sounds to, as in pygame.mixer.init")
+    parser.add_argument("--channels", type=int, default=2, help="channel count to decode the sounds to")
+    args = parser.parse_args()
+    mixer.init(args.frequency, args.size, args.channels)
+    sounds = {}
+    files = {}
+    for folder, extension in BUNDLED_FOLDERS.items():
+        for fname in sorted(os.listdir(os.path.join(QUBITRIX_FOLDER, folder))):
+            path = os.path.join(QUBITRIX_FOLDER, folder, fname)
+            if not fname.lower().endswith(extension):
+                continue
+            if folder == "sounds":
+                sounds[fname.rsplit('.', 1)[0]] = mixer.Sound(path).get_raw()
+            else:
+                with open(path, "rb") as file:
+                    files[f"{folder}/{fname}"] = file.read()
+    build_bundle(args.output, sounds, files, mixer.get_init())
+    print(f"Packed {len(sounds)} sounds and {len(files)} other files into {args.output} ({os.path.getsize(args.output)/2**20:.1f}MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Qubitrix - Polycube Module
+# Builds piece sets other than the hand-written tetracubes in engine.PIECES: every tricube, pentacube, etc. (told
+# apart by rotation, so mirror images are different pieces, like the two chiral tetracubes), or a custom set of pieces
+# read from a JSON file holding a list of pieces, each a list of [x, y, z] cubes.
+#
+# Compiling a set finds each piece's distinct orientations, its rotation centers and where it spawns, in the same
+# format as PIECES. Enumerating the larger sets takes a while, so compiled sets are saved under DEFAULT_CACHE_FOLDER,
+# named by a hash of the definition and the grid size, and later runs just read them back.
+
+DEFAULT_CACHE_FOLDER = os.path.join(os.path.expanduser("~"), ".qubitrix", "pieces")
+COMPILER_VERSION = 1 # bump when the compiled format or the rules below change, so old cache files are not used
+POLYCUBE_SETS = {"tricubes": 3, "tetracubes": 4, "pentacubes": 5}
+SPAWN_BOTTOM = -3 # the z of a spawned piece's lowest cubes, above the grid
+NEIGHBOURS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+def get_rotation_matrices():
+    """
+    Returns the 24 rotation matrices of a cube, identity first.
+    They are found by repeatedly applying 90 degree turns around the X and Z axes until no new matrices appear.
+    """
+    turns = (np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]]), np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]]))
+    matrices = [np.identity(3, dtype=int)]
+    for matrix in matrices: # the list grows while it is iterated over, like a breadth-first search
+        for turn in turns:
+            rotated = turn @ matrix
+            if not any((rotated == known).all() for known in matrices):
+                matrices.append(rotated)
+    return matrices
+
+ROTATION_MATRICES = get_rotation_matrices()
+
+def normalize(cubes):
+    """Returns the cubes moved so the smallest coordinate on each axis is 0, sorted, as a tuple of tuples."""
+    lowest = [min(cube[axis] for cube in cubes) for axis in range(3)]
+    return tuple(sorted(tuple(int(cube[axis]-lowest[axis]) for axis in range(3)) for cube in cubes))
+
+def get_orientations(cubes):
+    """Returns every distinct orientation of a piece as normalize()d cubes, starting with the piece as given."""
+    orientations = []
+    for matrix in ROTATION_MATRICES:
+        orientation = normalize((np.array(cubes) @ matrix.T).tolist())
+        if orientation not in orientations:
+            orientations.append(orientation)
+    return orientations
+
+def enumerate_polycubes(size):
+    """Returns every polycube of size cubes that no rotation turns into another, each in its smallest orientation."""
+    shapes = {((0, 0, 0),)}
+    for _ in range(size-1):
+        grown = set()
+        for shape in shapes:
+            for x, y, z in shape:
+                for dx, dy, dz in NEIGHBOURS:
+                    cube = (x+dx, y+dy, z+dz)
+                    if cube not in shape:
+                        grown.add(min(get_orientations(shape + (cube,))))
+        shapes = grown
+    return sorted(shapes, key=lambda shape: (max(max(cube) for cube in shape), shape)) # compact pieces first
+
+def get_rotation_centers(cubes):
+    """
+    Returns the points a piece rotates around, like the hand-picked "centers" of PIECES: the cube centers or cube
+    corners nearest the piece's centroid. Ties between cubes are all kept (the game picks one per rotation), and a tie
+    between a cube and a corner goes to the corner. The lowest center comes first, then the one with the smallest x and y.
+    """
+    centroid = np.array(cubes, dtype=float).mean(axis=0)
+    candidates = []
+    for offset in (0.5, 0): # corners first
+        lattice = np.floor(centroid-offset)+offset
+        for corner in np.ndindex(2, 2, 2):
+            point = lattice + corner
+            candidates.append((round(float(np.linalg.norm(point-centroid)), 9), offset, tuple(float(n) for n in point)))
+    nearest = min(distance for distance, _, _ in candidates)
+    offset = next(offset for distance, offset, _ in candidates if distance == nearest)
+    centers = {point for distance, point_offset, point in candidates if distance == nearest and point_offset == offset}
+    return [[int(n) if offset == 0 else n for n in point] for point in sorted(centers, key=lambda point: (-point[2], point[0], point[1]))]
+
+def compile_piece(cubes, id, width, depth):
+    """
+    Returns a piece in the format of PIECES, spawning in its flattest orientation that fits the grid, centered over it
+    with its lowest cubes at SPAWN_BOTTOM. Also returns the size (max-min+1 on each axis) of each of its orientations.
+    """
+    orientations = get_orientations(cubes)
+    extents = [[max(cube[axis] for cube in orientation)+1 for axis in range(3)] for orientation in orientations]
+    fitting = [n for n in range(len(orientations)) if extents[n][0] <= width and extents[n][1] <= depth]
+    if not fitting:
+        raise ValueError(f"piece {id} does not fit in a {width}x{depth} grid in any orientation")
+    spawn = min(fitting, key=lambda n: extents[n][2])
+    offset = ((width-extents[spawn][0])//2, (depth-extents[spawn][1])//2, SPAWN_BOTTOM-extents[spawn][2]+1)
+    spawn_cubes = [[cube[axis]+offset[axis] for axis in range(3)] for cube in orientations[spawn]]
+    return {"centers": get_rotation_centers(spawn_cubes), "cubes": spawn_cubes, "id": id}, extents
+
+def compile_piece_set(shapes, width, depth):
+    """
+    Compiles a list of pieces (each a list of cubes) into {"pieces": [...], "extents": [...]}.
+    pieces is in the format of PIECES, with ids from 1, and extents lists the sizes of every orientation of every piece.
+    """
+    compiled = {"pieces": [], "extents": []}
+    for id, cubes in enumerate(shapes, start=1):
+        piece, extents = compile_piece(cubes, id, width, depth)
+        compiled["pieces"].append(piece)
+        compiled["extents"].append(extents)
+    return compiled
+
+def read_definition(piece_set):
+    """Returns the definition of a named polycube set or a piece set file, as something that can be hashed as JSON."""
+    if piece_set in POLYCUBE_SETS:
+        return {"polycubes": POLYCUBE_SETS[piece_set]}
+    with open(piece_set) as file:
+        shapes = json.load(file)
+    if not shapes or len({len(cubes) for cubes in shapes}) != 1:
+        raise ValueError(f"{piece_set} has to hold a list of pieces that all have the same number of cubes")
+    return {"pieces": [[list(cube) for cube in cubes] for cubes in shapes]}
+
+def load_piece_set(piece_set, width, depth, cache_folder=DEFAULT_CACHE_FOLDER):
+    """
+    Returns a compiled piece set (see compile_piece_set) for a name in POLYCUBE_SETS or the path of a piece set file,
+    from the cache if it was compiled before.
+    """
+    definition = read_definition(piece_set)
+    key = hashlib.sha256(json.dumps({"definition": definition, "width": width, "depth": depth, "version": COMPILER_VERSION}, sort_keys=True).encode()).hexdigest()
+    path = os.path.join(cache_folder, f"{key[:32]}.json")
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError): # not cached yet, or a damaged file
+        pass
+    shapes = enumerate_polycubes(definition["polycubes"]) if "polycubes" in definition else definition["pieces"]
+    compiled = compile_piece_set(shapes, width, depth)
+    os.makedirs(cache_folder, exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        json.dump(compiled, file)
+    os.replace(path + ".tmp", path) # so another instance never reads a half-written file
+    return compiled
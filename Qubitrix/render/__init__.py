@@ -0,0 +1,29 @@
+import importlib
+
+# Qubitrix - Render Package
+# Drawing the game and everything around it. Importing Qubitrix.render costs nothing: each name below is imported
+# from its module, with pygame, the first time it is used, so tools that only simulate games never load either.
+#
+#     from Qubitrix import render
+#     render.global_render(screen, game, font_small, font_large, ui_color_id)
+#
+# Names that set_render_height() changes, like WINDOW_HEIGHT, are looked up again every time they are read.
+
+EXPORTS = {
+    "board": ("WINDOW_WIDTH", "WINDOW_HEIGHT", "COLORS", "BACKGROUND_COLORS", "UI_COLORS", "PIECE_COLOR_COUNT", "Y_CAMERA_DISTANCE",
+              "set_render_height", "screen_coordinates", "render_cubes", "global_render", "draw_debug_overlay"),
+    "level_of_detail": ("DetailGovernor", "FULL_DETAIL", "FLAT_SHADING", "NO_SECLUDED_MARKERS", "SIMPLE_PREVIEWS", "CIRCLES"),
+    "particles": ("ParticleSystem",),
+    "pipeline": ("FrameSnapshot", "SimulationThread"),
+    "scaling": ("ScaledDisplay",),
+    "spectator_wall": ("SpectatorWall",),
+}
+MODULES = {name: module for module, names in EXPORTS.items() for name in names}
+
+def __getattr__(name):
+    if name not in MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__name__}.{MODULES[name]}"), name)
+
+def __dir__():
+    return sorted(list(globals()) + list(MODULES))
@@ -0,0 +1,392 @@
+import math
+from copy import deepcopy
+
+import pygame
+
+from Qubitrix.engine import (WIDTH, DEPTH, HEIGHT, NEXT_PIECE_COUNT, MULT_BUFFER_SIZE, GAME_OVER_SCREEN_ANIM_TIME, MAXIMUM_SELECTABLE_LEVEL,
+                             SELECTABLE_LEVEL_GRID_WIDTH, STAGE_LENGTH, get_level_requirement)
+from Qubitrix.render.level_of_detail import FULL_DETAIL, FLAT_SHADING, NO_SECLUDED_MARKERS, SIMPLE_PREVIEWS, CIRCLES
+
+# Qubitrix - Board Rendering Module
+# Draws a game: the grid and its cubes, the pieces, the UI around them and the home, pause and game over screens.
+# Everything here only reads the game it is given, which can be a Game or a render.pipeline.FrameSnapshot of one.
+
+WINDOW_WIDTH, WINDOW_HEIGHT = 960, 720 # the resolution everything is drawn at, which the window is scaled from (see set_render_height and render.scaling)
+ASPECT_RATIO = WINDOW_WIDTH/WINDOW_HEIGHT
+DEPTH_LEVEL = 0.6 * max(WIDTH, DEPTH) # lower value makes depth stronger
+PIECE_COLOR_COUNT = 8 # COLORS 1-8 are for pieces, larger piece sets reuse them in turn
+COLORS = [(0, 0, 0), (200, 40, 20), (220, 120, 40), (220, 240, 60), (60, 220, 40), (20, 180, 220), (40, 80, 240), (100, 40, 220), (180, 20, 240), (120, 120, 120), (255, 160, 140), (10, 20, 30), (255, 255, 255), (255, 240, 180), (0, 0, 0)]
+Y_CAMERA_DISTANCE = HEIGHT*DEPTH_LEVEL*ASPECT_RATIO*1.55 # how far away the cubes appear to be
+BACKGROUND_COLORS = [tuple(COLORS[n][m]*0.35+40 for m in range(3)) for n in range(10)]
+UI_COLORS = [tuple(COLORS[n][m]*0.2+20 for m in range(3)) for n in (0, 2, 1, 4, 3, 6, 5, 8, 7, 9)] # nearby colors are swapped
+CUBE_VERTEX_OFFSET = 0.46 # the size of the cube divided by 2
+GHOST_BORDER_WIDTH = max(int(WINDOW_HEIGHT/360), 1) # width of ghost pieces' and secluded spaces' borders
+RENDER_CUBES = True # otherwise renders circles as a placeholder (see also render.level_of_detail, which switches to them when frames run long)
+RENDER_CENTERS = False # used for determining what a piece is rotating around
+SHADED_COLOR_CACHE_SIZE = 4096 # how many shaded colors get_color keeps before starting over
+PAINTER_ORDER_CLEARANCE = 8 # how many planes above the grid the cached drawing orders cover, for pieces that have not entered it yet
+PROJECTED_CUBE_CACHE_SIZE = 8192 # how many cubes get_projected_cube keeps before starting over, enough for every cell at the 4 resting rotations
+CUBE_SPRITE_CACHE_SIZE = 8192 # how many drawn cubes get_cube_sprite keeps before starting over
+
+painter_orders = {} # back-to-front cell orders for get_painter_order, keyed by which row of cells the camera is in along each axis
+painter_ranks = {} # each cell's position in those orders, for get_painter_ranks
+shaded_colors = {} # get_color results, shared by everything drawn (like every board of a spectator wall), see SHADED_COLOR_CACHE_SIZE
+projected_cubes = {} # get_projected_cube results, shared the same way, see PROJECTED_CUBE_CACHE_SIZE
+cube_sprites = {} # get_cube_sprite results, see CUBE_SPRITE_CACHE_SIZE
+
+def set_render_height(height):
+    """Changes the resolution everything is drawn at, keeping the aspect ratio. All layout is relative to it, so this has to happen before anything is drawn."""
+    global WINDOW_WIDTH, WINDOW_HEIGHT, GHOST_BORDER_WIDTH
+    WINDOW_WIDTH, WINDOW_HEIGHT = round(height*ASPECT_RATIO), height
+    GHOST_BORDER_WIDTH = max(int(WINDOW_HEIGHT/360), 1)
+    projected_cubes.clear() # they were projected at the old resolution
+    cube_sprites.clear()
+
+def draw_home_ui(screen, game, font_small, font_large):
+    title_text = font_large.render(("QUBITRIX"), False, COLORS[-3])
+    screen.blit(title_text, title_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT*0.2)))
+    for level in range(1, MAXIMUM_SELECTABLE_LEVEL+1):
+        x = WINDOW_WIDTH/2 - WINDOW_HEIGHT*SELECTABLE_LEVEL_GRID_WIDTH/20 + ((level-1)%SELECTABLE_LEVEL_GRID_WIDTH+0.1)*WINDOW_HEIGHT*0.1
+        y = (level-1)//SELECTABLE_LEVEL_GRID_WIDTH*WINDOW_HEIGHT*0.1 + WINDOW_HEIGHT*0.4
+        pygame.draw.rect(screen, UI_COLORS[min(math.ceil(level/STAGE_LENGTH), 9)] if (level != game.initial_level) else COLORS[-2], (x, y, WINDOW_HEIGHT*0.08, WINDOW_HEIGHT*0.08))
+        level_text = font_small.render(f"{level:02d}", False, COLORS[-3] if (level != game.initial_level) else UI_COLORS[min(math.ceil(level/STAGE_LENGTH), 9)])
+        level_text_rect = level_text.get_rect()
+        level_text_rect.center = (x+WINDOW_HEIGHT*0.042, y+WINDOW_HEIGHT*0.045)
+        screen.blit(level_text, level_text_rect)
+    if game.leaderboard:
+        high_scores_text = font_small.render("Best: " + "  ".join(f"{score:06d}" for score, _ in game.leaderboard[:3]), False, COLORS[-3])
+        screen.blit(high_scores_text, high_scores_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT*0.87)))
+
+def screen_coordinates(x, y, z):
+    return WINDOW_WIDTH/2+DEPTH_LEVEL*x*WINDOW_WIDTH/y, DEPTH_LEVEL*z*WINDOW_WIDTH/y
+
+def draw_game_backdrop(screen, rot, ui_color_id):
+    """
+    Draws the parts of the game UI that don't depend on how the game is going, only on the grid rotation and UI color:
+    the grid's bounding box, the panels either side of it and the empty level and score bars.
+    """
+    z_a = -0.5+(HEIGHT-1)/1.8
+    z_b = HEIGHT-0.5+(HEIGHT-1)/1.8
+    for border in (True, False): # draw border first, then solid polygons above it
+        floor_coordinates = []
+        for n in range(4):
+            corner_rot = n + rot
+            x_a = (WIDTH, DEPTH)[n%2]/2*math.cos(corner_rot*math.pi/2) + (DEPTH, WIDTH)[n%2]/2*math.sin(corner_rot*math.pi/2) # the positions of the four corners of each of the grid's outer faces
+            y_a = (DEPTH, WIDTH)[n%2]/2*math.cos(corner_rot*math.pi/2) - (WIDTH, DEPTH)[n%2]/2*math.sin(corner_rot*math.pi/2)+Y_CAMERA_DISTANCE
+            corner_rot += 1
+            x_b = (DEPTH, WIDTH)[n%2]/2*math.cos(corner_rot*math.pi/2) + (WIDTH, DEPTH)[n%2]/2*math.sin(corner_rot*math.pi/2)
+            y_b = (WIDTH, DEPTH)[n%2]/2*math.cos(corner_rot*math.pi/2) - (DEPTH, WIDTH)[n%2]/2*math.sin(corner_rot*math.pi/2)+Y_CAMERA_DISTANCE
+            if (screen_coordinates(x_a, y_a, z_a)[0] < screen_coordinates(x_b, y_b, z_a)[0]) or border: # only draw inner faces
+                pygame.draw.polygon(screen, get_color(ui_color_id, n%2, 0 if (0 < n < 3) else 7, rot, ui=True) if not border else COLORS[0], [ # bounding box, shading is inverted from the inside
+                    screen_coordinates(x_a, y_a, z_a), screen_coordinates(x_b, y_b, z_a),  screen_coordinates(x_b, y_b, z_b), screen_coordinates(x_a, y_a, z_b)], width = GHOST_BORDER_WIDTH*4 if border else 0)
+            floor_coordinates.append((x_a, y_a, z_b))
+        pygame.draw.polygon(screen, get_color(ui_color_id, 2, 0, rot, ui=True) if not border else COLORS[0], # render floor - closest vertex is irrelevant
+            [screen_coordinates(*floor_coordinates[0]), screen_coordinates(*floor_coordinates[1]), screen_coordinates(*floor_coordinates[2]), screen_coordinates(*floor_coordinates[3])], width = GHOST_BORDER_WIDTH*4 if border else 0)
+    # to do: fix the missing corners of the game grid's border
+    for border in (False, True): # border rendering for rects is on the inside for some reason
+        for side in range(2): # render the UI rectangles and borders on each side of the grid
+            pygame.draw.rect(screen, COLORS[0] if border else UI_COLORS[ui_color_id], (WINDOW_WIDTH/2+max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2*(1 if side == 0 else -1) + WINDOW_HEIGHT*(0.04 if side == 0 else -0.325), WINDOW_HEIGHT*0.04, WINDOW_HEIGHT*0.285, WINDOW_HEIGHT*0.92), width = GHOST_BORDER_WIDTH*2 if border else 0)
+    for (x_from_edge, y, width, height) in [(WINDOW_HEIGHT/5, WINDOW_HEIGHT*0.08, WINDOW_HEIGHT/36, WINDOW_HEIGHT*0.58), (WINDOW_HEIGHT/16, WINDOW_HEIGHT*0.77, WINDOW_HEIGHT*0.178, WINDOW_HEIGHT/36)]: # level, then score
+        pygame.draw.rect(screen, COLORS[9], (WINDOW_WIDTH/2+max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2+x_from_edge, y, width, height))
+
+def draw_game_ui(screen, game, font_small, font_large, ui_color_id, backdrop_drawn=False):
+    if not backdrop_drawn:
+        draw_game_backdrop(screen, game.visual_grid_rotation, ui_color_id)
+    level_progress = (game.plane_clear_level_progress-get_level_requirement(game.level-1))/(get_level_requirement(game.level)-get_level_requirement(game.level-1)) # proportion of plane clears gained towards the next level
+    for (x_from_edge, y, width, height) in [(WINDOW_HEIGHT/5, WINDOW_HEIGHT*0.08, WINDOW_HEIGHT/36, level_progress*WINDOW_HEIGHT*0.58), # how much of each bar is filled - level, then score
+        (WINDOW_HEIGHT/16, WINDOW_HEIGHT*0.77, WINDOW_HEIGHT*0.178*game.score_mult_buffer/MULT_BUFFER_SIZE, WINDOW_HEIGHT/36)]:
+        pygame.draw.rect(screen, COLORS[-3], (WINDOW_WIDTH/2+max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2+x_from_edge, y, width, height))
+    score_text = font_large.render(f"{math.floor(game.score):06d}", False, COLORS[-3])
+    screen.blit(score_text, (WINDOW_WIDTH/2+max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2+WINDOW_HEIGHT/16, WINDOW_HEIGHT*0.82))
+    level_text = font_small.render("Level " + str(game.level), False, COLORS[-3])
+    screen.blit(level_text, (WINDOW_WIDTH/2+max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2+WINDOW_HEIGHT/16, WINDOW_HEIGHT*0.9))
+    mult_text = font_small.render(f"x{game.score_multiplier:.3f}", False, COLORS[-2 if game.score_multiplier >= game.score_mult_cap else (-3 if (game.score_mult_buffer > 0) or (game.score_multiplier == 1.0) else -5)])
+    screen.blit(mult_text, (WINDOW_WIDTH/2+max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2+WINDOW_HEIGHT/16, WINDOW_HEIGHT*0.72))
+    for position, (category, stat) in list(enumerate((("Single clears:", str(game.total_plane_clear_types[0])), ("Double clears:", str(game.total_plane_clear_types[1])), ("Triple clears:", str(game.total_plane_clear_types[2])), ("Quad clears:", str(game.total_plane_clear_types[3])), 
+                                     ("Piece spins:", str(game.total_spins)), ("Spin singles:", str(game.total_spin_clear_types[0])), ("Spin doubles:", str(game.total_spin_clear_types[1])), ("Spin triples:", str(game.total_spin_clear_types[2]))))):
+        category_text = font_small.render(category, False, COLORS[-3])
+        category_text_rect = category_text.get_rect()
+        category_text_rect.topright = (WINDOW_WIDTH/2-max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2-WINDOW_HEIGHT/22, WINDOW_HEIGHT*(0.235+0.09*position))
+        screen.blit(category_text, category_text_rect)
+        stat_text = font_small.render(stat, False, COLORS[-2])
+        stat_text_rect = stat_text.get_rect()
+        stat_text_rect.topright = (WINDOW_WIDTH/2-max(WIDTH, DEPTH)*WINDOW_HEIGHT/HEIGHT/2-WINDOW_HEIGHT/22, WINDOW_HEIGHT*(0.285+0.09*position))
+        screen.blit(stat_text, stat_text_rect)
+
+def draw_pause_ui(screen, font_small):
+    paused_text = font_small.render(("Paused"), False, COLORS[-3])
+    screen.blit(paused_text, paused_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2)))
+
+def draw_finish_ui(screen, game, font_small, font_large, ui_color_id):
+    dropdown_depth = WINDOW_HEIGHT*(min((game.game_over_screen_time/GAME_OVER_SCREEN_ANIM_TIME)**2, 1)-1)
+    pygame.draw.rect(screen, UI_COLORS[ui_color_id], (0, dropdown_depth, WINDOW_WIDTH, WINDOW_HEIGHT))
+    game_over_text = font_large.render(("GAME OVER"), False, COLORS[-3])
+    screen.blit(game_over_text, game_over_text.get_rect(center=(WINDOW_WIDTH/2, dropdown_depth+WINDOW_HEIGHT*0.125)))
+    for position, (category, stat) in list(enumerate((("Final score:", str(int(game.score))), ("Final level:", str(game.level)), ("Planes cleared:", str(game.total_planes_cleared)), ("Best score mult.:", f"x{game.highest_score_multiplier:.3f}"),
+                                     ("Single clears:", str(game.total_plane_clear_types[0])), ("Double clears:", str(game.total_plane_clear_types[1])), ("Triple clears:", str(game.total_plane_clear_types[2])), ("Quad clears:", str(game.total_plane_clear_types[3])), 
+                                     ("Piece spins:", str(game.total_spins)), ("Spin singles:", str(game.total_spin_clear_types[0])), ("Spin doubles:", str(game.total_spin_clear_types[1])), ("Spin triples:", str(game.total_spin_clear_types[2]))))):
+        stat_category_text = font_small.render(category, False, COLORS[-3])
+        screen.blit(stat_category_text, (WINDOW_WIDTH*0.5-WINDOW_HEIGHT*0.5+(WINDOW_HEIGHT*0.5*(position%2)), dropdown_depth+WINDOW_HEIGHT*(0.21+0.05*(position//2))))
+        stat_text = font_small.render(stat, False, COLORS[-3])
+        screen.blit(stat_text, (WINDOW_WIDTH*0.5-WINDOW_HEIGHT*0.15+(WINDOW_HEIGHT*0.5*(position%2)), dropdown_depth+WINDOW_HEIGHT*(0.21+0.05*(position//2))))
+
+def get_color(id, face, closest_vertex, rot, ui=False):
+    key = (id, face, closest_vertex, rot, ui)
+    if key in shaded_colors:
+        return shaded_colors[key]
+    if len(shaded_colors) >= SHADED_COLOR_CACHE_SIZE: # the rotation takes many values while the grid turns, so start over now and then
+        shaded_colors.clear()
+    if ui:
+        r, g, b = UI_COLORS[id]
+    else:
+        r, g, b = COLORS[id]
+    r, g, b = (r/255)**0.5, (g/255)**0.5, (b/255)**0.5 # convert to relative brightness
+    match face:
+        case 0:
+            if closest_vertex in [4, 5, 6, 7]: # left face (before rotation)
+                shade = (rot-1)%4-2
+                r, g, b = r*(shade*0.6+1), g*(shade*0.4+1), b*(shade*0.2+1)
+            elif closest_vertex in [0, 1, 2, 3]: # right face (before rotation)
+                shade = (rot+1)%4-2
+                r, g, b = r*(shade*0.6+1), g*(shade*0.4+1), b*(shade*0.2+1)
+        case 1:
+            if closest_vertex in [2, 3, 6, 7]: # front face (before rotation)
+                shade = (rot-2)%4-2
+                r, g, b = r*(shade*0.6+1), g*(shade*0.4+1), b*(shade*0.2+1)
+            elif closest_vertex in [0, 1, 4, 5]: # back face (before rotation)
+                shade = (rot)%4-2
+                r, g, b = r*(shade*0.6+1), g*(shade*0.4+1), b*(shade*0.2+1)
+        case 2:
+            r, g, b = r*1.225, g*1.15, b*1.075
+    r, g, b = r**2*255, g**2*255, b**2*255 # convert back to absolute brightness
+    r, g, b = min(255, r), min(255, g), min(255, b) # cap the color values at 255
+    shaded_colors[key] = (r, g, b)
+    return r, g, b
+
+def get_painter_region(rot):
+    """Returns which row of cells the camera is in along each axis for a grid rotation, clamped to just outside the cells get_painter_order covers."""
+    camera = (Y_CAMERA_DISTANCE*math.sin(rot*math.pi/2)+(WIDTH-1)/2, -Y_CAMERA_DISTANCE*math.cos(rot*math.pi/2)+(DEPTH-1)/2, -(HEIGHT-1)/1.8) # in grid coordinates
+    return tuple(min(max(math.floor(camera[axis]+0.5), low-1), high+1) for axis, (low, high) in enumerate(((0, WIDTH-1), (0, DEPTH-1), (-PAINTER_ORDER_CLEARANCE, HEIGHT-1))))
+
+def get_painter_order(rot):
+    """
+    Returns every (x, y, z) cell of the grid, and of the space above it, in back-to-front drawing order for a grid rotation.
+    A cube can only hide cubes that are at least as far from the camera along every axis, so sorting cells by their
+    Manhattan distance from the camera gives a valid order. The order only changes when the camera moves into another
+    row of cells along some axis, so it is computed once per such region and cached. It is sorted by the distance from
+    the middle of the region rather than the camera itself, which avoids ties between cubes that can hide each other.
+    """
+    region = get_painter_region(rot)
+    if region not in painter_orders:
+        cells = [(x, y, z) for x in range(WIDTH) for y in range(DEPTH) for z in range(-PAINTER_ORDER_CLEARANCE, HEIGHT)]
+        painter_orders[region] = sorted(cells, key=lambda cell: -sum(abs(cell[axis]-region[axis]) for axis in range(3))) # furthest first
+    return painter_orders[region]
+
+def get_painter_ranks(rot):
+    """Returns each cell's position in get_painter_order(rot), so a few cubes can be sorted without scanning every cell."""
+    region = get_painter_region(rot)
+    if region not in painter_ranks:
+        painter_ranks[region] = {cell: rank for rank, cell in enumerate(get_painter_order(rot))}
+    return painter_ranks[region]
+
+def get_flat_colors():
+    """Returns a fixed color per face for every id, for drawing at FLAT_SHADING detail. The two sides are shaded differently so cubes stay distinguishable."""
+    return [[get_color(id, 0, 0, 1), get_color(id, 1, 0, 1.5), get_color(id, 2, 0, 0)] for id in range(len(COLORS))]
+
+FLAT_COLORS = get_flat_colors()
+
+def get_projected_cube(x, y, z, rot, next_pos, hold_position, secluded):
+    """
+    Returns how render_cubes draws a cube at (x, y, z), relative to the middle of the grid, as (its Manhattan distance
+    from the camera, the position of the camera relative to it along the grid's axes, the center and radius of the
+    circle drawn instead of it, its vertex closest to the camera, and the polygons of its faces facing the X, Y and Z
+    axes). None of this depends on which game the cube is in, so it is kept in projected_cubes and every game drawn at
+    the same size, like every board of a spectator wall, shares it.
+    """
+    key = (x, y, z, rot, next_pos, hold_position, secluded)
+    projection = projected_cubes.get(key)
+    if projection is not None:
+        return projection
+    if len(projected_cubes) >= PROJECTED_CUBE_CACHE_SIZE: # the rotation takes many values while the grid turns, so start over now and then
+        projected_cubes.clear()
+    x, y = x*math.cos(rot*math.pi/2)+y*math.sin(rot*math.pi/2), y*math.cos(rot*math.pi/2)-x*math.sin(rot*math.pi/2)+Y_CAMERA_DISTANCE
+    if next_pos > 0: # renders the next pieces at a given displacement
+        x += (max(WIDTH, DEPTH)*DEPTH_LEVEL*0.21+8.7) * (1 if not hold_position else -1) # draw the held piece at the other side of the UI
+        y += 25*DEPTH_LEVEL*ASPECT_RATIO/4*3
+        z += 4.7*next_pos-2.5
+    camera_offset = (y*math.sin(rot*math.pi/2)-x*math.cos(rot*math.pi/2), -x*math.sin(rot*math.pi/2)-y*math.cos(rot*math.pi/2), -z) # position of the camera relative to the cube, along the grid's axes
+    cube_vertices = []
+    vertex_distances = []
+    vertex_offset = CUBE_VERTEX_OFFSET/2 if secluded else CUBE_VERTEX_OFFSET # secluded cubes appear smaller to make perspective more clear
+    for a in (vertex_offset, -vertex_offset):
+        for b in (vertex_offset, -vertex_offset):
+            for c in (z+vertex_offset, z-vertex_offset): # to do: use itertools or something for this
+                vertex_x = x + (a*math.cos(rot*math.pi/2)+b*math.sin(rot*math.pi/2))
+                vertex_y = y + (b*math.cos(rot*math.pi/2)-a*math.sin(rot*math.pi/2))
+                cube_vertices.append((vertex_x, vertex_y, c))
+                vertex_distances.append(vertex_x**2+vertex_y**2+c**2) # squared distance
+    closest_vertex = vertex_distances.index(min(vertex_distances))
+    near_vertices = [closest_vertex^1, closest_vertex^2, closest_vertex^4] # XOR with 1, 2, 4 to get the nearby vertices
+    far_vertices = [closest_vertex^6, closest_vertex^5, closest_vertex^3] # XOR with 6, 5, 3 to get the vertices further away (but not polar opposites)
+    polygons = [[screen_coordinates(*cube_vertices[vertex]) for vertex in [closest_vertex, near_vertices[[0, 0, 1][m]], far_vertices[[2, 1, 0][m]], near_vertices[[1, 2, 2][m]]]]
+                if abs(camera_offset[m]) > vertex_offset else None for m in range(3)] # None where the camera is level with the face or behind it, so it is hidden by the other two
+    projection = projected_cubes[key] = (-sum(abs(offset) for offset in camera_offset), camera_offset, screen_coordinates(x, y, z), DEPTH_LEVEL*CUBE_VERTEX_OFFSET*WINDOW_WIDTH/y, closest_vertex, polygons)
+    return projection
+
+def get_cube_sprite(screen, x, y, z, rot, next_pos, hold_position, color_id, detail):
+    """
+    Returns a surface with the faces of a solid cube drawn on it as render_cubes would draw them on screen, and where
+    to blit it. The faces are drawn at a whole number of pixels from where they would be, so blitting the sprite sets
+    exactly the pixels drawing them would. Like get_projected_cube's, the sprites are shared by every game drawn at the
+    same size, so a settled cube is drawn once and then only copied, see CUBE_SPRITE_CACHE_SIZE.
+    """
+    flat = detail >= FLAT_SHADING
+    key = (x, y, z, rot, next_pos, hold_position, color_id, flat)
+    cached = cube_sprites.get(key)
+    if cached is not None:
+        return cached
+    if len(cube_sprites) >= CUBE_SPRITE_CACHE_SIZE:
+        cube_sprites.clear()
+    _, _, _, _, closest_vertex, polygons = get_projected_cube(x, y, z, rot, next_pos, hold_position, False)
+    faces = [(FLAT_COLORS[color_id][face] if flat else get_color(color_id, face, closest_vertex, rot), polygon) for face, polygon in enumerate(polygons) if polygon is not None]
+    points = [point for _, polygon in faces for point in polygon]
+    left, top = math.floor(min(x for x, _ in points))-1, math.floor(min(y for _, y in points))-1
+    sprite = pygame.Surface((math.ceil(max(x for x, _ in points))-left+2, math.ceil(max(y for _, y in points))-top+2), 0, screen)
+    transparent = next(color for color in ((0, 0, 0), (255, 0, 255), (0, 255, 0), (0, 0, 255)) if all(sprite.map_rgb(color) != sprite.map_rgb(face_color) for face_color, _ in faces))
+    sprite.fill(transparent)
+    for color, polygon in faces:
+        pygame.draw.polygon(sprite, color, [(x-left, y-top) for x, y in polygon])
+    sprite.set_colorkey(transparent, pygame.RLEACCEL)
+    cached = cube_sprites[key] = (sprite, (left, top))
+    return cached
+
+def render_cubes(screen, cubes_to_render, rot, next_pos=0, hold_position=False, ordered=False, detail=FULL_DETAIL): # ordered: the cubes are already back to front, see get_painter_order
+    projected = [(get_projected_cube(x, y, z, rot, next_pos, hold_position, id == -1), x, y, z, id) for x, y, z, id in cubes_to_render]
+    if not ordered:
+        projected = sorted(projected, key=lambda cube: cube[0][0]) # Manhattan distance from the camera, see get_painter_order
+    for (_, _, center, radius, closest_vertex, polygons), x, y, z, id in projected:
+        color_id = (id-1) % PIECE_COLOR_COUNT + 1 if id > 0 else id # piece sets with more than PIECE_COLOR_COUNT pieces reuse the colors
+        if not RENDER_CUBES or detail >= CIRCLES:
+            pygame.draw.circle(screen, COLORS[color_id], center, radius, width=GHOST_BORDER_WIDTH if id < 0 else 0) # in case drawing cubes gets unreasonably laggy, sized like the cube would be
+            continue
+        if id > 0:
+            sprite, position = get_cube_sprite(screen, x, y, z, rot, next_pos, hold_position, color_id, detail)
+            screen.blit(sprite, position)
+            continue
+        border_width = GHOST_BORDER_WIDTH*2 if id == -2 else GHOST_BORDER_WIDTH # fully grounded ghosts have thicker borders
+        for face in range(3):
+            if polygons[face] is not None:
+                pygame.draw.polygon(screen, COLORS[id], polygons[face], width=border_width) # draw edges and ignore shading if it is a ghost/secluded piece with a negative ID
+
+def get_grid_cells(game):
+    """Returns the (x, y, z, id) of every cube settled in the grid."""
+    return [(x, y, z, id) for x, plane in enumerate(game.grid) for y, column in enumerate(plane) for z, id in enumerate(column) if id > 0]
+
+def get_secluded_cells(game):
+    """Returns the (x, y, z, id) of every secluded space indicator in the grid."""
+    return [(x, y, z, id) for x, plane in enumerate(game.grid) for y, column in enumerate(plane) for z, id in enumerate(column) if id < 0]
+
+def get_ordered_cubes(game, piece, cells):
+    """
+    Returns the cubes to render for cells, a list of (x, y, z, id) grid cells, plus the cubes of a piece, in back-to-front order.
+    piece is (cubes, id) or None, and its cubes are drawn over any cell they share.
+    Returns None if the piece is outside the cells get_painter_order covers, in which case the cubes need sorting.
+    """
+    piece_cubes = {tuple(cube) for cube in piece[0]} if piece else set()
+    ranks = get_painter_ranks(game.visual_grid_rotation)
+    if any(cube not in ranks for cube in piece_cubes):
+        return None
+    cells = [cell for cell in cells if cell[:3] not in piece_cubes]+[(x, y, z, piece[1]) for x, y, z in piece_cubes]
+    cells.sort(key=lambda cell: ranks[cell[:3]])
+    return [[x-(WIDTH-1)/2, y-(DEPTH-1)/2, z+(HEIGHT-1)/1.8, id] for x, y, z, id in cells]
+
+def get_unordered_cubes(game, piece, cells):
+    """The same cubes as get_ordered_cubes(), in no particular order."""
+    cubes_to_render = [[x-(WIDTH-1)/2, y-(DEPTH-1)/2, z+(HEIGHT-1)/1.8, id] for x, y, z, id in cells]
+    if piece:
+        for x, y, z in piece[0]:
+            cubes_to_render.append([x-(WIDTH-1)/2, y-(DEPTH-1)/2, z+(HEIGHT-1)/1.8, piece[1]])
+    return cubes_to_render
+
+def render_grid_cubes(screen, game, piece, cells, detail=FULL_DETAIL):
+    cubes_to_render = get_ordered_cubes(game, piece, cells)
+    if cubes_to_render is not None:
+        render_cubes(screen, cubes_to_render, game.visual_grid_rotation, ordered=True, detail=detail)
+    else:
+        render_cubes(screen, get_unordered_cubes(game, piece, cells), game.visual_grid_rotation, detail=detail)
+
+def draw_game_grid(screen, game, detail=FULL_DETAIL):
+    render_grid_cubes(screen, game, (game.current_piece["cubes"], game.current_piece["id"]), get_grid_cells(game), detail)
+
+def draw_ghost_display(screen, game, detail=FULL_DETAIL):
+    if RENDER_CENTERS:
+        for n in range(len(game.current_piece["centers"])):
+            center_point = game.current_piece["centers"][n]
+            center_point = [center_point[0]-(WIDTH-1)/2, center_point[1]-(DEPTH-1)/2, center_point[2]+(HEIGHT-1)/1.8] # make this a list for item assignment
+            for axis in range(3):
+                center_marker_start = deepcopy(center_point)
+                center_marker_start[axis] -= CUBE_VERTEX_OFFSET/2
+                center_marker_start = [center_marker_start[0]*math.cos(game.visual_grid_rotation*math.pi/2)+center_marker_start[1]*math.sin(game.visual_grid_rotation*math.pi/2),
+                                    center_marker_start[1]*math.cos(game.visual_grid_rotation*math.pi/2)-center_marker_start[0]*math.sin(game.visual_grid_rotation*math.pi/2)+Y_CAMERA_DISTANCE,
+                                    center_marker_start[2]] # rotate the marker's ends relative to the grid's rotation
+                center_marker_end = deepcopy(center_point)
+                center_marker_end[axis] += CUBE_VERTEX_OFFSET/2
+                center_marker_end = [center_marker_end[0]*math.cos(game.visual_grid_rotation*math.pi/2)+center_marker_end[1]*math.sin(game.visual_grid_rotation*math.pi/2),
+                                    center_marker_end[1]*math.cos(game.visual_grid_rotation*math.pi/2)-center_marker_end[0]*math.sin(game.visual_grid_rotation*math.pi/2)+Y_CAMERA_DISTANCE,
+                                    center_marker_end[2]] # see above
+                pygame.draw.line(screen, COLORS[-2-n], screen_coordinates(*center_marker_start), screen_coordinates(*center_marker_end), GHOST_BORDER_WIDTH)
+    if detail < NO_SECLUDED_MARKERS:
+        render_grid_cubes(screen, game, None, get_secluded_cells(game), detail) # render secluded space indicators first, then the ghost piece always in front of it
+    if game.mode == "Playing":
+        render_grid_cubes(screen, game, (game.ghost_piece["cubes"], -2 if game.ghost_piece_grounded else -3), [], detail)
+
+def draw_next_pieces(screen, game, detail=FULL_DETAIL):
+    if detail >= SIMPLE_PREVIEWS:
+        detail = CIRCLES
+    for m in range(NEXT_PIECE_COUNT):
+        cubes_to_render = []
+        for n in game.next_pieces[m]["cubes"]:
+            x, y, z = n
+            cubes_to_render.append([x-(WIDTH-1)/2, y-(DEPTH-1)/2, z+(HEIGHT-1)/1.8, game.next_pieces[m]["id"]])
+        render_cubes(screen, cubes_to_render, game.visual_grid_rotation, next_pos=m+1, detail=detail)
+    cubes_to_render = []
+    if game.held_piece:
+        for n in game.held_piece["cubes"]:
+            x, y, z = n
+            cubes_to_render.append([x-(WIDTH-1)/2, y-(DEPTH-1)/2, z+(HEIGHT-1)/1.8, game.held_piece["id"]])
+        render_cubes(screen, cubes_to_render, game.visual_grid_rotation, next_pos=1, hold_position=True, detail=detail)
+
+def draw_particles(screen, game, font_small, detail=FULL_DETAIL):
+    if game.particles and detail < CIRCLES: # the lowest tier is for frames that can't afford anything extra
+        game.particles.draw(screen, game.visual_grid_rotation, screen_coordinates, font_small)
+
+def global_render(screen, game, font_small, font_large, ui_color_id, detail=FULL_DETAIL, backdrop_drawn=False):
+    """Draws a frame of game. backdrop_drawn skips draw_game_backdrop(), for screens it is already on, like a SpectatorWall's tiles."""
+    match game.mode:
+        case "Playing":
+            draw_game_ui(screen, game, font_small, font_large, ui_color_id, backdrop_drawn)
+            draw_game_grid(screen, game, detail)
+            draw_next_pieces(screen, game, detail)
+            draw_ghost_display(screen, game, detail)
+            draw_particles(screen, game, font_small, detail)
+        case "Paused":
+            draw_game_ui(screen, game, font_small, font_large, ui_color_id, backdrop_drawn)
+            draw_pause_ui(screen, font_small)
+        case "Finished":
+            draw_game_ui(screen, game, font_small, font_large, ui_color_id, backdrop_drawn)
+            draw_game_grid(screen, game, detail)
+            draw_next_pieces(screen, game, detail)
+            draw_ghost_display(screen, game, detail)
+            draw_particles(screen, game, font_small, detail)
+            if not game.rotate_modifier:
+                draw_finish_ui(screen, game, font_small, font_large, ui_color_id)
+        case "Home":
+            draw_home_ui(screen, game, font_small, font_large)
+
+def draw_debug_overlay(screen, font_small, lines):
+    for n, line in enumerate(lines):
+        text = font_small.render(line, False, COLORS[-3])
+        background = pygame.Surface(text.get_size())
+        background.set_alpha(160)
+        screen.blit(background, (WINDOW_HEIGHT*0.01, WINDOW_HEIGHT*(0.01+0.04*n)))
+        screen.blit(text, (WINDOW_HEIGHT*0.01, WINDOW_HEIGHT*(0.01+0.04*n)))
@@ -0,0 +1,67 @@
+from collections import deque
+
+# Qubitrix - Level of Detail Module
+# Drawing the cubes is by far the most expensive part of a frame, and on slow machines (or with a large custom board)
+# it can take longer than a frame lasts, which delays input handling along with everything else. The DetailGovernor
+# watches how long recent frames took to process against the frame budget and steps the renderer down through the
+# tiers below while it is falling behind, then back up once there is headroom again.
+#
+# Stepping up needs a longer run of fast frames than stepping down needs slow ones (hysteresis), otherwise a renderer
+# sitting right at the budget would flicker between two tiers every few frames.
+
+FULL_DETAIL = 0 # every face shaded by get_color()
+FLAT_SHADING = 1 # faces use precomputed colors that ignore the grid's rotation
+NO_SECLUDED_MARKERS = 2 # secluded spaces are not drawn
+SIMPLE_PREVIEWS = 3 # next and held pieces are drawn as circles
+CIRCLES = 4 # everything is drawn as circles
+DETAIL_TIER_NAMES = ("Full", "Flat shading", "No secluded markers", "Simple previews", "Circles")
+
+STEP_DOWN_FRAMES = 20 # how many recent frames are averaged to decide to step down
+STEP_UP_FRAMES = 120 # how many recent frames are averaged to decide to step back up
+STEP_DOWN_LOAD = 0.9 # step down when frames take longer than this fraction of the budget on average
+STEP_UP_LOAD = 0.5 # step up when frames take less than this fraction of the budget on average
+
+class DetailGovernor:
+    """
+    Picks the detail tier to render at from how long recent frames took to process.
+
+    Attributes:
+        tier: the current tier, from FULL_DETAIL to CIRCLES (higher is cheaper).
+        steps_down, steps_up: how many times the tier has been lowered and raised.
+        frame_times: the most recent frame times in seconds, newest last.
+    """
+    def __init__(self, frame_budget, tier=FULL_DETAIL, lowest_tier=CIRCLES):
+        self.frame_budget = frame_budget
+        self.tier = tier
+        self.lowest_tier = lowest_tier
+        self.steps_down = 0
+        self.steps_up = 0
+        self.frame_times = deque(maxlen=STEP_UP_FRAMES)
+
+    def record(self, frame_time):
+        """Records how long a frame took to process (excluding time spent waiting for the next one) and adjusts the tier."""
+        self.frame_times.append(frame_time)
+        if len(self.frame_times) >= STEP_DOWN_FRAMES and self.tier < self.lowest_tier:
+            recent = list(self.frame_times)[-STEP_DOWN_FRAMES:]
+            if sum(recent)/STEP_DOWN_FRAMES > self.frame_budget*STEP_DOWN_LOAD:
+                self.tier += 1
+                self.steps_down += 1
+                self.frame_times.clear() # judge the new tier on its own frames
+                return
+        if len(self.frame_times) == STEP_UP_FRAMES and self.tier > FULL_DETAIL:
+            if sum(self.frame_times)/STEP_UP_FRAMES < self.frame_budget*STEP_UP_LOAD:
+                self.tier -= 1
+                self.steps_up += 1
+                self.frame_times.clear()
+
+    def average_load(self):
+        """Returns the average frame time as a fraction of the budget, over the frames recorded since the last change."""
+        if not self.frame_times:
+            return 0.0
+        return sum(self.frame_times)/len(self.frame_times)/self.frame_budget
+
+    def describe(self):
+        """Returns lines of text describing the governor's state, for the debug overlay."""
+        return [f"Detail: {DETAIL_TIER_NAMES[self.tier]} ({self.tier}/{self.lowest_tier})",
+                f"Load: {self.average_load()*100:.0f}% of {self.frame_budget*1000:.1f}ms",
+                f"Steps down: {self.steps_down}  up: {self.steps_up}"]
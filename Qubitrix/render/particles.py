@@ -0,0 +1,212 @@
+import math
+
+import numpy as np
+import pygame
+
+# Qubitrix - Particles Module
+# Visual feedback for what happens to the pieces: cleared planes flash and dissolve into debris, placed pieces flash,
+# spinning pieces leave a swirl behind them, and the points each of these earns rise from where it happened.
+#
+# A plane clear can start thousands of particles at once, so they are not Python objects. ParticleSystem keeps them in
+# preallocated NumPy arrays, one per property (a struct of arrays), with the live particles packed at the front.
+# Spawning fills the next free slots, update() moves every particle in a few array operations and packs the survivors
+# together again, and draw() projects them all at once (render.board.screen_coordinates works on arrays as well as
+# numbers) and blends them into the frame's pixels through pygame.surfarray, without a draw call per particle.
+#
+# Particles live in the grid's coordinate space, centered the way render_cubes() centers cubes, so they turn with the
+# grid as it rotates. The game spawns them through the hooks below (see Game.particles); their randomness comes from
+# a generator of their own, so watching them never changes which pieces a game deals.
+
+DEFAULT_CAPACITY = 16384 # particles alive at once at most; more are dropped
+SPLAT_ARMS = ((-1, 0), (1, 0), (0, -1), (0, 1)) # pixels around the center covered by particles at least a pixel big
+DRAG = 1.5 # fraction of their speed particles lose per second
+GRAVITY = 9.0 # in cubes per second squared, towards the bottom of the grid
+WHITE = (255, 255, 255)
+
+PLANE_FLASH_PARTICLES = 6 # per cell of a cleared plane
+PLANE_FLASH_TIME = 0.15 # in seconds
+PLANE_DISSOLVE_PARTICLES = 24 # per cell of a cleared plane, doubled for spin clears
+PLANE_DISSOLVE_TIME = 0.9
+LOCK_FLASH_PARTICLES = 8 # per cube of a placed piece
+LOCK_FLASH_TIME = 0.12
+HARD_DROP_STREAK_PARTICLES = 10 # per cube of a hard dropped piece
+SPIN_TRAIL_PARTICLES = 24 # per cube of a spun piece
+SPIN_TRAIL_TIME = 0.45
+POPUP_TIME = 0.9 # how long score pop-ups stay up
+POPUP_RISE = 1.5 # in cubes per second
+
+class ParticleSystem:
+    """
+    Particles and score pop-ups for one game, see above.
+
+    Attributes:
+        count: how many particles are alive, in the first count slots of every array.
+        position, velocity: (capacity, 3) arrays in cubes and cubes per second.
+        color: (capacity, 3) array of RGB colors.
+        age, lifetime: (capacity,) arrays in seconds; particles fade out as their age reaches their lifetime.
+        size: (capacity,) array of radii in cubes.
+        gravity: (capacity,) array of how strongly gravity pulls each particle (0 for ones that stay put).
+        popups: [text, position, age, color, rendered surface or None] of each score pop-up.
+        dropped: how many particles couldn't be spawned because every slot was taken.
+    """
+    ARRAYS = ("position", "velocity", "color", "age", "lifetime", "size", "gravity")
+
+    def __init__(self, width, depth, height, camera_distance, palette, capacity=DEFAULT_CAPACITY, seed=None):
+        self.grid_offset = np.array([-(width-1)/2, -(depth-1)/2, (height-1)/1.8], np.float32) # from a cell to where render_cubes draws it
+        self.width, self.depth = width, depth
+        self.camera_distance = camera_distance
+        self.palette = np.array(palette, np.float32)
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 3), np.float32)
+        self.velocity = np.zeros((capacity, 3), np.float32)
+        self.color = np.zeros((capacity, 3), np.float32)
+        self.age = np.zeros(capacity, np.float32)
+        self.lifetime = np.ones(capacity, np.float32)
+        self.size = np.zeros(capacity, np.float32)
+        self.gravity = np.zeros(capacity, np.float32)
+        self.count = 0
+        self.popups = []
+        self.dropped = 0
+        self.random = np.random.default_rng(seed)
+
+    def get_colors(self, ids):
+        """Returns the colors render_cubes draws pieces with ids in."""
+        ids = np.asarray(ids)
+        return self.palette[(ids-1) % (len(self.palette)-1) + 1]
+
+    def spawn(self, position, velocity, lifetime, color, size, gravity=0.0):
+        """Starts particles at positions (an (n, 3) array); the other arguments are arrays of n or single values."""
+        n = min(len(position), self.capacity-self.count)
+        self.dropped += len(position)-n
+        live = slice(self.count, self.count+n)
+        self.position[live] = position[:n]
+        self.velocity[live] = velocity[:n] if np.ndim(velocity) == 2 else velocity
+        self.lifetime[live] = lifetime[:n] if np.ndim(lifetime) else lifetime
+        self.color[live] = color[:n] if np.ndim(color) == 2 else color
+        self.size[live] = size[:n] if np.ndim(size) else size
+        self.gravity[live] = gravity[:n] if np.ndim(gravity) else gravity
+        self.age[live] = 0
+        self.count += n
+
+    def update(self, dt):
+        """Moves every particle and pop-up dt seconds on and removes the ones that have faded out."""
+        n = self.count
+        if n:
+            velocity = self.velocity[:n]
+            velocity[:, 2] += self.gravity[:n]*(GRAVITY*dt)
+            velocity *= max(1-DRAG*dt, 0)
+            self.position[:n] += velocity*dt
+            self.age[:n] += dt
+            alive = self.age[:n] < self.lifetime[:n]
+            survivors = int(np.count_nonzero(alive))
+            if survivors < n: # pack the survivors at the front again
+                for name in self.ARRAYS:
+                    array = getattr(self, name)
+                    array[:survivors] = array[:n][alive]
+                self.count = survivors
+        for popup in self.popups:
+            popup[1][2] -= POPUP_RISE*dt
+            popup[2] += dt
+        self.popups = [popup for popup in self.popups if popup[2] < POPUP_TIME]
+
+    def snapshot(self):
+        """Returns a copy of the live particles and pop-ups, which can be drawn on another thread while this system moves on."""
+        copy = ParticleSystem.__new__(ParticleSystem)
+        copy.__dict__.update(self.__dict__)
+        for name in self.ARRAYS:
+            setattr(copy, name, getattr(self, name)[:self.count].copy())
+        copy.capacity = self.count
+        copy.popups = [[text, position.copy(), age, color, surface] for text, position, age, color, surface in self.popups]
+        return copy
+
+    def draw(self, screen, rot, project, font=None):
+        """
+        Blends the particles into screen, and blits the pop-ups if a font is given. rot is the grid's visual rotation and
+        project is render.board.screen_coordinates.
+        """
+        if self.count:
+            self.draw_particles(screen, rot, project)
+        if font is not None:
+            for popup in self.popups:
+                text, position, age, color, surface = popup
+                if surface is None:
+                    surface = popup[4] = font.render(text, False, color)
+                x, y, z = self.rotate(np.array([position]), rot)
+                screen_x, screen_y = project(x[0], y[0], z[0])
+                surface.set_alpha(int(255*min(1.0, 3*(1-age/POPUP_TIME))))
+                screen.blit(surface, surface.get_rect(center=(screen_x, screen_y)))
+
+    def rotate(self, position, rot):
+        """Returns the camera space x, y and z arrays of positions in the grid's space, like render_cubes() computes."""
+        cos, sin = math.cos(rot*math.pi/2), math.sin(rot*math.pi/2)
+        x, y, z = position[:, 0], position[:, 1], position[:, 2]
+        return x*cos + y*sin, y*cos - x*sin + self.camera_distance, z
+
+    def draw_particles(self, screen, rot, project):
+        n = self.count
+        x, y, z = self.rotate(self.position[:n], rot)
+        screen_x, screen_y = project(x, y, z)
+        big = project(x+self.size[:n], y, z)[0]-screen_x >= 1 # sizes shrink with distance like the cubes do
+        alpha = np.clip(1-self.age[:n]/self.lifetime[:n], 0, 1)
+        # every pixel any particle covers, as one flat list: each particle's center, then the arms of the big ones
+        pixel_x = np.concatenate([screen_x.astype(np.int32)] + [screen_x[big].astype(np.int32)+dx for dx, _ in SPLAT_ARMS])
+        pixel_y = np.concatenate([screen_y.astype(np.int32)] + [screen_y[big].astype(np.int32)+dy for _, dy in SPLAT_ARMS])
+        owner = np.concatenate([np.arange(n)] + [np.flatnonzero(big)]*len(SPLAT_ARMS))
+        width, height = screen.get_size()
+        inside = (pixel_x >= 0) & (pixel_x < width) & (pixel_y >= 0) & (pixel_y < height)
+        pixel_x, pixel_y, owner = pixel_x[inside], pixel_y[inside], owner[inside]
+        weight = alpha[owner]
+        shifts, masks = screen.get_shifts()[:3], screen.get_masks()[:3]
+        pixels = pygame.surfarray.pixels2d(screen) # locks screen until it is deleted
+        try:
+            below = pixels[pixel_x, pixel_y]
+            blended = below & ~np.array(sum(masks), pixels.dtype) # alpha or padding bits stay as they were
+            for channel, shift in enumerate(shifts): # the surface's own packing of red, green and blue
+                under = (below >> shift) & 0xFF
+                value = under + (self.color[owner, channel]-under)*weight
+                blended |= value.astype(pixels.dtype) << shift
+            pixels[pixel_x, pixel_y] = blended
+        finally:
+            del pixels
+
+    def scatter(self, cells, per_cell, jitter=0.5):
+        """Returns per_cell random positions around each of cells (an (m, 3) array of grid cells), cell by cell."""
+        centers = np.repeat(np.asarray(cells, np.float32) + self.grid_offset, per_cell, axis=0)
+        return centers + self.random.uniform(-jitter, jitter, centers.shape).astype(np.float32)
+
+    def popup(self, points, cell, color=WHITE):
+        """Shows points rising from a grid cell."""
+        if points >= 1:
+            self.popups.append([f"+{int(points)}", np.asarray(cell, np.float32) + self.grid_offset, 0.0, color, None])
+
+    def plane_cleared(self, z, ids, spin=False):
+        """A full plane at height z is being cleared; ids[x][y] are the pieces its cells held."""
+        cells = np.array([(x, y, z) for x in range(self.width) for y in range(self.depth)])
+        colors = self.get_colors([ids[x][y] for x, y, _ in cells])
+        self.spawn(self.scatter(cells, PLANE_FLASH_PARTICLES, 0.45), 0.0, PLANE_FLASH_TIME, WHITE, 0.4)
+        per_cell = PLANE_DISSOLVE_PARTICLES*(2 if spin else 1)
+        position = self.scatter(cells, per_cell, 0.45)
+        outwards = position - np.array([0, 0, z+self.grid_offset[2]], np.float32)
+        outwards[:, 2] = 0
+        velocity = outwards*self.random.uniform(1.0, 3.0, (len(position), 1)).astype(np.float32)
+        velocity[:, 2] = self.random.uniform(-4.0, -1.0, len(position)) # thrown up first
+        self.spawn(position, velocity, self.random.uniform(0.5, 1.0, len(position))*PLANE_DISSOLVE_TIME, np.repeat(colors, per_cell, axis=0),
+                   self.random.uniform(0.05, 0.12, len(position)), 1.0)
+
+    def piece_locked(self, cubes, piece_id, hard=False):
+        """A piece was placed, in cubes."""
+        cubes = [cube for cube in cubes if cube[2] >= 0] or cubes
+        position = self.scatter(cubes, LOCK_FLASH_PARTICLES, 0.45)
+        self.spawn(position, 0.0, LOCK_FLASH_TIME, (self.get_colors(piece_id)+WHITE)/2, 0.3)
+        if hard:
+            position = self.scatter(cubes, HARD_DROP_STREAK_PARTICLES, 0.4)
+            position[:, 2] -= self.random.uniform(0.5, 2.5, len(position)) # above the piece, falling after it
+            self.spawn(position, np.array([0, 0, 8.0], np.float32), 0.2, WHITE, 0.06)
+
+    def piece_spun(self, cubes, center, piece_id, points=0):
+        """A piece was spun into cubes around center."""
+        position = self.scatter(cubes, SPIN_TRAIL_PARTICLES, 0.5)
+        around = position - (np.asarray(center, np.float32) + self.grid_offset)
+        velocity = np.stack([-around[:, 1], around[:, 0], np.full(len(position), -0.5, np.float32)], axis=1)*3 # around the vertical axis
+        self.spawn(position, velocity, self.random.uniform(0.5, 1.0, len(position))*SPIN_TRAIL_TIME, (self.get_colors(piece_id)+WHITE)/2, 0.08)
+        self.popup(points, center)
@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+# Qubitrix - Render Pipeline Module
+# By default main() reads inputs, ticks the game and renders the frame one after another, so a slow frame also delays
+# the next tick and the inputs after it. With --threaded, the game runs on a SimulationThread instead, ticking at a
+# fixed rate, and the main thread only renders. Much of rendering happens inside pygame's C drawing calls, which let go
+# of the GIL, so on machines with more than one core the next tick runs while the current frame is being drawn.
+#
+# The two threads never share the Game. After every tick the simulation thread captures what rendering needs into a
+# FrameSnapshot: tuples, read-only piece mappings and a copy of the particles, none of which change once made. It then
+# publishes the snapshot by replacing SimulationThread.latest. Replacing an attribute is atomic, so the main thread
+# always reads a whole snapshot without locking anything, and it can hold on to one for as long as drawing takes. A
+# FrameSnapshot has the same attributes the draw functions read from a Game, so they draw either one.
+#
+# Inputs go the other way. SDL only delivers events to the main thread, so main() forwards the game's events to the
+# simulation thread with send(), and each tick handles everything sent since the last one.
+
+MAX_LAG = 0.25 # in seconds; a simulation further behind than this stops catching up and drops the missed ticks
+
+def freeze_piece(piece):
+    """Returns a read-only copy of a piece dictionary, with its cubes and centers as tuples."""
+    if not piece:
+        return MappingProxyType({})
+    return MappingProxyType({key: tuple(tuple(point) for point in value) if key in ("cubes", "centers") else value for key, value in piece.items()})
+
+class FrameSnapshot(namedtuple("FrameSnapshot", (
+        "frame", "mode", "rotate_modifier", "visual_grid_rotation", "initial_level", "leaderboard", "grid", "current_piece", "ghost_piece",
+        "ghost_piece_grounded", "held_piece", "next_pieces", "level", "score", "score_multiplier", "score_mult_cap", "score_mult_buffer",
+        "highest_score_multiplier", "plane_clear_level_progress", "total_planes_cleared", "total_plane_clear_types", "total_spins",
+        "total_spin_clear_types", "game_over_screen_time", "particles"))):
+    """
+    Everything the draw functions read from a Game, as it was after one tick. Nothing in it can change.
+
+    Attributes:
+        frame: the number of the tick it was captured after.
+        grid: Game.grid as nested tuples, indexed [x][y][z] like it.
+        current_piece, ghost_piece, held_piece: read-only piece dictionaries (see freeze_piece).
+        next_pieces: a tuple of them.
+        particles: a ParticleSystem.snapshot(), or None.
+        leaderboard, total_plane_clear_types, total_spin_clear_types: tuples.
+        The others are copies of the Game attributes with the same names. Before the first game starts, only frame,
+        mode, rotate_modifier, initial_level and leaderboard are set and the others are None.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def capture(cls, game, frame=0):
+        """Returns a snapshot of game. Call it on the thread that ticks the game, between ticks."""
+        values = dict(frame=frame, mode=game.mode, rotate_modifier=game.rotate_modifier, initial_level=game.initial_level,
+                      leaderboard=tuple(game.leaderboard), particles=game.particles.snapshot() if game.particles else None)
+        if hasattr(game, "grid"): # only once a game has started
+            values.update(visual_grid_rotation=game.visual_grid_rotation, grid=tuple(tuple(map(tuple, rows)) for rows in game.grid),
+                          current_piece=freeze_piece(game.current_piece), ghost_piece=freeze_piece(game.ghost_piece), ghost_piece_grounded=game.ghost_piece_grounded,
+                          held_piece=freeze_piece(game.held_piece), next_pieces=tuple(freeze_piece(piece) for piece in game.next_pieces),
+                          total_plane_clear_types=tuple(game.total_plane_clear_types), total_spin_clear_types=tuple(game.total_spin_clear_types),
+                          **{name: getattr(game, name) for name in ("level", "score", "score_multiplier", "score_mult_cap", "score_mult_buffer",
+                                                                    "highest_score_multiplier", "plane_clear_level_progress", "total_planes_cleared",
+                                                                    "total_spins", "game_over_screen_time")})
+        return cls(**{name: values.get(name) for name in cls._fields})
+
+class SimulationThread:
+    """
+    Runs a game's ticks on a thread of their own at a fixed rate, publishing a FrameSnapshot after each.
+
+    Attributes:
+        latest: the most recently published snapshot, or None before the first tick. It is replaced, never modified.
+        ticks: how many ticks have run.
+        dropped_ticks: ticks skipped because the simulation fell more than MAX_LAG behind.
+        busy: seconds spent ticking and capturing, in total.
+        error: the exception that stopped the thread, if one did.
+    """
+    def __init__(self, step, capture, rate):
+        """step(events) runs one tick with the events sent since the last, and capture(frame) returns its snapshot."""
+        self.step = step
+        self.capture = capture
+        self.period = 1/rate
+        self.latest = None
+        self.ticks = 0
+        self.dropped_ticks = 0
+        self.busy = 0.0
+        self.error = None
+        self.started = None
+        self.inputs = queue.SimpleQueue()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+
+    def send(self, events):
+        """Hands events to the next tick. Call it from the thread reading them."""
+        if events:
+            self.inputs.put(events)
+
+    def stop(self):
+        """Waits for the tick in progress to finish and stops ticking. Raises the exception that stopped the thread, if any."""
+        self.stopping.set()
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        try:
+            while not self.stopping.is_set():
+                start = time.perf_counter()
+                events = []
+                while True:
+                    try:
+                        events += self.inputs.get_nowait()
+                    except queue.Empty:
+                        break
+                self.step(events)
+                self.latest = self.capture(self.ticks) # publishes it
+                self.ticks += 1
+                now = time.perf_counter()
+                self.busy += now-start
+                next_tick += self.period
+                if next_tick < now-MAX_LAG:
+                    missed = int((now-next_tick)/self.period)
+                    self.dropped_ticks += missed
+                    next_tick += missed*self.period
+                self.stopping.wait(max(next_tick-now, 0))
+        except Exception as error:
+            self.error = error
+
+    def describe(self):
+        """Returns lines of text about how the simulation keeps up, for the debug overlay."""
+        ticks_per_second = self.ticks/(time.perf_counter()-self.started) if self.started else 0.0
+        return [f"Simulation: {ticks_per_second:.1f} ticks/s, {self.busy/max(self.ticks, 1)*1000:.2f}ms per tick, {self.dropped_ticks} dropped"]
@@ -0,0 +1,63 @@
+import pygame
+
+# Qubitrix - Scaling Module
+# The game is laid out and drawn at a fixed internal resolution (render.board.WINDOW_WIDTH x WINDOW_HEIGHT), on an
+# off-screen surface. ScaledDisplay owns the actual window, which can be any size and resized at any time, and scales
+# each finished frame to the largest area of the window with the same aspect ratio, filling the rest with the
+# background color. Drawing the cubes costs the same however large the window is; only the final scale grows with it.
+
+DESKTOP_FILL = 0.8 # the default window covers at most this fraction of the desktop in each direction
+
+def get_default_window_size(render_size):
+    """Returns the render size times the largest whole number that keeps the window within DESKTOP_FILL of the desktop."""
+    desktop_sizes = pygame.display.get_desktop_sizes() if pygame.display.get_init() else []
+    if not desktop_sizes:
+        return render_size
+    desktop_width, desktop_height = desktop_sizes[0]
+    factor = max(int(min(desktop_width*DESKTOP_FILL/render_size[0], desktop_height*DESKTOP_FILL/render_size[1])), 1)
+    return render_size[0]*factor, render_size[1]*factor
+
+def get_scaled_rect(render_size, window_size):
+    """Returns the largest pygame.Rect with the render size's aspect ratio that fits in the window, centered in it."""
+    scale = min(window_size[0]/render_size[0], window_size[1]/render_size[1])
+    width, height = max(round(render_size[0]*scale), 1), max(round(render_size[1]*scale), 1)
+    return pygame.Rect((window_size[0]-width)//2, (window_size[1]-height)//2, width, height)
+
+class ScaledDisplay:
+    """
+    A resizable window showing frames drawn at a fixed resolution.
+
+    Attributes:
+        surface: the off-screen surface to draw each frame on, at the render size.
+        window: the window's display surface.
+        rect: where in the window the scaled frame goes.
+        smooth: whether frames are scaled with pygame.transform.smoothscale (filtered) or pygame.transform.scale (faster).
+    """
+    def __init__(self, render_size, window_size=None, smooth=True, caption="Qubitrix"):
+        self.render_size = tuple(render_size)
+        self.smooth = smooth
+        self.window = pygame.display.set_mode(window_size or get_default_window_size(self.render_size), pygame.RESIZABLE)
+        pygame.display.set_caption(caption)
+        self.surface = pygame.Surface(self.render_size).convert()
+        self.resize()
+
+    def resize(self):
+        """Fits the frame to the window's current size. Call it when a VIDEORESIZE event arrives."""
+        self.window = pygame.display.get_surface()
+        self.rect = get_scaled_rect(self.render_size, self.window.get_size())
+        self.target = self.window.subsurface(self.rect) # frames are scaled straight into the window
+        self.borders = [pygame.Rect(0, 0, self.window.get_width(), self.rect.top), pygame.Rect(0, self.rect.bottom, self.window.get_width(), self.window.get_height()-self.rect.bottom),
+                        pygame.Rect(0, self.rect.top, self.rect.left, self.rect.height), pygame.Rect(self.rect.right, self.rect.top, self.window.get_width()-self.rect.right, self.rect.height)]
+
+    def present(self, border_color):
+        """Scales the frame drawn on surface into the window, fills the space around it and shows the result."""
+        for border in self.borders:
+            if border.width > 0 and border.height > 0:
+                self.window.fill(border_color, border)
+        if self.rect.size == self.render_size:
+            self.window.blit(self.surface, self.rect)
+        elif self.smooth:
+            pygame.transform.smoothscale(self.surface, self.rect.size, self.target)
+        else:
+            pygame.transform.scale(self.surface, self.rect.size, self.target)
+        pygame.display.update()
@@ -0,0 +1,153 @@
+import math
+import random
+
+import pygame
+
+from Qubitrix import engine
+from Qubitrix.render import board
+from Qubitrix.render.board import BACKGROUND_COLORS, draw_game_backdrop, global_render, set_render_height
+from Qubitrix.render.level_of_detail import FULL_DETAIL
+from Qubitrix.fonts import get_large_font, get_small_font
+
+# Qubitrix - Spectator Wall Module
+# Shows many games at once in one window, for events and bot tournaments. Each board is its own Game, driven by
+# anything with a `game` attribute and a step() method that plays one frame and returns the UI color id to draw it
+# with, like a replays.replay.Replay or an environments.bot.Bot.
+#
+# Every board is drawn at the same tile size straight into its own area of the wall, in one pass over the boards that
+# changed, so they all share the layout, painter orders and projected cubes (render.board.get_projected_cube), the
+# shaded colors (render.board.get_color), a cache of rendered text (CachedFont) and the backdrops of the resting grid
+# rotations (render.board.draw_game_backdrop). A board is only redrawn when get_board_key() says something visible has
+# changed, and every board that changed is redrawn in the frame it changed, at full detail.
+#
+# The games share Python's random module, which deals the pieces, so each board keeps its own random state and it is
+# swapped in while the board is stepped. The wall creates the boards itself, one after another, and each one continues
+# from the random state it was created with (a Replay seeds it with its log's seed), so replays stay identical to the
+# sessions they recorded.
+
+TEXT_CACHE_SIZE = 2048 # rendered texts kept per font before starting over
+
+class CachedFont:
+    """
+    Stands in for a pygame.font.Font, keeping what it renders. Boards show mostly the same labels and digits, so
+    across a wall of boards nearly every text is rendered once.
+    """
+    def __init__(self, font):
+        self.font = font
+        self.rendered = {}
+
+    def render(self, text, antialias, color):
+        key = (text, antialias, tuple(color))
+        surface = self.rendered.get(key)
+        if surface is None:
+            if len(self.rendered) >= TEXT_CACHE_SIZE:
+                self.rendered.clear()
+            surface = self.rendered[key] = self.font.render(text, antialias, color)
+        return surface
+
+    def size(self, text):
+        return self.font.size(text)
+
+def get_board_key(game, ui_color_id):
+    """
+    Returns everything global_render() draws a game from, so that two equal keys draw the same frame. Values that
+    change every frame but are drawn coarsely, like the multiplier bar draining, are kept only as precisely as they are
+    drawn, so that boards aren't redrawn for changes nobody could see.
+    """
+    key = (game.mode, ui_color_id, game.rotate_modifier, game.initial_level)
+    if game.mode == "Home":
+        return key
+    return key + (tuple(tuple(column) for plane in game.grid for column in plane), tuple(map(tuple, game.current_piece["cubes"])),
+                  game.held_piece.get("id"), tuple(piece["id"] for piece in game.next_pieces[:engine.NEXT_PIECE_COUNT]), game.visual_grid_rotation,
+                  math.floor(game.score), game.level, game.plane_clear_level_progress, f"{game.score_multiplier:.3f}", game.score_multiplier >= game.score_mult_cap,
+                  int(board.WINDOW_HEIGHT*0.178*game.score_mult_buffer/engine.MULT_BUFFER_SIZE), game.score_mult_buffer > 0, # the bar, as wide as draw_game_ui draws it (pygame truncates rects)
+                  min(game.game_over_screen_time, engine.GAME_OVER_SCREEN_ANIM_TIME), tuple(game.total_plane_clear_types), tuple(game.total_spin_clear_types), game.total_spins)
+
+class SpectatorWall:
+    """
+    A grid of boards drawn into one surface.
+
+    Attributes:
+        boards: the boards, each with a `game` and a step() method returning the UI color id of its frame, made by
+            calling each of the board_factories given.
+        size: the wall's size in pixels, columns tiles wide and rows tiles high.
+        surface: what the wall is drawn on.
+        tiles: the subsurface of surface each board is drawn into.
+        backdrops: {(UI color id, grid rotation): a tile with the background and draw_game_backdrop() drawn on it}, copied
+            under each board whose grid isn't turning.
+        stale: the indices of boards whose tile is out of date.
+        redraws, skips: how many boards were redrawn, and how many frames of a board needed no redraw.
+    """
+    def __init__(self, board_factories, columns=None, tile_height=270, detail=FULL_DETAIL):
+        shared_random_state = random.getstate()
+        self.boards = []
+        self.random_states = []
+        for make_board in board_factories:
+            self.boards.append(make_board())
+            self.random_states.append(random.getstate())
+        random.setstate(shared_random_state)
+        self.columns = columns or math.ceil(math.sqrt(len(self.boards)))
+        self.rows = math.ceil(len(self.boards)/self.columns)
+        set_render_height(tile_height) # every board is laid out at the tile size, see set_render_height
+        self.tile_size = (board.WINDOW_WIDTH, board.WINDOW_HEIGHT)
+        self.size = (self.tile_size[0]*self.columns, self.tile_size[1]*self.rows)
+        self.frame = 0
+        self.attach(pygame.Surface(self.size))
+        self.font_small = CachedFont(get_small_font(tile_height))
+        self.font_large = CachedFont(get_large_font(tile_height))
+        self.detail = detail
+        self.ui_color_ids = [0 for _ in self.boards]
+        self.keys = [None for _ in self.boards]
+        self.redraws = 0
+        self.skips = 0
+
+    def attach(self, surface):
+        """Draws the wall on surface from now on, like a ScaledDisplay's, which has to be at least as large as size. Every board is redrawn."""
+        self.surface = surface
+        self.backdrops = {} # made in the surface's pixel format
+        self.tiles = [surface.subsurface(((n % self.columns)*self.tile_size[0], (n // self.columns)*self.tile_size[1], *self.tile_size)) for n in range(len(self.boards))]
+        self.stale = set(range(len(self.boards)))
+
+    def step(self):
+        """Plays a frame of every board and notes which ones look different now."""
+        shared_random_state = random.getstate()
+        for n, player in enumerate(self.boards):
+            random.setstate(self.random_states[n])
+            self.ui_color_ids[n] = player.step()
+            self.random_states[n] = random.getstate()
+            key = get_board_key(player.game, self.ui_color_ids[n])
+            if key != self.keys[n]:
+                self.keys[n] = key
+                self.stale.add(n)
+            elif n not in self.stale:
+                self.skips += 1
+        random.setstate(shared_random_state)
+        self.frame += 1
+
+    def render(self):
+        """Redraws every board that changed since it was last drawn. Returns how many boards were redrawn."""
+        for n in sorted(self.stale):
+            self.draw_board(n)
+        redrawn = len(self.stale)
+        self.stale.clear()
+        self.redraws += redrawn
+        return redrawn
+
+    def get_backdrop(self, ui_color_id, rot):
+        backdrop = self.backdrops.get((ui_color_id, rot))
+        if backdrop is None:
+            backdrop = self.backdrops[(ui_color_id, rot)] = pygame.Surface(self.tile_size, 0, self.surface)
+            backdrop.fill(tuple(int(c) for c in BACKGROUND_COLORS[ui_color_id]))
+            draw_game_backdrop(backdrop, rot, ui_color_id)
+        return backdrop
+
+    def draw_board(self, n):
+        tile = self.tiles[n]
+        game = self.boards[n].game
+        ui_color_id = self.ui_color_ids[n]
+        backdrop_drawn = game.mode != "Home" and game.visual_grid_rotation == game.grid_rotation # the screens with a backdrop, while the grid rests in one of 4 positions
+        if backdrop_drawn:
+            tile.blit(self.get_backdrop(ui_color_id, game.grid_rotation), (0, 0))
+        else:
+            tile.fill(tuple(int(c) for c in BACKGROUND_COLORS[ui_color_id]))
+        global_render(tile, game, self.font_small, self.font_large, ui_color_id, self.detail, backdrop_drawn)
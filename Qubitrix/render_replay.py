@@ -0,0 +1,93 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # headless: frames are drawn to off-screen surfaces only
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+if __package__ in (None, ""): # run as a script from inside the Qubitrix folder, so import it as the package it is
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Qubitrix.fonts import get_large_font, get_small_font
+from Qubitrix.render.board import WINDOW_WIDTH, WINDOW_HEIGHT, BACKGROUND_COLORS, global_render
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+
+# Qubitrix - Replay Renderer
+# Turns a session recorded with `python qubitrix.py --record FILE` into a numbered PNG sequence for video editing:
+#
+#     python render_replay.py FILE output_folder --workers 8
+#
+# Simulating a replay is far cheaper than drawing it, so the whole replay is first simulated once without rendering,
+# taking a snapshot of the game every --chunk-frames frames. Each chunk is then rendered by a worker process that
+# restores the snapshot at its start, and each worker hands its frames to a writer thread through a bounded queue so
+# that encoding and writing PNGs overlaps with drawing the next frames.
+
+DEFAULT_CHUNK_FRAMES = 600 # 10 seconds at 60 FPS
+DEFAULT_QUEUE_SIZE = 16 # frames waiting to be written per worker, about 40MB at 960x720
+
+def frame_path(output_folder, frame):
+    return os.path.join(output_folder, f"frame_{frame:06d}.png")
+
+def write_frames(frame_queue):
+    """Saves (surface, path) pairs from the queue until it receives None."""
+    while (item := frame_queue.get()) is not None:
+        pygame.image.save(*item)
+
+def render_chunk(log_path, snapshot, end_frame, output_folder, queue_size=DEFAULT_QUEUE_SIZE):
+    """Renders the frames from the snapshot's frame up to (not including) end_frame. Runs in a worker process."""
+    pygame.init()
+    screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    font_small = get_small_font(WINDOW_HEIGHT)
+    font_large = get_large_font(WINDOW_HEIGHT)
+    replay = Replay.restore(InputLog.load(log_path), snapshot)
+    frame_queue = queue.Queue(maxsize=queue_size)
+    writer = threading.Thread(target=write_frames, args=(frame_queue,))
+    writer.start()
+    try:
+        while replay.frame < end_frame:
+            frame = replay.frame
+            ui_color_id = replay.step()
+            screen.fill(tuple(int(c) for c in BACKGROUND_COLORS[ui_color_id]))
+            global_render(screen, replay.game, font_small, font_large, ui_color_id)
+            frame_queue.put((screen.copy(), frame_path(output_folder, frame))) # blocks while the writer is behind
+    finally:
+        frame_queue.put(None)
+        writer.join()
+
+def take_snapshots(input_log, chunk_frames):
+    """Simulates the whole replay without rendering, returning a snapshot at the start of every chunk."""
+    replay = Replay(input_log)
+    snapshots = []
+    while not replay.finished():
+        if replay.frame % chunk_frames == 0:
+            snapshots.append(replay.snapshot())
+        replay.step()
+    return snapshots
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded Qubitrix session to a PNG sequence")
+    parser.add_argument("log", help="input log recorded with qubitrix.py --record")
+    parser.add_argument("output_folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of rendering processes (default: one per CPU)")
+    parser.add_argument("--chunk-frames", type=int, default=DEFAULT_CHUNK_FRAMES, help="frames rendered from each snapshot")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="frames each worker may have waiting to be written")
+    args = parser.parse_args()
+
+    input_log = InputLog.load(args.log)
+    os.makedirs(args.output_folder, exist_ok=True)
+    snapshots = take_snapshots(input_log, args.chunk_frames)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        chunks = [executor.submit(render_chunk, args.log, snapshot, min((n+1)*args.chunk_frames, input_log.frame_count), args.output_folder, args.queue_size)
+                  for n, snapshot in enumerate(snapshots)]
+        for chunk in chunks:
+            chunk.result() # re-raises any error from the workers
+    print(f"Rendered {input_log.frame_count} frames to {args.output_folder}")
+
+if __name__ == '__main__':
+    main()
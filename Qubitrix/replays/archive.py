@@ -0,0 +1,321 @@
+import contextlib
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from Qubitrix import engine
+from Qubitrix.controllers.abstract_controller import GameEvent
+from Qubitrix.engine import FPS, RULES_VERSION, WIDTH, DEPTH, HEIGHT
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+
+# Qubitrix - Replay Archive Module
+# Recorded sessions pile up quickly on a cabinet, and reading thousands of JSON input logs to learn how people play
+# means re-simulating every one of them. An archive keeps what happened in each game instead, in a compact binary form
+# that can be mapped into memory and scanned as NumPy arrays without parsing anything.
+#
+# An archive is a folder holding three append-only files, each starting with HEADER (magic bytes, format version,
+# RULES_VERSION, board size and the number of cubes per piece):
+#
+#     games.bin   one fixed-width GAME_DTYPE record per game: the session's seed, which game of the session it was, its
+#                 final result, and which events and inputs are its own. This is the index.
+#     events.bin  one fixed-width event record (see get_event_dtype) per placed piece, game after game.
+#     inputs.bin  one INPUT_DTYPE record per input the game handled, as a GameEvent, game after game.
+#
+# Frames (and the score of placements) are stored as differences from the previous record of the same game, which
+# keeps the records small; a gap longer than a frame_delta can hold is split by GAP records that only pass time.
+#
+# Events and inputs are appended before the game records pointing at them, so a write cut short leaves at most some
+# records no game points at, which are ignored and overwritten by the next append.
+#
+# The queries at the bottom reduce the mapped arrays in chunks of whole games, so memory use stays flat however many
+# games the archive holds. archive_replays.py builds archives from input logs and prints the queries.
+
+GAMES_MAGIC = b"QBXG"
+VERSION = 1
+HEADER = struct.Struct("<4sHHBBBB4x") # magic, format version, rules version, width, depth, height, cubes per piece
+GAMES_FILE = "games.bin"
+STREAMS = {"events": ("events.bin", b"QBXE", "first_event", "event_count"), "inputs": ("inputs.bin", b"QBXI", "first_input", "input_count")} # file, magic, GAME_DTYPE fields
+GAME_DTYPE = np.dtype([("seed", "<u8"), ("game", "<u2"), ("finished", "u1"), ("initial_level", "u1"), ("start_frame", "<u4"), ("frames", "<u4"),
+                       ("score", "<u8"), ("level", "<u2"), ("planes_cleared", "<u4"), ("plane_clear_types", "<u4", (4,)), ("spin_clear_types", "<u4", (3,)),
+                       ("spins", "<u4"), ("highest_multiplier", "<f4"), ("first_event", "<u8"), ("event_count", "<u4"), ("first_input", "<u8"), ("input_count", "<u4")])
+INPUT_DTYPE = np.dtype([("frame_delta", "<u2"), ("event", "u1")]) # event is a GameEvent's value
+GAP = 0 # the piece id of events that only pass time
+INPUT_GAP = 255 # the event of inputs that only pass time
+MAX_FRAME_DELTA = 2**16-1
+NO_CUBE = -128 # fills the cubes of pieces with fewer cubes than the archive has room for
+CHUNK_EVENTS = 2**20 # events reduced at once by the queries
+
+def get_event_dtype(cube_count):
+    return np.dtype([("frame_delta", "<u2"), ("piece", "u1"), ("planes", "u1"), ("spin", "u1"), ("level", "<u2"), ("multiplier", "<f4"),
+                     ("score_delta", "<u4"), ("cubes", "i1", (cube_count, 3))])
+
+def get_cube_count():
+    """Returns the cube count of the largest piece in the current piece set (see engine.use_piece_set)."""
+    return max(len(piece["cubes"]) for piece in engine.PIECES)
+
+class GameRecorder:
+    """
+    Collects the placements and inputs of the games played in one session, attached to a Game as its archive.
+
+    Attributes:
+        frame: the session's current frame, kept up to date by whoever steps the game.
+        games: (GAME_DTYPE record, event array, input array) for each game played so far; the arrays of the game being
+            played are only filled in by finish().
+    """
+    def __init__(self, seed, cube_count=None):
+        self.seed = seed
+        self.event_dtype = get_event_dtype(cube_count or get_cube_count())
+        self.frame = 0
+        self.games = []
+        self.events = None
+        self.inputs = None
+        self.last_frame = 0
+        self.last_input_frame = 0
+        self.last_score = 0
+
+    def start_game(self, game):
+        self.finish()
+        summary = np.zeros((), GAME_DTYPE)
+        summary["seed"], summary["game"], summary["initial_level"], summary["start_frame"] = self.seed, len(self.games), game.initial_level, self.frame
+        self.games.append((summary, None, None))
+        self.events = []
+        self.inputs = []
+        self.last_frame = self.last_input_frame = self.frame
+        self.last_score = 0
+        self.update(game)
+
+    def record_piece(self, game, piece_id, cubes, planes_cleared, spin):
+        """Records a placed piece with the game's state right after it was placed."""
+        cube_count = self.event_dtype["cubes"].shape[0]
+        frame_delta = self.frame - self.last_frame
+        while frame_delta > MAX_FRAME_DELTA:
+            self.events.append((MAX_FRAME_DELTA, GAP, 0, 0, game.level, game.score_multiplier, 0, [(NO_CUBE,)*3]*cube_count))
+            frame_delta -= MAX_FRAME_DELTA
+        score = int(game.score)
+        self.events.append((frame_delta, piece_id, planes_cleared, spin, game.level, game.score_multiplier, score-self.last_score,
+                            [tuple(cube) for cube in cubes] + [(NO_CUBE,)*3]*(cube_count-len(cubes))))
+        self.last_frame = self.frame
+        self.last_score = score
+        self.update(game)
+        self.games[-1][0]["finished"] = game.mode == "Finished"
+
+    def record_input(self, event):
+        """Records an input the game handled, a GameEvent."""
+        if self.inputs is None: # on the home screen, before the first game
+            return
+        frame_delta = self.frame - self.last_input_frame
+        while frame_delta > MAX_FRAME_DELTA:
+            self.inputs.append((MAX_FRAME_DELTA, INPUT_GAP))
+            frame_delta -= MAX_FRAME_DELTA
+        self.inputs.append((frame_delta, event.value))
+        self.last_input_frame = self.frame
+
+    def update(self, game):
+        summary = self.games[-1][0]
+        summary["frames"] = self.frame - summary["start_frame"]
+        summary["score"], summary["level"], summary["planes_cleared"] = int(game.score), game.level, game.total_planes_cleared
+        summary["plane_clear_types"], summary["spin_clear_types"] = game.total_plane_clear_types, game.total_spin_clear_types
+        summary["spins"], summary["highest_multiplier"] = game.total_spins, game.highest_score_multiplier
+
+    def finish(self, game=None):
+        """Closes the game being played, updating its result from game if it is still being played."""
+        if self.events is None:
+            return
+        if game is not None and game.mode == "Playing":
+            self.update(game)
+        summary = self.games[-1][0]
+        summary["event_count"], summary["input_count"] = len(self.events), len(self.inputs)
+        self.games[-1] = (summary, np.array(self.events, self.event_dtype), np.array(self.inputs, INPUT_DTYPE))
+        self.events = self.inputs = None
+
+def record_session(log_path, cube_count=None):
+    """Re-simulates a recorded session, returning the GameRecorder.games of every game played in it."""
+    input_log = InputLog.load(log_path)
+    replay = Replay(input_log)
+    replay.game.observation = None
+    recorder = GameRecorder(input_log.seed, cube_count)
+    replay.game.archive = recorder
+    while not replay.finished():
+        recorder.frame = replay.frame
+        replay.step()
+    recorder.frame = replay.frame
+    recorder.finish(replay.game)
+    return recorder.games
+
+def read_header(file, magic):
+    header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{file.name} is not a replay archive")
+    fields = HEADER.unpack(header)
+    if fields[0] != magic:
+        raise ValueError(f"{file.name} is not a replay archive")
+    if fields[1] != VERSION:
+        raise ValueError(f"Unsupported replay archive version {fields[1]}")
+    return fields[2:]
+
+def create_archive(path, cube_count=None):
+    """Creates an empty archive for games played with the current rules, board and piece set."""
+    os.makedirs(path, exist_ok=True)
+    for name, magic in ((GAMES_FILE, GAMES_MAGIC), *((name, magic) for name, magic, _, _ in STREAMS.values())):
+        with open(os.path.join(path, name), "xb") as file:
+            file.write(HEADER.pack(magic, VERSION, RULES_VERSION, WIDTH, DEPTH, HEIGHT, cube_count or get_cube_count()))
+
+def open_archive_files(path, mode, stack):
+    """
+    Opens the games file and the file of each stream in an ExitStack, checking that they belong together. Returns the
+    header's settings, the games file and {stream: file}.
+    """
+    games_file = stack.enter_context(open(os.path.join(path, GAMES_FILE), mode))
+    files = {stream: stack.enter_context(open(os.path.join(path, name), mode)) for stream, (name, _, _, _) in STREAMS.items()}
+    settings = read_header(games_file, GAMES_MAGIC)
+    for stream, (_, magic, _, _) in STREAMS.items():
+        if read_header(files[stream], magic) != settings:
+            raise ValueError(f"{path} has mismatched files")
+    return settings, games_file, files
+
+def append_games(path, games):
+    """
+    Appends games (GameRecorder.games) to an archive, creating it if needed. The games must have been played with the
+    rules and board the archive was created for.
+    """
+    if not os.path.exists(os.path.join(path, GAMES_FILE)):
+        create_archive(path, games[0][1].dtype["cubes"].shape[0] if games else None)
+    with contextlib.ExitStack() as stack:
+        settings, games_file, files = open_archive_files(path, "r+b", stack)
+        if settings[:4] != (RULES_VERSION, WIDTH, DEPTH, HEIGHT):
+            raise ValueError(f"{path} holds games played with other rules or another board size")
+        dtypes = {"events": get_event_dtype(settings[4]), "inputs": INPUT_DTYPE}
+        if any(events.dtype != dtypes["events"] for _, events, _ in games):
+            raise ValueError(f"{path} holds pieces of {settings[4]} cubes")
+        game_count = (os.fstat(games_file.fileno()).st_size - HEADER.size) // GAME_DTYPE.itemsize
+        last = None
+        if game_count:
+            games_file.seek(HEADER.size + (game_count-1)*GAME_DTYPE.itemsize)
+            last = np.frombuffer(games_file.read(GAME_DTYPE.itemsize), GAME_DTYPE)[0]
+        summaries = np.zeros(len(games), GAME_DTYPE)
+        for n, (summary, _, _) in enumerate(games):
+            summaries[n] = summary
+        for position, (stream, (_, _, first_field, count_field)) in enumerate(STREAMS.items(), 1):
+            file = files[stream]
+            count = int(last[first_field] + last[count_field]) if last is not None else 0
+            file.truncate(HEADER.size + count*dtypes[stream].itemsize) # records of a cut short append nothing points at
+            file.seek(0, os.SEEK_END)
+            for n, game in enumerate(games):
+                summaries[n][first_field] = count
+                count += len(game[position])
+                file.write(game[position].tobytes())
+            file.flush()
+            os.fsync(file.fileno()) # on disk before anything points at them
+        games_file.truncate(HEADER.size + game_count*GAME_DTYPE.itemsize) # drop any partial record
+        games_file.seek(0, os.SEEK_END)
+        games_file.write(summaries.tobytes())
+
+class ReplayArchive:
+    """
+    An archive mapped into memory for reading.
+
+    Attributes:
+        rules_version, width, depth, height: what the games were played with.
+        games: the GAME_DTYPE records of every game, a NumPy array backed by the mapped file.
+        events, inputs: the placements and the inputs of every game, NumPy arrays backed by the mapped files.
+    """
+    def __init__(self, path):
+        with contextlib.ExitStack() as stack:
+            settings, games_file, files = open_archive_files(path, "rb", stack)
+            self.rules_version, self.width, self.depth, self.height, cube_count = settings
+            dtypes = {"events": get_event_dtype(cube_count), "inputs": INPUT_DTYPE}
+            self.maps = [mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) for file in (games_file, *files.values())]
+        self.games = np.frombuffer(self.maps[0], GAME_DTYPE, (len(self.maps[0])-HEADER.size) // GAME_DTYPE.itemsize, HEADER.size)
+        for mapped, (stream, (_, _, first_field, count_field)) in zip(self.maps[1:], STREAMS.items()):
+            count = int(self.games[-1][first_field] + self.games[-1][count_field]) if len(self.games) else 0
+            setattr(self, stream, np.frombuffer(mapped, dtypes[stream], count, HEADER.size))
+
+    def chunks(self, max_records=CHUNK_EVENTS, stream="events"):
+        """Yields (games, their events or inputs) for runs of whole games of about max_records records at most."""
+        _, _, first_field, count_field = STREAMS[stream]
+        records = getattr(self, stream)
+        firsts = self.games[first_field]
+        ends = firsts + self.games[count_field]
+        start = 0
+        while start < len(self.games):
+            stop = max(int(np.searchsorted(ends, firsts[start] + max_records, "right")), start+1)
+            yield self.games[start:stop], records[int(firsts[start]):int(ends[stop-1])]
+            start = stop
+
+    def close(self):
+        """Unmaps the files, unless arrays taken from games, events or inputs are still in use; those keep them mapped until they are freed."""
+        self.games = self.events = self.inputs = None
+        for mapped in self.maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+        self.maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+def get_game_frames(games, events, stream="events"):
+    """Returns the frame of each event or input counted from the start of its game, for a chunk from ReplayArchive.chunks()."""
+    counts = games[STREAMS[stream][3]].astype(np.int64)
+    deltas = events["frame_delta"].astype(np.int64)
+    frames = np.cumsum(deltas)
+    starts = (np.cumsum(counts) - counts)[counts > 0]
+    return frames - np.repeat(frames[starts] - deltas[starts], counts[counts > 0])
+
+def placement_heatmap(archive):
+    """Returns how many cubes were placed in each cell, as an array indexed [x, y, z] like Game.grid."""
+    cells = archive.width*archive.depth*archive.height
+    counts = np.zeros(cells, np.int64)
+    for _, events in archive.chunks():
+        cubes = events["cubes"][events["piece"] != GAP].reshape(-1, 3).astype(np.int64)
+        cubes = cubes[(cubes[:, 0] != NO_CUBE) & (cubes[:, 2] >= 0)] # cubes left above the grid ended the game
+        counts += np.bincount((cubes[:, 0]*archive.depth + cubes[:, 1])*archive.height + cubes[:, 2], minlength=cells)
+    return counts.reshape(archive.width, archive.depth, archive.height)
+
+def clear_frequencies(archive):
+    """
+    Returns how many placements cleared 0, 1, 2, 3 and 4 or more planes, with and without a spin, at each level after
+    the placement, as an array indexed [level, spin, planes cleared].
+    """
+    counts = np.zeros(0, np.int64)
+    for _, events in archive.chunks():
+        events = events[events["piece"] != GAP]
+        keys = (events["level"].astype(np.int64)*2 + events["spin"])*5 + np.minimum(events["planes"], 4)
+        chunk_counts = np.bincount(keys)
+        if len(chunk_counts) > len(counts):
+            counts = np.pad(counts, (0, len(chunk_counts)-len(counts)))
+        counts[:len(chunk_counts)] += chunk_counts
+    return np.pad(counts, (0, -len(counts) % 10)).reshape(-1, 2, 5)
+
+def multiplier_curve(archive, bin_seconds=10):
+    """
+    Returns the average score multiplier right after placing a piece, and how many placements it averages, for each
+    bin_seconds long stretch of time since the start of the game.
+    """
+    totals = np.zeros(0)
+    counts = np.zeros(0, np.int64)
+    for games, events in archive.chunks():
+        bins = get_game_frames(games, events) // int(bin_seconds*FPS)
+        placed = events["piece"] != GAP
+        chunk_totals = np.bincount(bins[placed], weights=events["multiplier"][placed])
+        chunk_counts = np.bincount(bins[placed])
+        if len(chunk_counts) > len(counts):
+            totals = np.pad(totals, (0, len(chunk_counts)-len(totals)))
+            counts = np.pad(counts, (0, len(chunk_counts)-len(counts)))
+        totals[:len(chunk_totals)] += chunk_totals
+        counts[:len(chunk_counts)] += chunk_counts
+    return np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0), counts
+
+def input_counts(archive):
+    """Returns how many times each GameEvent was handled, as an array indexed by GameEvent value."""
+    counts = np.zeros(len(GameEvent), np.int64)
+    for _, inputs in archive.chunks(stream="inputs"):
+        counts += np.bincount(inputs["event"][inputs["event"] != INPUT_GAP], minlength=len(GameEvent))
+    return counts
@@ -0,0 +1,90 @@
+import json
+import pygame
+from pygame.locals import KEYDOWN, KEYUP
+
+# Qubitrix - Input Log Module
+# A recorded session is the random seed the piece bags were shuffled with plus every input the game loop received,
+# frame by frame. Keyboard inputs are stored as the KEYDOWN/KEYUP scancodes keyboard_input_check() reads, and a
+# controller is stored as the button and axis values controller_input_check() polls, only on frames where they changed.
+# Feeding these back through the same functions reproduces the session exactly (see replays.replay).
+
+INPUT_LOG_VERSION = 1
+
+class InputLog:
+    """
+    The inputs of one recorded session.
+
+    Attributes:
+        seed: the seed for Python's random module the session started with.
+        controller: whether a controller was connected.
+        frame_count: how many frames were recorded.
+        frames: {frame: {"keys": [[event type, scancode], ...], "controller": [[buttons...], [axes...]]}} for frames with inputs.
+    """
+    def __init__(self, seed, controller=False, frame_count=0, frames=None):
+        self.seed = seed
+        self.controller = controller
+        self.frame_count = frame_count
+        self.frames = frames if frames is not None else {}
+        self._last_controller_state = None
+
+    @staticmethod
+    def read_controller(controller):
+        """Returns the current button and axis values of a pygame joystick."""
+        return [[bool(controller.get_button(n)) for n in range(controller.get_numbuttons())],
+                [controller.get_axis(n) for n in range(controller.get_numaxes())]]
+
+    def record(self, events, controller_state=None):
+        """Records one frame's events, and the controller state read with read_controller() if one is connected."""
+        frame = {}
+        keys = [[event.type, event.dict["scancode"]] for event in events if event.type in (KEYDOWN, KEYUP)]
+        if keys:
+            frame["keys"] = keys
+        if controller_state is not None and controller_state != self._last_controller_state:
+            frame["controller"] = controller_state
+            self._last_controller_state = controller_state
+        if frame:
+            self.frames[self.frame_count] = frame
+        self.frame_count += 1
+
+    def events(self, frame):
+        """Returns the keyboard events of a frame as pygame events."""
+        return [pygame.event.Event(event_type, scancode=scancode) for event_type, scancode in self.frames.get(frame, {}).get("keys", ())]
+
+    def to_dict(self):
+        """Returns the log as a dictionary that can be saved as JSON."""
+        return {"version": INPUT_LOG_VERSION, "seed": self.seed, "controller": self.controller, "frame_count": self.frame_count,
+                "frames": [[frame, inputs] for frame, inputs in sorted(self.frames.items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data["version"] != INPUT_LOG_VERSION:
+            raise ValueError(f"Unsupported input log version {data['version']}")
+        return cls(data["seed"], data["controller"], data["frame_count"], {frame: inputs for frame, inputs in data["frames"]})
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+class ReplayController:
+    """Stands in for a pygame joystick, returning the button and axis values an InputLog recorded."""
+    def __init__(self, input_log):
+        self.input_log = input_log
+        self.buttons = []
+        self.axes = []
+
+    def set_frame(self, frame):
+        """Applies the controller values recorded on a frame, if they changed on it."""
+        state = self.input_log.frames.get(frame, {}).get("controller")
+        if state is not None:
+            self.buttons, self.axes = state
+
+    def get_button(self, button):
+        return self.buttons[button] if button < len(self.buttons) else False
+
+    def get_axis(self, axis):
+        return self.axes[axis] if axis < len(self.axes) else 0.0
@@ -0,0 +1,57 @@
+import pickle
+import random
+
+from Qubitrix.engine import Game, controller_bindings, controller_input_check, keyboard_input_check, global_tick, get_ui_color_id
+from Qubitrix.replays.input_log import ReplayController
+
+class Replay:
+    """
+    Re-simulates a recorded InputLog, processing each frame's inputs the same way main() does.
+    The game state can be snapshotted at any frame and restored later (for example in another process), so a long
+    replay can be split into chunks that are processed independently.
+    """
+    def __init__(self, input_log):
+        self.input_log = input_log
+        self.frame = 0
+        random.seed(input_log.seed)
+        self.game = Game()
+        self.controller = ReplayController(input_log) if input_log.controller else None
+        self.controller_button_states = [False for _ in range(len(controller_bindings))]
+        self.controller_analog_states = [False for _ in range(9)]
+
+    def step(self):
+        """
+        Processes the inputs and the tick of the next frame.
+        Returns the UI color id main() would have rendered the frame with, which is picked before the inputs are processed.
+        """
+        ui_color_id = get_ui_color_id(self.game)
+        if self.controller:
+            self.controller.set_frame(self.frame)
+            controller_input_check(self.controller, self.controller_button_states, self.controller_analog_states, self.game)
+        for event in self.input_log.events(self.frame):
+            keyboard_input_check(event, self.game)
+        global_tick(self.game)
+        self.frame += 1
+        return ui_color_id
+
+    def finished(self):
+        return self.frame >= self.input_log.frame_count
+
+    def snapshot(self):
+        """Returns the replay's state at the current frame as bytes that restore() accepts."""
+        controller_state = (self.controller.buttons, self.controller.axes) if self.controller else None
+        return pickle.dumps((self.frame, self.game, random.getstate(), self.controller_button_states, self.controller_analog_states, controller_state))
+
+    @classmethod
+    def restore(cls, input_log, snapshot):
+        """Creates a replay of input_log continuing from a snapshot() of it."""
+        replay = cls.__new__(cls)
+        replay.input_log = input_log
+        replay.frame, replay.game, random_state, replay.controller_button_states, replay.controller_analog_states, controller_state = pickle.loads(snapshot)
+        random.setstate(random_state)
+        replay.game.init_sounds() # the sound cache is not part of the game's state
+        replay.controller = None
+        if controller_state is not None:
+            replay.controller = ReplayController(input_log)
+            replay.controller.buttons, replay.controller.axes = controller_state
+        return replay
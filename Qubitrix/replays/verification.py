@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+from Qubitrix.sounds import Effects
+
+# Qubitrix - Replay Verification Module
+# Checks scores submitted from other machines by re-simulating them. A submission is a recorded input log (see
+# replays.input_log, which includes the seed) plus the result it claims:
+#
+#     {"replay": {...InputLog.to_dict()...}, "claimed": {"score": 12500, "level": 7, "planes_cleared": 30, ...}}
+#
+# The replay is played through the same functions main() uses, without rendering, sound or observations, and the
+# final game's RESULT_FIELDS are compared with the claim. A claim must include REQUIRED_FIELDS, so a submission can't
+# be verified by claiming nothing; other fields left out of it are not checked.
+#
+# VerificationService spreads submissions over a pool of worker processes. At most queue_size submissions can be
+# waiting or running at once; submitting more blocks or is refused until one finishes, so a burst of submissions
+# can't pile up without limit. Each replay also has a time limit, checked while it is simulated, so a huge or
+# malicious log can't hold a worker for long. serve() puts the service behind an HTTP endpoint, which refuses request
+# bodies over max_body bytes before reading them.
+
+RESULT_FIELDS = ("score", "level", "planes_cleared", "plane_clear_types", "spin_clear_types", "piece_spins")
+REQUIRED_FIELDS = ("score",)
+MAX_SUBMISSION_BYTES = 16*2**20 # hours of recorded inputs take a few megabytes as JSON
+DEFAULT_TIME_LIMIT = 10.0 # in seconds of simulation per replay
+TIME_CHECK_INTERVAL = 1024 # frames simulated between checks of the time limit
+VERIFIED, MISMATCH, TIMEOUT, INVALID = "verified", "mismatch", "timeout", "invalid"
+
+def get_result(game):
+    """Returns the fields of a game's result that submissions claim, as JSON types."""
+    return {"score": int(game.score), "level": game.level, "planes_cleared": game.total_planes_cleared, "plane_clear_types": list(game.total_plane_clear_types),
+            "spin_clear_types": list(game.total_spin_clear_types), "piece_spins": game.total_spins}
+
+def initialize_worker():
+    """Makes a process simulate games without a sound device. Runs once in every worker process."""
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    Effects().silent = True
+
+def verify_submission(submission, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    Re-simulates a submission and compares its result with the claim. Runs in a worker process.
+
+    Returns:
+        {"verdict": VERIFIED, MISMATCH, TIMEOUT or INVALID, "frames": frames simulated, "seconds": time taken,
+         "result": the replay's actual result, "mismatches": the claimed fields that differ from it, "error": why it is INVALID}
+    """
+    start = time.perf_counter()
+    try:
+        input_log = InputLog.from_dict(submission["replay"])
+        claimed = submission["claimed"]
+        unknown_fields = set(claimed) - set(RESULT_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"unknown result fields: {', '.join(sorted(unknown_fields))}")
+        missing_fields = set(REQUIRED_FIELDS) - set(claimed)
+        if missing_fields:
+            raise ValueError(f"missing result fields: {', '.join(sorted(missing_fields))}")
+        replay = Replay(input_log)
+        replay.game.observation = None # nobody reads it here, and publishing it costs more than the rest of a tick
+        deadline = start + time_limit
+        while not replay.finished():
+            replay.step()
+            if replay.frame % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                return {"verdict": TIMEOUT, "frames": replay.frame, "seconds": time.perf_counter()-start}
+    except Exception as error: # whatever a malformed submission makes the game raise, it is the submission's fault
+        return {"verdict": INVALID, "error": f"{type(error).__name__}: {error}", "seconds": time.perf_counter()-start}
+    result = get_result(replay.game)
+    mismatches = sorted(field for field, value in claimed.items() if result[field] != value)
+    return {"verdict": MISMATCH if mismatches else VERIFIED, "frames": replay.frame, "seconds": time.perf_counter()-start, "result": result, "mismatches": mismatches}
+
+class VerificationService:
+    """
+    Verifies submissions on a pool of worker processes, with a limit on how many can be queued.
+
+    Attributes:
+        queue_size: how many submissions can be waiting or running at once.
+        time_limit: the seconds of simulation each replay gets before it is reported as TIMEOUT.
+        counts: {verdict: how many submissions got it}.
+    """
+    def __init__(self, workers=None, queue_size=None, time_limit=DEFAULT_TIME_LIMIT):
+        workers = workers or os.cpu_count()
+        self.queue_size = queue_size or 4*workers # enough to keep every worker busy between submissions
+        self.time_limit = time_limit
+        self.slots = threading.BoundedSemaphore(self.queue_size)
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=initialize_worker)
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+
+    def submit(self, submission, timeout=None):
+        """
+        Queues a submission, waiting up to timeout seconds (forever if None, not at all if 0) for room in the queue.
+        Returns a concurrent.futures.Future of verify_submission's report, or None if the queue stayed full.
+        """
+        acquired = self.slots.acquire(blocking=False) if timeout == 0 else self.slots.acquire(timeout=timeout)
+        if not acquired:
+            return None
+        future = self.executor.submit(verify_submission, submission, self.time_limit)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        self.slots.release()
+        if not future.cancelled() and future.exception() is None:
+            with self.counts_lock:
+                verdict = future.result()["verdict"]
+                self.counts[verdict] = self.counts.get(verdict, 0) + 1
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+def make_request_handler(service, queue_timeout, max_body=MAX_SUBMISSION_BYTES):
+    """
+    Returns a request handler class answering POST /verify with a submission's report and GET /stats with the verdict
+    counts. Submissions longer than max_body bytes are answered with 413 without being read.
+    """
+    class VerificationRequestHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body, headers=()):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for header in headers:
+                self.send_header(*header)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != "/stats":
+                return self.send_json(404, {"error": "not found"})
+            with service.counts_lock:
+                self.send_json(200, {"counts": dict(service.counts), "queue_size": service.queue_size})
+
+        def do_POST(self):
+            if self.path != "/verify":
+                return self.send_json(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                return self.send_json(400, {"verdict": INVALID, "error": "bad Content-Length"})
+            if not 0 <= length <= max_body:
+                self.close_connection = True # the body is left unread, so the connection can't be reused
+                return self.send_json(413, {"verdict": INVALID, "error": f"submissions are limited to {max_body} bytes"})
+            try:
+                submission = json.loads(self.rfile.read(length))
+            except ValueError as error:
+                return self.send_json(400, {"verdict": INVALID, "error": f"not JSON: {error}"})
+            future = service.submit(submission, timeout=queue_timeout)
+            if future is None: # the queue is full: tell the client to come back rather than holding the connection
+                return self.send_json(503, {"error": "busy"}, [("Retry-After", "1")])
+            self.send_json(200, future.result())
+
+        def log_message(self, format, *args):
+            pass # one line per submission would be most of the output
+
+    return VerificationRequestHandler
+
+def serve(service, host="127.0.0.1", port=8765, queue_timeout=1.0, max_body=MAX_SUBMISSION_BYTES):
+    """Serves the verification endpoint until interrupted. Each connection is handled on its own thread."""
+    server = ThreadingHTTPServer((host, port), make_request_handler(service, queue_timeout, max_body))
+    print(f"Verifying replays at http://{host}:{server.server_address[1]}/verify")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
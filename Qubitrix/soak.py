@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+
+import pygame
+from pygame.locals import QUIT
+
+if __package__ in (None, ""): # run as a script from inside the Qubitrix folder, so import it as the package it is
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Qubitrix.diagnostics.soak import DEFAULT_MAX_GROWTH, DEFAULT_WARMUP_HOURS, RandomPlayer, SoakMonitor, soak
+from Qubitrix.engine import FPS, WIDTH, DEPTH, HEIGHT, MAXIMUM_SELECTABLE_LEVEL
+from Qubitrix.environments.bot import Bot
+from Qubitrix.fonts import get_large_font, get_small_font
+from Qubitrix.render import board
+from Qubitrix.render.board import BACKGROUND_COLORS, COLORS, PIECE_COLOR_COUNT, Y_CAMERA_DISTANCE, global_render, set_render_height
+from Qubitrix.render.particles import ParticleSystem
+
+# Qubitrix - Soak Test
+# Plays game after game for as long as it is left running, drawing every frame like the game does, and tracks how the
+# process's memory grows (see diagnostics.soak). Each game starts at a high level so games end, and new ones start,
+# often. Frames aren't throttled, so an hour of play takes less than an hour.
+#
+#     python soak.py --hours 48 --report soak.json
+#     SDL_VIDEODRIVER=dummy python soak.py --player random --frames 200000
+#
+# The report is rewritten after every sample, so it survives the run being stopped (or crashing). The exit status is 1
+# if any memory series grew faster than --max-growth, so it can gate a build.
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Qubitrix unattended and report whether memory keeps growing")
+    parser.add_argument("--player", choices=("bot", "random"), default="bot", help="who plays: the bot, or random key presses (default: bot)")
+    parser.add_argument("--level", type=int, default=MAXIMUM_SELECTABLE_LEVEL//2, help=f"level each game starts at (default: {MAXIMUM_SELECTABLE_LEVEL//2})")
+    parser.add_argument("--hours", type=float, help="hours of play to soak for (default: until interrupted with Ctrl+C)")
+    parser.add_argument("--frames", type=int, help="frames to soak for, instead of --hours")
+    parser.add_argument("--sample-minutes", type=float, default=5, help="minutes of play between samples (default: 5)")
+    parser.add_argument("--max-growth", type=float, default=DEFAULT_MAX_GROWTH, metavar="MB", help=f"megabytes per hour of play a series may grow by before it is flagged (default: {DEFAULT_MAX_GROWTH})")
+    parser.add_argument("--warmup-minutes", type=float, default=DEFAULT_WARMUP_HOURS*60, help=f"minutes of play left out of the trends, while caches fill up (default: {DEFAULT_WARMUP_HOURS*60:.0f})")
+    parser.add_argument("--report", default="soak_report.json", metavar="FILE", help="where to save the report, as JSON (default: soak_report.json)")
+    parser.add_argument("--render-height", type=int, default=board.WINDOW_HEIGHT, metavar="PIXELS", help=f"height the game is drawn at (default: {board.WINDOW_HEIGHT})")
+    parser.add_argument("--no-trace", action="store_true", help="don't trace allocations with tracemalloc, which is faster but only tracks resident memory")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the pieces dealt and of the random player")
+    args = parser.parse_args()
+    frames = args.frames or (round(args.hours*3600*FPS) if args.hours else None)
+
+    pygame.init()
+    set_render_height(args.render_height)
+    screen = pygame.display.set_mode((board.WINDOW_WIDTH, board.WINDOW_HEIGHT))
+    pygame.display.set_caption("Qubitrix Soak Test")
+    font_small = get_small_font(board.WINDOW_HEIGHT)
+    font_large = get_large_font(board.WINDOW_HEIGHT)
+    random.seed(args.seed)
+    player = Bot(args.level, think_frames=1, sounds=True) if args.player == "bot" else RandomPlayer(args.level, args.seed) # both play their sounds, whose cache the soak test watches
+    player.game.particles = ParticleSystem(WIDTH, DEPTH, HEIGHT, Y_CAMERA_DISTANCE, COLORS[:PIECE_COLOR_COUNT+1])
+    monitor = SoakMonitor(args.max_growth, args.warmup_minutes/60, trace=not args.no_trace)
+
+    def draw(game, ui_color_id):
+        if pygame.event.peek(QUIT):
+            raise KeyboardInterrupt # ends the soak test like Ctrl+C does
+        pygame.event.pump()
+        screen.fill(tuple(int(c) for c in BACKGROUND_COLORS[ui_color_id]))
+        global_render(screen, game, font_small, font_large, ui_color_id)
+        pygame.display.flip()
+
+    def report(monitor):
+        print(*monitor.describe(), sep="\n", flush=True)
+        monitor.save(args.report)
+
+    soak(player, monitor, frames, max(round(args.sample_minutes*60*FPS), 1), draw, report)
+    flagged = monitor.get_flagged()
+    print(f"Growing too fast: {', '.join(flagged)}" if flagged else "Nothing grew too fast", f"(report saved to {args.report})")
+    monitor.close()
+    pygame.quit()
+    sys.exit(1 if flagged else 0)
+
+if __name__ == '__main__':
+    main()
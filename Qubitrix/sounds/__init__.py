@@ -1,4 +1,6 @@
+import hashlib
 import os
+from collections import OrderedDict
 from pygame import mixer
 
 # Qubitrix - Sound Effects Module
@@ -32,12 +34,41 @@ This improves performance by avoiding unnecessary loading of sounds that may nev
 call load_all_sounds to preload all sound effects at once, which can be useful for performance in some cases.
 
 These patterns help make the sound management system flexible, maintainable, and easy to use within the game code.   
+
+Memory budget and caches
+========================
+
+Decoded sounds are large (a second of CD quality audio is 176KB), so Effects can be given a memory_budget in bytes.
+The loaded sounds are kept in least recently used order and once they take more than the budget the least recently
+played ones are unloaded, to be loaded again the next time they are needed. The PINNED_SOUNDS, played on nearly every
+input, are never unloaded, and neither is a sound that is still playing.
+
+Loading a sound means decoding the WAV file and converting it to the format the mixer was opened with. With a
+cache_folder set, the converted samples are saved there the first time (keyed by the file and the mixer format), so
+later runs and reloads after unloading only read raw samples back. The asset bundle (see assets.bundle) is used before
+either, when it has the sound for the mixer's format.
+
+counts keeps how many sounds were loaded (and from where), found already loaded, and unloaded, for the debug overlay.
 """
 
 DEFAULT_MAXTIME = 100
+DEFAULT_CACHE_FOLDER = os.path.join(os.path.expanduser("~"), ".qubitrix", "sounds")
+PINNED_SOUNDS = ("move_piece", "move_piece_gold", "rotate_piece", "rotate_piece_gold", "lower_piece", "place_hard", "place_soft")
+
+def get_mixer_format():
+    """Returns the mixer's (frequency, sample format, channels), opening it with pygame's defaults if it isn't yet."""
+    if not mixer.get_init():
+        mixer.init()
+    return mixer.get_init()
+
+def get_cache_path(cache_folder, sound_file, mixer_format):
+    """Returns where the samples of sound_file converted for mixer_format are cached, which changes when the file does."""
+    stat = os.stat(sound_file)
+    key = hashlib.sha256(repr((os.path.abspath(sound_file), stat.st_size, stat.st_mtime_ns, tuple(mixer_format))).encode()).hexdigest()[:16]
+    return os.path.join(cache_folder, f"{os.path.basename(sound_file).rsplit('.', 1)[0]}-{key}.pcm")
 class Effect:
     """Represents a sound effect that knows how to play itself"""
-    def __init__(self, sound_file: str, loops:int= 0, maxtime:int= DEFAULT_MAXTIME, fade_ms:int = 0):
+    def __init__(self, sound_file: str, loops:int= 0, maxtime:int= DEFAULT_MAXTIME, fade_ms:int = 0, buffer=None):
         """
             Initialize the sound effect.
             Args:
@@ -45,11 +76,12 @@ class Effect:
                 loops (Optional): Number of times to loop the sound. Default is 0 (no looping).
                 maxtime (Optional): Maximum time in milliseconds to play the sound. Default is 100ms.
                 fade_ms (Optional): Fade in/out time in milliseconds. Default is 0ms.
+                buffer (Optional): Raw samples in the mixer's format to play instead of decoding sound_file, eg: from an asset bundle.
         """
-        if not mixer.get_init():
-            mixer.init()
+        frequency, size, channels = get_mixer_format()
         self.name = os.path.basename(sound_file).split('.')[0] # Extract name from file path
-        self.sound = mixer.Sound(sound_file)
+        self.sound = mixer.Sound(buffer=buffer) if buffer is not None else mixer.Sound(sound_file)
+        self.memory = round(self.sound.get_length()*frequency)*abs(size)//8*channels # bytes of samples held by the mixer
         self.loops = loops
         self.maxtime = maxtime
         self.fade_ms = fade_ms
@@ -66,7 +98,16 @@ class Effect:
                          loops if loops is not None else self.loops, 
                          maxtime if maxtime is not None else self.maxtime, 
                          fade_ms if fade_ms is not None else self.fade_ms)
-    
+
+class SilentEffect:
+    """Stands in for every sound effect while Effects is silent, so code that plays sounds runs without a mixer (a null object)"""
+    name = "silent"
+
+    def play(self, loops=None, maxtime=None, fade_ms=None):
+        pass
+
+SILENT_EFFECT = SilentEffect()
+
 class Effects:
     """
     Singleton class to manage sound effects
@@ -98,37 +139,123 @@ class Effects:
     def __init__(self):
         if 'sounds' in self.__dict__:
             return  # Already initialized
-        self.sounds = {}
+        self.sounds = OrderedDict() # least recently played first
         self.sounds_dir = os.path.dirname(__file__)
+        self.bundle = None # an assets.bundle.AssetBundle to take already decoded sounds from, if any
+        self.silent = False # when True no sounds are loaded or played and the mixer is never initialized, eg: for headless replay verification
+        self.memory_budget = None # bytes of samples to keep loaded at most, or None for no limit (see "Memory budget and caches" above)
+        self.pinned = set(PINNED_SOUNDS) # sounds that are never unloaded
+        self.cache_folder = None # a folder to cache converted samples in, eg: DEFAULT_CACHE_FOLDER, or None to decode every load
+        self.memory_used = 0
+        self.counts = {"loads": 0, "bundle loads": 0, "cache loads": 0, "hits": 0, "evictions": 0}
+
+    def _bundled_sound(self, name):
+        """
+        Returns the sound from the asset bundle, or None if there is no bundle or it doesn't have the sound decoded
+        for the mixer's current format.
+        """
+        if self.bundle is None:
+            return None
+        buffer = self.bundle.sound_buffer(name, get_mixer_format())
+        if buffer is None:
+            return None
+        self.counts["bundle loads"] += 1
+        return Effect(os.path.join(self.sounds_dir, f'{name}.wav'), buffer=buffer)
+
+    def _cached_sound(self, path):
+        """Returns the sound from the file at path, converting it and saving the samples to the cache folder unless they are there already."""
+        if self.cache_folder is None:
+            return Effect(path)
+        cache_path = get_cache_path(self.cache_folder, path, get_mixer_format())
+        try:
+            with open(cache_path, "rb") as file:
+                effect = Effect(path, buffer=file.read())
+            self.counts["cache loads"] += 1
+            return effect
+        except OSError:
+            pass
+        effect = Effect(path)
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(effect.sound.get_raw())
+            os.replace(temporary_path, cache_path) # whole or not at all, even with several games starting at once
+        except OSError:
+            pass # a read-only or full disk only costs decoding the sound again next time
+        return effect
+
+    def _add(self, name, effect):
+        self.sounds[name] = effect
+        self.memory_used += effect.memory
+        self.counts["loads"] += 1
+        if self.memory_budget is None:
+            return
+        for old_name in list(self.sounds):
+            if self.memory_used <= self.memory_budget:
+                break
+            old_effect = self.sounds[old_name]
+            if old_name in self.pinned or old_name == name or old_effect.sound.get_num_channels() > 0: # playing sounds stop when unloaded
+                continue
+            del self.sounds[old_name]
+            self.memory_used -= old_effect.memory
+            self.counts["evictions"] += 1
+
+    def sound_names(self):
+        """Returns the names of every sound that can be loaded."""
+        names = set(self.bundle.sounds) if self.bundle is not None else set()
+        return names | {fname.rsplit('.', 1)[0] for fname in os.listdir(self.sounds_dir) if fname.lower().endswith('.wav')}
 
     def load_all_sounds(self):
         """
-        Loads all .wav files in the directory into the cache.
+        Loads all .wav files in the directory into the cache, taking them from the asset bundle when possible. With a
+        memory budget, the pinned sounds are loaded first and the others only while there is room for them.
         """
-        for fname in os.listdir(self.sounds_dir):
-            if fname.lower().endswith('.wav'):
-                name = fname.rsplit('.', 1)[0]
-                if name not in self.sounds:
-                    path = os.path.join(self.sounds_dir, fname)
-                    self.sounds[name] = Effect(path)
+        if self.silent:
+            return
+        for name in sorted(self.sound_names(), key=lambda name: (name not in self.pinned, name)):
+            if self.memory_budget is not None and self.memory_used >= self.memory_budget and name not in self.pinned:
+                break
+            if name not in self.sounds:
+                self._load_sound(name)
 
     def _load_sound(self, name):
         """
         Loads a single sound by name if not already loaded.
         """
+        if effect := self._bundled_sound(name):
+            self._add(name, effect)
+            return effect
         fname = f'{name}.wav'
         path = os.path.join(self.sounds_dir, fname)
         if os.path.isfile(path):
-            self.sounds[name] = Effect(path)
-            return self.sounds[name]
+            effect = self._cached_sound(path)
+            self._add(name, effect)
+            return effect
         raise AttributeError(f"No sound effect named '{name}' found.")
 
+    def describe(self):
+        """Returns lines of text describing the sound cache, for the debug overlay."""
+        budget = f" of {self.memory_budget/2**20:.1f}MB" if self.memory_budget is not None else ""
+        return [f"Sounds: {len(self.sounds)} loaded, {self.memory_used/2**20:.1f}MB{budget}",
+                f"Sound loads: {self.counts['loads']}  hits: {self.counts['hits']}  evictions: {self.counts['evictions']}"]
 
     def __getitem__(self, key):  # Allows access to sound effects by name eg: Effects["my_named_effect"].play() - this has to be used with file names that start with a number.
-        return self._load_sound(key) if key not in self.sounds else self.sounds[key] # lazy load the sound if it is not already loaded
+        if self.silent:
+            return SILENT_EFFECT
+        effect = self.sounds.get(key)
+        if effect is None:
+            return self._load_sound(key) # lazy load the sound if it is not loaded
+        self.sounds.move_to_end(key) # the most recently played
+        self.counts["hits"] += 1
+        return effect
     
     def __getattr__(self, name): # Allows access to sound effects as attributes eg: Effects.my_named_effect.play()
+        if self.__dict__.get('silent'): # read through __dict__, as a missing attribute would call __getattr__ again
+            return SILENT_EFFECT
+        if 'sounds' not in self.__dict__ or name.startswith('__'): # not initialized yet, or Python looking for special methods
+            raise AttributeError(f"'Effects' object has no attribute '{name}'")
         try:
-            return self.sounds[name]
-        except KeyError:
+            return self[name] # loads the sound again if it was unloaded
+        except AttributeError:
             raise AttributeError(f"'Effects' object has no attribute '{name}'")
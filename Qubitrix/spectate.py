@@ -0,0 +1,79 @@
+import argparse
+import functools
+import os
+import sys
+import time
+
+import pygame
+from pygame.locals import QUIT
+
+if __package__ in (None, ""): # run as a script from inside the Qubitrix folder, so import it as the package it is
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Qubitrix.environments.bot import make_bot
+from Qubitrix.environments.placement_cache import PlacementCache
+from Qubitrix.engine import FPS
+from Qubitrix.render.board import BACKGROUND_COLORS
+from Qubitrix.render.level_of_detail import DetailGovernor
+from Qubitrix.render.scaling import ScaledDisplay
+from Qubitrix.render.spectator_wall import SpectatorWall
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+from Qubitrix.sounds import Effects
+
+# Qubitrix - Spectator Wall
+# Shows many games at once in one window (see render.spectator_wall), for events and bot tournaments: recorded
+# sessions, bots, or both.
+#
+#     python spectate.py --bots 16
+#     python spectate.py session1.json session2.json --bots 2 --tile-height 360
+#
+# Replays play once and then keep their last game on screen. Bots play forever, each dealt pieces from its own seed.
+# Sounds are off, since 16 games playing them at once is only noise. The window's title shows the frame rate and how
+# many boards were redrawn per frame; if the machine can't keep up its boards are drawn with less detail, as in the game.
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch many Qubitrix games at once")
+    parser.add_argument("replays", nargs="*", help="input logs recorded with qubitrix.py --record")
+    parser.add_argument("--bots", type=int, default=0, help="how many bot games to show (default: 16 when no replays are given)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first bot, the others use the following ones")
+    parser.add_argument("--columns", type=int, help="boards per row (default: as square a grid as possible)")
+    parser.add_argument("--tile-height", type=int, default=270, metavar="PIXELS", help="height each board is drawn at (default: 270)")
+    parser.add_argument("--window-size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="initial size of the window, which can be resized")
+    parser.add_argument("--placement-cache", metavar="PATH", help="file the bots share the placements they work out in, created if needed")
+    args = parser.parse_args()
+    bot_count = args.bots or (0 if args.replays else 16)
+
+    pygame.init()
+    Effects().silent = True
+    board_factories = [functools.partial(Replay, InputLog.load(path)) for path in args.replays]
+    cache = PlacementCache(args.placement_cache) if args.placement_cache else None
+    board_factories += [functools.partial(make_bot, args.seed+n, cache=cache) for n in range(bot_count)]
+    wall = SpectatorWall(board_factories, args.columns, args.tile_height)
+    display = ScaledDisplay(wall.size, args.window_size, caption="Qubitrix Spectator Wall")
+    wall.attach(display.surface)
+    background_color = tuple(int(c) for c in BACKGROUND_COLORS[0])
+    display.surface.fill(background_color) # under any tiles left empty in the last row
+    clock = pygame.time.Clock()
+    detail_governor = DetailGovernor(1/FPS)
+    redrawn = 0
+
+    while True:
+        frame_start = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.VIDEORESIZE:
+                display.resize()
+        wall.step()
+        wall.detail = detail_governor.tier
+        redrawn = wall.render()
+        display.present(background_color)
+        detail_governor.record(time.perf_counter()-frame_start)
+        if wall.frame % FPS == 0:
+            pygame.display.set_caption(f"Qubitrix Spectator Wall - {len(wall.boards)} boards, {clock.get_fps():.1f} FPS, {redrawn} redrawn")
+        clock.tick(FPS)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Qubitrix - Statistics Module
+# This module saves the result of every game, and what happened with every piece placed in it, to a local SQLite
+# database so that there can be a high score table and a play history.
+#
+# The game loop must never wait for the disk, so nothing here writes to the database directly. Instead each write is
+# put on a queue, and a background writer thread takes everything waiting on the queue and commits it as one
+# transaction (a "write-behind" cache). The leaderboard shown on the home screen is read once at startup and then kept
+# up to date in memory, so drawing it never queries the database either.
+#
+# SQLite assigns session ids, so several processes can share a database. The game can't wait for an insert to learn
+# one, so start_session() returns a key of its own instead, and the writer thread swaps in the real id as it writes.
+# Games still being played when the store is closed are given an end time but no final stats, which keeps them off
+# the leaderboard.
+
+DEFAULT_DATABASE_PATH = os.path.join(os.path.expanduser("~"), ".qubitrix", "stats.sqlite3")
+LEADERBOARD_SIZE = 10
+MAX_BATCH_SIZE = 1000 # writes committed per transaction at most
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    initial_level INTEGER NOT NULL,
+    final_score INTEGER,
+    final_level INTEGER,
+    planes_cleared INTEGER,
+    single_clears INTEGER, double_clears INTEGER, triple_clears INTEGER, quad_clears INTEGER,
+    piece_spins INTEGER,
+    spin_singles INTEGER, spin_doubles INTEGER, spin_triples INTEGER,
+    highest_score_multiplier REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (final_score DESC) WHERE ended_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS piece_events (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    placed_at REAL NOT NULL,
+    piece_id INTEGER NOT NULL,
+    planes_cleared INTEGER NOT NULL,
+    spin INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    score_multiplier REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS piece_events_by_session ON piece_events (session_id);
+"""
+
+class StatsStore:
+    """
+    Records games to a SQLite database in the background.
+
+    Attributes:
+        leaderboard: the best finished games, highest score first, as (final score, final level) tuples.
+        open_sessions: the keys of the sessions started but not ended yet.
+    """
+    def __init__(self, path=DEFAULT_DATABASE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False) # only the writer thread uses it after this
+        self.connection.executescript(SCHEMA)
+        self.leaderboard = self.connection.execute("SELECT final_score, final_level FROM sessions WHERE ended_at IS NOT NULL AND final_score IS NOT NULL ORDER BY final_score DESC LIMIT ?",
+                                                   (LEADERBOARD_SIZE,)).fetchall()
+        self.session_keys = itertools.count(1)
+        self.open_sessions = set()
+        self.session_ids = {} # {session key: its id in the database}, only used by the writer thread
+        self.writes = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self._write_behind, daemon=True)
+        self.writer.start()
+
+    def _write_behind(self):
+        while True:
+            batch = [self.writes.get()] # wait for at least one write
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except queue.Empty:
+                    break
+            closing = None in batch
+            with self.connection: # one transaction per batch
+                for write in batch:
+                    if write is not None:
+                        self._write(*write)
+            if closing:
+                self.connection.close()
+                return
+
+    def _write(self, statement, parameters, session, ends=False):
+        """Runs one queued write, with the id of its session as the :session parameter. A session's first write inserts it."""
+        cursor = self.connection.execute(statement, {**parameters, "session": self.session_ids.get(session)})
+        if session not in self.session_ids:
+            self.session_ids[session] = cursor.lastrowid
+        if ends:
+            del self.session_ids[session]
+
+    def start_session(self, initial_level):
+        """Records the start of a game and returns the key of its session, which the other methods take."""
+        session = next(self.session_keys)
+        self.open_sessions.add(session)
+        self.writes.put(("INSERT INTO sessions (started_at, initial_level) VALUES (:started_at, :initial_level)", {"started_at": time.time(), "initial_level": initial_level}, session))
+        return session
+
+    def record_piece(self, session, piece_id, game, planes_cleared, spin):
+        """Records a placed piece with the game's state right after it was placed."""
+        self.writes.put(("INSERT INTO piece_events (session_id, placed_at, piece_id, planes_cleared, spin, score, level, score_multiplier) "
+                         "VALUES (:session, :placed_at, :piece_id, :planes_cleared, :spin, :score, :level, :score_multiplier)",
+                         {"placed_at": time.time(), "piece_id": piece_id, "planes_cleared": planes_cleared, "spin": int(spin), "score": int(game.score), "level": game.level,
+                          "score_multiplier": game.score_multiplier}, session))
+
+    def end_session(self, session, game):
+        """Records the final stats shown on the game over screen, and adds the game to the leaderboard."""
+        self.open_sessions.discard(session)
+        single_clears, double_clears, triple_clears, quad_clears = game.total_plane_clear_types
+        spin_singles, spin_doubles, spin_triples = game.total_spin_clear_types
+        self.writes.put(("UPDATE sessions SET ended_at = :ended_at, final_score = :final_score, final_level = :final_level, planes_cleared = :planes_cleared, "
+                         "single_clears = :single_clears, double_clears = :double_clears, triple_clears = :triple_clears, quad_clears = :quad_clears, piece_spins = :piece_spins, "
+                         "spin_singles = :spin_singles, spin_doubles = :spin_doubles, spin_triples = :spin_triples, highest_score_multiplier = :highest_score_multiplier WHERE id = :session",
+                         {"ended_at": time.time(), "final_score": int(game.score), "final_level": game.level, "planes_cleared": game.total_planes_cleared,
+                          "single_clears": single_clears, "double_clears": double_clears, "triple_clears": triple_clears, "quad_clears": quad_clears, "piece_spins": game.total_spins,
+                          "spin_singles": spin_singles, "spin_doubles": spin_doubles, "spin_triples": spin_triples, "highest_score_multiplier": game.highest_score_multiplier},
+                         session, True))
+        self.leaderboard = sorted(self.leaderboard + [(int(game.score), game.level)], key=lambda entry: -entry[0])[:LEADERBOARD_SIZE]
+
+    def close(self):
+        """Ends the sessions of games that were quit before they finished, waits for every queued write to be committed, then closes the database."""
+        ended_at = time.time()
+        for session in self.open_sessions:
+            self.writes.put(("UPDATE sessions SET ended_at = :ended_at WHERE id = :session", {"ended_at": ended_at}, session, True))
+        self.open_sessions.clear()
+        self.writes.put(None)
+        self.writer.join()
@@ -0,0 +1,84 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # headless: nothing is drawn or played
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+
+if __package__ in (None, ""): # run as a script from inside the Qubitrix folder, so import it as the package it is
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.verification import DEFAULT_TIME_LIMIT, MAX_SUBMISSION_BYTES, VERIFIED, VerificationService, initialize_worker, serve, verify_submission
+
+# Qubitrix - Replay Verifier
+# Checks submitted scores by re-simulating their replays (see replays.verification), either as a local HTTP service
+# that cabinets, or a stand-in for them, post submissions to:
+#
+#     python verify_replays.py serve --port 8765 --workers 8
+#     curl --data @submission.json http://127.0.0.1:8765/verify
+#
+# or for a batch of submission files, printing each verdict and exiting with an error if any fails:
+#
+#     python verify_replays.py check submissions/*.json --workers 8
+#
+# `python verify_replays.py submission session.json submission.json` turns a session recorded with
+# `python qubitrix.py --record` into a submission claiming the result the session actually reached.
+
+def make_submission(log_path, output_path):
+    initialize_worker()
+    input_log = InputLog.load(log_path)
+    report = verify_submission({"replay": input_log.to_dict(), "claimed": {}}, time_limit=float("inf")) # claims nothing, so it only simulates
+    if "result" not in report:
+        raise SystemExit(f"{log_path} can't be simulated: {report['error']}")
+    with open(output_path, "w") as file:
+        json.dump({"replay": input_log.to_dict(), "claimed": report["result"]}, file)
+    print(f"{output_path}: claims {report['result']}")
+
+def check(paths, workers, queue_size, time_limit):
+    start = time.perf_counter()
+    failed = 0
+    with VerificationService(workers, queue_size, time_limit) as service:
+        futures = []
+        for path in paths:
+            with open(path) as file:
+                futures.append((path, service.submit(json.load(file)))) # blocks while the queue is full
+        for path, future in futures:
+            report = future.result()
+            failed += report["verdict"] != VERIFIED
+            details = f" ({', '.join(report['mismatches'])})" if report.get("mismatches") else (f" ({report['error']})" if "error" in report else "")
+            print(f"{path}: {report['verdict']}{details}, {report.get('frames', 0)} frames in {report['seconds']*1000:.0f}ms")
+    elapsed = time.perf_counter()-start
+    print(f"Checked {len(paths)} submissions in {elapsed:.2f}s ({len(paths)/elapsed:.1f} per second), {failed} not verified")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify submitted Qubitrix scores by re-simulating their replays")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help in (("serve", "verify submissions posted to an HTTP endpoint"), ("check", "verify submission files")):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("--workers", type=int, default=os.cpu_count(), help="number of verifying processes (default: one per CPU)")
+        command.add_argument("--queue-size", type=int, help="submissions that may be waiting or running at once (default: 4 per worker)")
+        command.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT, help="seconds each replay may take to simulate")
+    commands.choices["serve"].add_argument("--host", default="127.0.0.1")
+    commands.choices["serve"].add_argument("--port", type=int, default=8765)
+    commands.choices["serve"].add_argument("--max-body", type=int, default=MAX_SUBMISSION_BYTES, metavar="BYTES", help=f"largest submission accepted (default: {MAX_SUBMISSION_BYTES})")
+    commands.choices["check"].add_argument("submissions", nargs="+", help="JSON files holding a replay and its claimed result")
+    submission = commands.add_parser("submission", help="make a submission from a recorded session")
+    submission.add_argument("log", help="input log recorded with qubitrix.py --record")
+    submission.add_argument("output", help="where to write the submission")
+    args = parser.parse_args()
+
+    match args.command:
+        case "serve":
+            with VerificationService(args.workers, args.queue_size, args.time_limit) as service:
+                serve(service, args.host, args.port, max_body=args.max_body)
+        case "check":
+            sys.exit(1 if check(args.submissions, args.workers, args.queue_size, args.time_limit) else 0)
+        case "submission":
+            make_submission(args.log, args.output)
+
+if __name__ == '__main__':
+    main()
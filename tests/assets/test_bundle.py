@@ -0,0 +1,43 @@
+import os
+
+import pygame
+from pygame import mixer
+
+from Qubitrix import fonts
+from Qubitrix.assets.bundle import build_bundle, load_bundle
+from Qubitrix.sounds import Effects
+
+SOUNDS_FOLDER = os.path.join(os.path.dirname(fonts.font_dir), "sounds")
+
+def test_bundle_round_trip(tmp_path):
+    path = str(tmp_path / "assets.bundle")
+    build_bundle(path, {"a": b"\x01\x02\x03", "b": b""}, {"fonts/x.ttf": b"font"}, (44100, -16, 2))
+    bundle = load_bundle(path)
+    assert bytes(bundle.sound_buffer("a", (44100, -16, 2))) == b"\x01\x02\x03"
+    assert bytes(bundle.sound_buffer("b", (44100, -16, 2))) == b""
+    assert bundle.sound_buffer("a", (22050, -16, 2)) is None # decoded for another mixer format
+    assert all(offset % 16 == 0 for offset, _ in [*bundle.sounds.values(), *bundle.files.values()])
+    assert bundle.open_file("fonts/x.ttf").read() == b"font"
+    assert bundle.open_file("fonts/y.ttf") is None
+    assert load_bundle(str(tmp_path / "missing.bundle")) is None
+    (tmp_path / "empty.bundle").write_bytes(b"")
+    assert load_bundle(str(tmp_path / "empty.bundle")) is None
+
+def test_sounds_and_fonts_load_from_the_bundle(tmp_path):
+    mixer.init()
+    pygame.font.init()
+    path = str(tmp_path / "assets.bundle")
+    raw = mixer.Sound(os.path.join(SOUNDS_FOLDER, "hold_piece.wav")).get_raw()
+    with open(fonts.font_path, "rb") as file:
+        build_bundle(path, {"hold_piece": raw}, {fonts.font_bundle_name: file.read()}, mixer.get_init())
+    effects = Effects()
+    effects.bundle = load_bundle(path)
+    effects.sounds.pop("hold_piece", None)
+    try:
+        assert effects["hold_piece"].sound.get_raw() == raw
+        fonts.use_bundle(effects.bundle)
+        assert not isinstance(fonts.get_font_file(), str)
+        assert fonts.get_small_font(720).size("QUBITRIX") == pygame.font.Font(fonts.font_path, 30).size("QUBITRIX")
+    finally:
+        effects.bundle = None
+        fonts.use_bundle(None)
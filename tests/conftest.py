@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The tests import the game as the Qubitrix package (Qubitrix.engine, Qubitrix.render, ...), from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Test helpers, like make_log in replays/test_replay.py, are imported by modules in other folders too.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "replays"))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+def pytest_addoption(parser):
+    parser.addoption("--update-golden", action="store_true", help="rewrite the golden images of tests/render/test_golden_frames.py")
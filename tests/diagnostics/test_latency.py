@@ -0,0 +1,56 @@
+from pygame.locals import KEYDOWN
+
+from Qubitrix.engine import Game, FPS, hotkeys, keyboard_input_check
+from Qubitrix.diagnostics.latency import LatencyTracer, LatencyHistogram, QUEUE_WAIT
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for milliseconds in range(1, 101):
+        histogram.add(milliseconds/1000)
+    assert histogram.count == 100 and histogram.maximum == 100
+    assert histogram.percentile(0.5) == 50 and histogram.percentile(0.95) == 100
+    assert histogram.report()["histogram"]["<=1ms"] == 1
+
+def test_inputs_are_traced_until_presented():
+    clock = FakeClock()
+    tracer = LatencyTracer(clock)
+    game = Game()
+    game.init_game()
+    game.latency_tracer = tracer
+    tracer.begin_frame()
+    game.modified_input(0)
+    clock.now = 0.012
+    keyboard_input_check(type("Event", (), {"type": KEYDOWN, "dict": {"scancode": hotkeys[0]}})(), game) # move right
+    clock.now = 0.020
+    tracer.frame_presented()
+    assert round(tracer.latencies["rotate"].maximum, 3) == round(tracer.latencies["move"].maximum, 3) == 20
+    assert not tracer.open_traces
+    clock.now = 0.036
+    tracer.begin_frame()
+    assert round(tracer.latencies[QUEUE_WAIT].maximum, 3) == 16
+    game.basic_input(0) # not presented yet, so not counted
+    assert tracer.latencies["move"].count == 1
+    game.latency_tracer = None
+    game.basic_input(0) # untraced games are unaffected
+    assert len(tracer.open_traces) == 1
+
+def test_auto_repeat_jitter():
+    clock = FakeClock()
+    tracer = LatencyTracer(clock)
+    interval = 4/FPS
+    for n, presented in enumerate((0.0, 4/FPS, 9/FPS, 13/FPS)): # the third repeat comes a frame late
+        clock.now = presented - 0.005
+        tracer.tag("move", key=0, repeat=True, repeat_interval=interval)
+        clock.now = presented
+        tracer.frame_presented()
+    jitter = tracer.jitter["move (repeat)"]
+    assert jitter.count == 3 and round(jitter.maximum, 3) == round(1000/FPS, 3)
+    assert round(tracer.latencies["move (repeat)"].maximum, 3) == 5
+    assert "move (repeat) jitter: p95 17ms" in tracer.describe()
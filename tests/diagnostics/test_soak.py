@@ -0,0 +1,59 @@
+import json
+import random
+
+import pygame
+
+from Qubitrix import engine
+from Qubitrix.diagnostics.soak import RandomPlayer, SoakMonitor, get_subsystem, soak
+from Qubitrix.engine import FPS, MAXIMUM_SELECTABLE_LEVEL
+from Qubitrix.fonts import get_large_font, get_small_font
+from Qubitrix.render import board
+from Qubitrix.render.board import WINDOW_WIDTH, WINDOW_HEIGHT, global_render
+
+def test_growth_is_flagged():
+    leak = []
+    for max_growth, leaked in ((1.0, 4*2**20), (1.0, 0)):
+        monitor = SoakMonitor(max_growth)
+        try:
+            for hour in range(6):
+                monitor.frames = hour*3600*FPS
+                leak.append(bytearray(leaked))
+                monitor.sample()
+            trends, flagged = monitor.get_trends(), monitor.get_flagged()
+            if leaked:
+                assert 3.5 < trends["traced_mb"] < 4.5 and 3.5 < trends["subsystems_mb.python"] < 4.5
+                assert "traced_mb" in flagged and "subsystems_mb.python" in flagged
+                assert monitor.get_hot_spots()[0]["where"].startswith(__file__)
+            else:
+                assert abs(trends["traced_mb"]) < 0.5 and "traced_mb" not in flagged
+        finally:
+            monitor.close()
+        leak.clear()
+
+def test_subsystems():
+    assert get_subsystem(engine.__file__) == "engine"
+    assert get_subsystem(board.__file__) == "render.board"
+    assert get_subsystem(pygame.__file__) == "pygame"
+    assert get_subsystem(json.__file__) == "python"
+
+def test_soak_plays_game_after_game():
+    pygame.font.init()
+    screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    fonts = get_small_font(WINDOW_HEIGHT), get_large_font(WINDOW_HEIGHT)
+    drawn = []
+    def draw(game, ui_color_id): # every frame would take too long under tracemalloc
+        if len(drawn) % 100 == 0:
+            global_render(screen, game, *fonts, ui_color_id)
+        drawn.append(game.mode)
+    random.seed(3)
+    monitor = SoakMonitor(warmup=0)
+    try:
+        soak(RandomPlayer(MAXIMUM_SELECTABLE_LEVEL, seed=1), monitor, frames=1500, sample_frames=400, draw=draw)
+    finally:
+        monitor.close()
+    assert monitor.frames == len(drawn) == 1500
+    assert monitor.games >= 2 and "Finished" in drawn
+    assert [sample["frames"] for sample in monitor.samples] == [400, 800, 1200, 1500]
+    report = json.loads(json.dumps(monitor.report()))
+    assert report["frame_times"]["count"] == 1500
+    assert set(report["trends_per_hour"]) >= {"resident_mb", "traced_mb", "subsystems_mb.engine", "subsystems_mb.render.board"}
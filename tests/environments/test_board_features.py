@@ -0,0 +1,41 @@
+import numpy as np
+
+from Qubitrix.engine import Game, WIDTH, DEPTH, HEIGHT
+from Qubitrix.environments.board_features import count_bits, extract_features, feature_names, get_secluded_columns, pack_columns, unpack_columns
+
+def random_boards(count, seed=0):
+    generator = np.random.default_rng(seed)
+    fill_heights = generator.integers(0, HEIGHT, size=(count, 1, 1, 1)) # boards that are full below some plane, with some cubes missing
+    boards = (np.arange(HEIGHT) >= HEIGHT-fill_heights) & (generator.random((count, WIDTH, DEPTH, HEIGHT)) < 0.8)
+    return np.where(boards, generator.integers(1, 9, size=boards.shape), 0)
+
+def test_secluded_spaces_match_game():
+    boards = random_boards(300)
+    secluded = unpack_columns(get_secluded_columns(pack_columns(boards > 0)))
+    game = Game()
+    for board, expected in zip(boards, secluded):
+        game.grid = board.tolist()
+        game.get_secluded_spaces()
+        assert (np.array(game.grid) == -1).tolist() == expected.tolist()
+    assert secluded.any()
+
+def test_features_of_one_board():
+    board = np.zeros((1, WIDTH, DEPTH, HEIGHT), dtype=int)
+    board[0, 0, 0, HEIGHT-3:] = 1 # a column 3 high
+    board[0, 1, 0, HEIGHT-1] = 2
+    board[0, 1, 0, HEIGHT-3] = 2 # a column 3 high with a hole
+    features = dict(zip(feature_names(), extract_features(board)[0]))
+    assert features["height_0_0"] == features["height_1_0"] == 3 and features["height_2_0"] == 0
+    assert features["max_height"] == 3 and features["total_height"] == 6 and features["holes"] == 1
+    assert features["roughness"] == 3 + 3 + 3 # to the columns at x = 2 and y = 1
+    assert features[f"plane_fill_{HEIGHT-1}"] == 2 and features["near_complete_planes"] == 0
+
+def test_column_bitmasks_give_the_same_features():
+    boards = random_boards(50, seed=1)
+    columns = ((boards > 0) << np.arange(HEIGHT)).sum(axis=3)
+    assert (extract_features(columns) == extract_features(boards)).all()
+
+def test_bits_are_counted_without_numpy_2():
+    columns = np.array([0, 1, 0b1011, 2**40 + 7, 2**64 - 1], dtype=np.uint64)
+    assert count_bits(columns).tolist() == [bin(int(column)).count("1") for column in columns]
+    assert count_bits(columns[::2].astype(np.uint16)).tolist() == [0, 3, 16]
@@ -0,0 +1,12 @@
+from Qubitrix.environments.bot import make_bot
+
+def test_bot_plays_and_restarts():
+    bot = make_bot(7, think_frames=1)
+    for _ in range(3000):
+        bot.step()
+    assert bot.game.mode != "Home"
+    assert bot.game.total_planes_cleared > 0 or bot.game.score > 0
+
+def test_bots_are_silent_by_default():
+    assert not make_bot(7).game.sounds # never loads the mixer, which needs an audio device
+    assert make_bot(7, sounds=True).game.sounds
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from Qubitrix.engine import Game
+
+def test_observation_matches_game():
+    game = Game()
+    game.init_game()
+    game.grid[0][0][11] = 3
+    game.grid[1][0][11] = -1
+    game.hold_piece()
+    game.tick()
+    observation = game.observation.latest()
+    assert observation.grid[0, 0, 11] == 3 and observation.grid[1, 0, 11] == 0
+    assert observation.secluded[1, 0, 11] and observation.secluded.sum() == 1
+    assert observation.current_piece.tolist() == game.current_piece["cubes"]
+    assert observation.ghost_piece.tolist() == game.ghost_piece["cubes"]
+    assert observation.held_piece_id == game.held_piece["id"]
+    assert observation.next_pieces.tolist() == [piece["id"] for piece in game.next_pieces[:5]]
+    with pytest.raises(ValueError):
+        observation.grid[0, 0, 0] = 1 # views are read-only
+
+def test_frame_counter_detects_overwrites():
+    game = Game()
+    game.init_game()
+    observation = game.observation.latest()
+    frame = observation.frame
+    game.tick()
+    assert game.observation.latest().frame == frame + 1
+    assert observation.is_valid() # the other buffer was written
+    game.tick()
+    assert not observation.is_valid() # this one was reused
+    assert np.shares_memory(observation.grid, game.observation.latest().grid)
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from Qubitrix.environments.bot import make_bot, rank_placement
+from Qubitrix.environments.placement_cache import HEADER, PlacementCache
+from Qubitrix.environments.solver import Solver
+from Qubitrix.environments.symmetry import get_symmetries
+from test_symmetry import get_boards, turn_board
+
+def play_bot(cache, frames=3000):
+    bot = make_bot(2, think_frames=1, cache=cache)
+    for _ in range(frames):
+        bot.step()
+    return bot.game
+
+def test_turned_positions_share_placements(tmp_path):
+    solver = Solver(spins=False)
+    with PlacementCache(tmp_path / "cache.bin") as cache, PlacementCache(tmp_path / "cache.bin") as other_process:
+        symmetries = get_symmetries()
+        for board in get_boards(5):
+            mask, spin = solver.get_placements(board, 7)[0]
+            cache.put(board, (7, 3), rank_placement(board, mask, spin), False, mask)
+            for symmetry in symmetries:
+                turned_board, turned_pieces = turn_board(board, symmetry), (symmetry.pieces[7], 3)
+                evaluation, hold, turned_mask = other_process.get(turned_board, turned_pieces) # sees what cache wrote, through its own mapping
+                assert not hold
+                assert turned_mask in {turn_board(mask, other) for other in symmetries # any turn of the board that looks the same will do
+                                       if turn_board(board, other) == turned_board and other.pieces[7] == turned_pieces[0]}
+                assert (turned_mask, False) in solver.get_placements(turned_board, turned_pieces[0])
+                assert evaluation == rank_placement(turned_board, turned_mask, False)
+            assert other_process.get(board, (7, 4)) is None
+        assert other_process.hits == 5*8 and other_process.misses == 5
+
+def test_cache_stays_within_its_file(tmp_path):
+    path = tmp_path / "cache.bin"
+    boards = get_boards(40)
+    with PlacementCache(path, slots=8) as cache:
+        for board in boards:
+            cache.put(board, (1, 2), (0, 0, 0), True, 15)
+        assert len(cache.records) == 8 and cache.stores == 40
+        size = os.path.getsize(path)
+        assert cache.get(boards[-1], (1, 2))[1:] == (True, 15)
+    with open(path, "r+b") as file: # break the records, as if they had been caught half written
+        file.seek(HEADER.size)
+        file.write(b"\x01"*(size-HEADER.size))
+    with PlacementCache(path) as cache:
+        assert all(cache.get(board, (1, 2)) is None for board in boards)
+    assert os.path.getsize(path) == size
+    with pytest.raises(ValueError):
+        PlacementCache(path, piece_count=3)
+    with pytest.raises(ValueError):
+        make_bot(0, cache=cache, solver=Solver())
+
+def test_bots_reuse_placements(tmp_path):
+    with PlacementCache(tmp_path / "cache.bin") as cache:
+        first = play_bot(cache)
+        hits, stores = cache.hits, cache.stores
+        second = play_bot(cache)
+        assert second.grid == first.grid and second.score == first.score
+        assert cache.stores == stores and cache.hits == 2*hits + stores > 0 # every placement was already worked out
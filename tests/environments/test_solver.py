@@ -0,0 +1,149 @@
+import random
+import time
+
+import pytest
+
+from Qubitrix import engine
+from Qubitrix.engine import Game, WIDTH, DEPTH, HEIGHT, NEXT_PIECE_COUNT, PIECES, PLANE_CLEAR_SCORE_BONUSES, SPIN_CLEAR_SCORE_FACTOR
+from Qubitrix.environments.solver import PLANE_SIZE, Solver, TranspositionTable, board_from_grid, clear_full_planes, cubes_from_mask
+
+def cell(x, y, z):
+    return 1 << z*PLANE_SIZE + x*DEPTH + y
+
+def mask_from_cubes(cubes):
+    return sum(cell(*cube) for cube in cubes)
+
+def play(board, solution):
+    """Places a solution's pieces on a board, checking each one lands on empty cells."""
+    for _, _, cubes, _ in solution.placements:
+        mask = mask_from_cubes(cubes)
+        assert not board & mask
+        board, _ = clear_full_planes(board | mask)
+    return board
+
+def test_perfect_clear():
+    solution = Solver().solve_perfect_clear(0, [1, 1, 1, 1, 2, 2], time_limit=5)
+    assert solution.complete and len(solution.placements) == 4 and solution.planes_cleared == 1
+    assert play(0, solution) == 0
+    solution = Solver().solve_perfect_clear(0, [6, 6, 6, 6], time_limit=5) # 4 pieces that can't make a flat plane
+    assert not solution and solution.complete and solution.placements == []
+    solution = Solver().solve_perfect_clear(0, [1, 2, 3, 4, 5, 6, 7, 1, 2], time_limit=0)
+    assert not solution and not solution.complete # out of time, which isn't a clear either
+
+def test_perfect_clear_uses_the_hold():
+    board = mask_from_cubes([x, y, HEIGHT-1] for x in range(WIDTH) for y in range(DEPTH) if x > 0) # an I piece shaped gap
+    solution = Solver().solve_perfect_clear(board, [2, 1], time_limit=5)
+    assert solution.placements[0][:2] == (1, True)
+    assert play(board, solution) == 0
+    solution = Solver().solve_perfect_clear(board, [2, 1], can_hold=False, time_limit=5)
+    assert not solution and solution.complete
+
+def test_best_score():
+    board = mask_from_cubes([x, y, z] for x in range(WIDTH) for y in range(DEPTH) for z in (HEIGHT-2, HEIGHT-1) if (x, y) != (0, 0))
+    solution = Solver().solve_best_score(board, [2, 3], time_limit=5) # only an L piece standing in the corner clears
+    assert solution.complete and solution.planes_cleared == 2 and solution.score == 250
+    assert 3 in [piece_id for piece_id, *_ in solution.placements]
+
+def test_best_score_matches_every_pair_of_placements():
+    random.seed(4)
+    solver = Solver()
+    for _ in range(15):
+        board = mask_from_cubes([x, y, z] for x in range(WIDTH) for y in range(DEPTH) for z in range(HEIGHT-3, HEIGHT) if random.random() < 0.85)
+        board, _ = clear_full_planes(board)
+        pieces = random.sample(range(1, len(PIECES)+1), 2)
+        best = 0
+        for mask, spin in solver.get_placements(board, pieces[0]):
+            next_board, planes = clear_full_planes(board | mask)
+            points = PLANE_CLEAR_SCORE_BONUSES[min(planes, 4)]*(SPIN_CLEAR_SCORE_FACTOR if spin else 1)
+            best = max([best, points] + [points + PLANE_CLEAR_SCORE_BONUSES[min(clear_full_planes(next_board | next_mask)[1], 4)]*(SPIN_CLEAR_SCORE_FACTOR if next_spin else 1)
+                                         for next_mask, next_spin in solver.get_placements(next_board, pieces[1])])
+        solution = Solver().solve_best_score(board, pieces, can_hold=False, time_limit=60)
+        assert solution.complete and solution.horizon == 2 and solution.score == best
+        play(board, solution)
+
+def test_best_score_answers_in_time():
+    random.seed(5)
+    board = mask_from_cubes([x, y, z] for x in range(WIDTH) for y in range(DEPTH) for z in range(HEIGHT-4, HEIGHT) if random.random() < 0.8)
+    board, _ = clear_full_planes(board)
+    pieces = [random.randint(1, len(PIECES)) for _ in range(NEXT_PIECE_COUNT+1)]
+    solution = Solver().solve_best_score(board, pieces, held=1) # far more than the default time limit allows
+    assert not solution.complete and 1 <= solution.horizon < len(pieces)+1
+    assert solution.placements
+    play(board, solution)
+    solution = Solver().solve_best_score(board, pieces, held=1, time_limit=0) # not even one placement ahead
+    assert not solution and not solution.complete and solution.horizon == 0
+
+def test_best_score_keeps_to_the_time_limit():
+    random.seed(8)
+    solver = Solver()
+    for _ in range(5):
+        board = mask_from_cubes([x, y, z] for x in range(WIDTH) for y in range(DEPTH) for z in range(HEIGHT-6, HEIGHT) if random.random() < 0.7)
+        board, _ = clear_full_planes(board)
+        pieces = [random.randint(1, len(PIECES)) for _ in range(NEXT_PIECE_COUNT+1)]
+        start = time.perf_counter()
+        solution = solver.solve_best_score(board, pieces, held=random.randint(1, len(PIECES)), time_limit=0.05)
+        assert time.perf_counter() - start < 0.1 # a piece's placements past the limit at most, not another search
+        play(board, solution)
+
+def test_long_queues_and_unknown_pieces():
+    solution = Solver(spins=False).solve_perfect_clear(0, [1, 2, 3, 4, 5, 6, 7, 1, 2], time_limit=30) # longer than NEXT_PIECE_COUNT+2 pieces
+    assert solution.complete and play(0, solution) == 0
+    assert Solver().solve_best_score(0, [1, 2, 3, 4, 5, 6, 7, 1, 2]).placements
+    with pytest.raises(ValueError):
+        Solver().solve_best_score(0, [len(PIECES)+1])
+    with pytest.raises(ValueError):
+        Solver().get_placements(0, 0)
+
+def test_pentacubes(tmp_path, monkeypatch):
+    from Qubitrix.pieces.polycubes import load_piece_set
+    monkeypatch.setattr(engine, "PIECES", PIECES)
+    engine.use_piece_set(load_piece_set("pentacubes", WIDTH, DEPTH, cache_folder=tmp_path))
+    solver = Solver()
+    assert solver.cube_count == 5 and len(solver.shapes) == 29
+    solution = solver.solve_best_score(0, [20, 25], time_limit=5)
+    assert solution.complete and solution.horizon == 2 and solution.placements and solution.score == 0
+    assert all(len(cubes) == 5 for _, _, cubes, _ in solution.placements)
+
+def test_tucks_under_overhangs():
+    board = mask_from_cubes([x, y, HEIGHT-1] for x in range(WIDTH) for y in range(2, DEPTH))
+    board |= mask_from_cubes([x, y, HEIGHT-2] for x in range(2) for y in range(2)) # a roof over the corner of the pit
+    tucked = mask_from_cubes([x, y, HEIGHT-1] for x in range(2) for y in range(2))
+    assert tucked in Solver().shapes[2].get_placements(board)
+    assert tucked not in Solver().shapes[2].get_placements(board, tucks=False)
+
+def test_spins_are_immobile():
+    random.seed(3)
+    game = Game()
+    shapes = Solver().shapes
+    spins = 0
+    for _ in range(40):
+        grid = [[[int(z > HEIGHT-5 and random.random() < 0.6) for z in range(HEIGHT)] for y in range(DEPTH)] for x in range(WIDTH)]
+        board = board_from_grid(grid)
+        game.grid = grid
+        for piece_id, shape in shapes.items():
+            for mask, spin in shape.get_placements(board).items():
+                assert not mask & board
+                if spin:
+                    spins += 1
+                    cubes = cubes_from_mask(mask)
+                    for direction in ((0, 0, -1), (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0)):
+                        assert any(game.check_for_collision(cube, *direction) for cube in cubes)
+    assert spins
+
+def test_transposition_table_evicts_least_recently_used():
+    table = TranspositionTable(2)
+    table.put(1, 10, "a")
+    table.put(2, 20, "b")
+    assert table.get(1, 10) == "a"
+    table.put(3, 30, "c")
+    assert table.get(2, 20) is None and table.get(1, 10) == "a" and table.evictions == 1
+    assert table.get(3, 31) is None # a different board under the same key
+
+def test_from_game():
+    random.seed(0)
+    game = Game()
+    game.init_game()
+    board, pieces, held, can_hold = Solver.from_game(game)
+    assert len(pieces) == NEXT_PIECE_COUNT+1 and pieces[0] == game.current_piece["id"]
+    assert held == 0 and can_hold
+    assert board == board_from_grid(game.grid)
@@ -0,0 +1,40 @@
+from Qubitrix.engine import HEIGHT, PIECES
+from Qubitrix.environments.bot import make_bot
+from Qubitrix.environments.solver import PLANE_SIZE, Solver, board_from_grid, get_columns
+from Qubitrix.environments.symmetry import canonicalize, get_mirror_pieces, get_symmetries
+
+def turn_board(board, symmetry):
+    """Returns a bitboard turned by a Symmetry."""
+    columns, _ = symmetry.turn(get_columns(board), ())
+    return sum(((columns[column] >> z) & 1) << z*PLANE_SIZE + column for column in range(PLANE_SIZE) for z in range(HEIGHT))
+
+def get_boards(count):
+    """Returns boards a bot left behind after placing some pieces."""
+    bot = make_bot(1, think_frames=1)
+    boards = []
+    while len(boards) < count:
+        bot.step()
+        if bot.game.mode == "Playing" and bot.frames_waited == 0:
+            boards.append(board_from_grid(bot.game.grid))
+    return boards[-count:]
+
+def test_symmetries_of_the_board():
+    assert get_mirror_pieces() == [0, 1, 2, 3, 4, 5, 6, 8, 7] # the chiral pieces swap
+    assert get_mirror_pieces(PIECES[:7]) is None # without piece 8, piece 7 has no mirror image
+    assert len(get_symmetries()) == 8
+    assert len(get_symmetries(mirrors=False)) == 4
+    assert len(get_symmetries(width=4, depth=3)) == 4
+    for symmetry in get_symmetries(width=4, depth=3):
+        assert sorted(symmetry.columns) == list(range(12))
+        assert all(symmetry.to_turned[symmetry.columns[column]] == column for column in range(12))
+
+def test_turned_boards_have_turned_placements():
+    solver = Solver(spins=False)
+    symmetries = get_symmetries()
+    for board in get_boards(6):
+        assert len({canonicalize(get_columns(turn_board(board, symmetry)), (symmetry.pieces[7], 1), symmetries)[:2] for symmetry in symmetries}) == 1
+        for piece in PIECES:
+            placements = {mask for mask, _ in solver.get_placements(board, piece["id"])}
+            for symmetry in symmetries:
+                turned = {mask for mask, _ in solver.get_placements(turn_board(board, symmetry), symmetry.pieces[piece["id"]])}
+                assert turned == {turn_board(mask, symmetry) for mask in placements}
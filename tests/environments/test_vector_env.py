@@ -0,0 +1,159 @@
+import numpy as np
+from copy import deepcopy
+
+from Qubitrix.controllers.abstract_controller import GameEvent
+from Qubitrix.engine import Game, PIECES, WIDTH, DEPTH, HEIGHT
+from Qubitrix.environments.vector_env import (VectorEnv, ACTIONS, PLACEMENTS, PLACEMENT_CELLS, PLACEMENT_CENTERS, PLACEMENT_LEGAL, SPAWN_PLACEMENTS,
+                                              CENTER_COUNTS, PLANE_BITS, get_orientations)
+
+SPIN_BOARD = ( # the bottom two planes of a board where an L piece can be spun under the overhangs to clear a plane, indexed [x][y]
+    [[1,1,0,1], [0,1,1,1], [0,1,0,1], [1,0,1,1]],
+    [[1,1,1,1], [1,1,0,1], [1,1,0,1], [1,1,1,1]]
+)
+
+def sync_game(game, env, n):
+    """Gives the scalar game the same piece queue as the vectorized env, as they shuffle their bags differently."""
+    game.next_pieces = [deepcopy(PIECES[piece_id-1]) for piece_id in env.next_pieces[n, :env.queue_length[n]]]
+
+def start_game(env, n):
+    game = Game()
+    game.init_game()
+    game.grid = env.grid[n].tolist()
+    game.current_piece = deepcopy(PIECES[env.current_piece[n]-1])
+    game.reset_piece_state()
+    sync_game(game, env, n)
+    return game
+
+def start_spin_board(env):
+    env.grid[:, :, :, HEIGHT-2:] = np.stack(SPIN_BOARD, axis=-1)
+    env.columns[:] = (env.grid != 0).astype(np.uint16) @ PLANE_BITS
+    env.current_piece[:] = 3
+    env.reset_piece_state(np.arange(env.num_envs))
+
+def place_like_env(game, action):
+    """Plays an action of VectorEnv.step on the scalar game the way it describes it."""
+    turn, action = divmod(action, 2*PLACEMENTS)
+    if action >= PLACEMENTS:
+        game.hold_piece()
+    piece_id = game.current_piece["id"]
+    placement = action % PLACEMENTS if PLACEMENT_LEGAL[piece_id, action % PLACEMENTS] else SPAWN_PLACEMENTS[piece_id]
+    game.current_piece = {"centers": PLACEMENT_CENTERS[piece_id, placement, :CENTER_COUNTS[piece_id]].tolist(),
+                          "cubes": PLACEMENT_CELLS[piece_id, placement].tolist(), "id": piece_id}
+    game.reset_piece_state()
+    game.drop_piece()
+    if turn:
+        game.rotate_piece(turn-1)
+    game.drop_piece(instant_placement=True)
+
+def send_event(game, event):
+    """Plays a GameEvent value on the scalar game like its controllers do."""
+    if event <= GameEvent.LOWER_PIECE.value:
+        game.basic_input(event)
+    elif event == GameEvent.HOLD_PIECE.value:
+        game.hold_piece()
+    elif GameEvent.ROTATE_PIECE_RIGHT.value <= event <= GameEvent.ROTATE_PIECE_COUNTERCLOCKWISE.value:
+        game.modified_input(event - GameEvent.ROTATE_PIECE_RIGHT.value)
+    elif event == GameEvent.SONIC_DROP_PIECE.value:
+        game.modified_input(6)
+
+def assert_same_state(env, n, game):
+    assert (np.maximum(np.array(game.grid), 0) == env.grid[n]).all()
+    assert env.score[n] == game.score
+    assert env.level[n] == game.level
+    assert env.score_multiplier[n] == game.score_multiplier
+    assert env.score_mult_buffer[n] == game.score_mult_buffer
+    assert env.total_plane_clear_types[n].tolist() == game.total_plane_clear_types
+    assert env.total_spin_clear_types[n].tolist() == game.total_spin_clear_types
+    assert env.total_spins[n] == game.total_spins
+    assert env.current_piece[n] == game.current_piece["id"]
+    assert env.held_piece[n] == game.held_piece.get("id", 0)
+    assert env.piece_cubes[n].tolist() == game.current_piece["cubes"]
+    assert env.piece_centers[n, :len(game.current_piece["centers"])].tolist() == game.current_piece["centers"]
+    assert env.lowest_center_elevation[n] == game.lowest_center_elevation
+    assert env.lowest_spin_elevation[n] == game.lowest_spin_elevation
+    assert env.spin[n] == game.piece_spin_on_last_movement
+    assert env.grid_rotation[n] == game.grid_rotation
+
+def choose_actions(env, rng):
+    """Picks random legal actions, mostly only among those that keep the piece lowest so that planes get cleared."""
+    holding = rng.random(env.num_envs) < 0.1
+    legal = np.where(holding[:, None], env.legal_actions()[:, PLACEMENTS:], env.legal_actions()[:, :PLACEMENTS])
+    pieces = np.where(holding, np.where(env.held_piece > 0, env.held_piece, env.next_pieces[:, 0]), env.current_piece)
+    cubes = PLACEMENT_CELLS[pieces] # (envs, placements, cubes, 3)
+    occupied = env.grid > 0
+    column_tops = np.where(occupied.any(axis=3), occupied.argmax(axis=3), occupied.shape[3])
+    rows = np.arange(env.num_envs)[:, None, None]
+    distance = (column_tops[rows, cubes[..., 0], cubes[..., 1]] - cubes[..., 2] - 1).min(axis=2)
+    top = np.where(legal, (cubes[..., 2].min(axis=2) + distance), -100)
+    lowest = legal & (top == top.max(axis=1, keepdims=True))
+    placements = np.array([rng.choice(np.flatnonzero(lowest[n] if rng.random() < 0.9 else legal[n])) for n in range(env.num_envs)])
+    return placements + holding*PLACEMENTS
+
+def test_orientation_counts():
+    # the straight and square pieces have 3 orientations, the corner (Y) piece 8 and the L piece all 24
+    assert [len(get_orientations(piece["cubes"])) for piece in PIECES] == [3, 3, 24, 12, 12, 8, 12, 12]
+    assert PLACEMENT_LEGAL[1].sum() == WIDTH + DEPTH + WIDTH*DEPTH
+
+def test_matches_scalar_game():
+    env = VectorEnv(12, seed=7)
+    rng = np.random.default_rng(7)
+    games = [start_game(env, n) for n in range(env.num_envs)]
+    games_finished = planes_cleared = spins = 0
+    for _ in range(150):
+        actions = choose_actions(env, rng) + np.where(rng.random(env.num_envs) < 0.5, rng.integers(1, 7, env.num_envs), 0)*2*PLACEMENTS
+        for n, game in enumerate(games):
+            place_like_env(game, actions[n])
+        previous_planes_cleared, previous_spins = env.total_planes_cleared.copy(), env.total_spins.copy()
+        _, rewards, dones = env.step(actions)
+        planes_cleared += (env.total_planes_cleared - previous_planes_cleared)[~dones].sum()
+        spins += (env.total_spins - previous_spins)[~dones].sum()
+        for n, game in enumerate(games):
+            assert dones[n] == (game.mode == "Finished")
+            if dones[n]:
+                assert env.final_score[n] == game.score
+                games_finished += 1
+                games[n] = start_game(env, n)
+                continue
+            assert_same_state(env, n, game)
+            sync_game(game, env, n)
+    assert games_finished > 0
+    assert planes_cleared > 0
+    assert spins > 0
+
+def test_turned_placements_match_scalar_game():
+    # every placement, turned every way, of an L piece on a board with gaps under overhangs
+    actions = np.arange(ACTIONS)
+    actions = actions[(actions // PLACEMENTS % 2 == 0) & PLACEMENT_LEGAL[3, actions % PLACEMENTS]]
+    env = VectorEnv(len(actions), seed=3)
+    start_spin_board(env)
+    games = [start_game(env, n) for n in range(env.num_envs)]
+    _, rewards, dones = env.step(actions)
+    for n, game in enumerate(games):
+        place_like_env(game, actions[n])
+        assert not dones[n]
+        sync_game(game, env, n)
+        assert_same_state(env, n, game)
+    assert env.total_spin_clear_types.sum() > 0
+
+def test_events_match_scalar_game():
+    env = VectorEnv(500, seed=5)
+    rng = np.random.default_rng(5)
+    start_spin_board(env)
+    games = [start_game(env, n) for n in range(env.num_envs)]
+    weights = np.zeros(len(GameEvent))
+    weights[:GameEvent.PAUSE_GAME.value] = (2, 2, 2, 2, 1, 1, 1) # moves, grid rotations and lowering
+    weights[GameEvent.HOLD_PIECE.value:GameEvent.QUIT_GAME.value] = (0.2, 3, 3, 3, 3, 3, 3, 3) # holds, rotations and sonic drops
+    spin_clears = 0
+    for _ in range(25):
+        events = rng.choice(len(GameEvent), env.num_envs, p=weights/weights.sum())
+        _, rewards, dones = env.step_events(events)
+        for n, game in enumerate(games):
+            send_event(game, events[n])
+            assert dones[n] == (game.mode == "Finished")
+            if dones[n]:
+                games[n] = start_game(env, n)
+                continue
+            sync_game(game, env, n)
+            assert_same_state(env, n, game)
+    assert env.total_spins.sum() > 0
+    assert env.total_spin_clear_types.sum() > 0
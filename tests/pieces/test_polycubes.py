@@ -0,0 +1,54 @@
+import json
+import random
+
+import pytest
+
+from Qubitrix import engine
+from Qubitrix.engine import Game, WIDTH, DEPTH, HEIGHT, PIECES
+from Qubitrix.pieces.polycubes import enumerate_polycubes, get_orientations, get_rotation_centers, compile_piece_set, load_piece_set
+
+def test_polycube_counts():
+    assert [len(enumerate_polycubes(size)) for size in (1, 2, 3, 4, 5)] == [1, 1, 2, 8, 29] # one-sided polycubes
+
+def test_tetracubes_match_the_hand_written_pieces():
+    compiled = compile_piece_set(enumerate_polycubes(4), WIDTH, DEPTH)
+    assert sorted(len(extents) for extents in compiled["extents"]) == sorted(len(get_orientations(piece["cubes"])) for piece in PIECES)
+    for piece in PIECES:
+        assert get_rotation_centers(piece["cubes"]) == piece["centers"]
+    for piece in compiled["pieces"]:
+        assert max(z for _, _, z in piece["cubes"]) == -3
+        assert all(0 <= x < WIDTH and 0 <= y < DEPTH for x, y, _ in piece["cubes"])
+
+def test_piece_sets_are_cached(tmp_path):
+    path = tmp_path / "pieces.json"
+    path.write_text(json.dumps([[[0, 0, 0], [1, 0, 0], [1, 1, 0]], [[0, 0, 0], [0, 0, 1], [0, 0, 2]]]))
+    compiled = load_piece_set(str(path), WIDTH, DEPTH, cache_folder=tmp_path / "cache")
+    assert [piece["id"] for piece in compiled["pieces"]] == [1, 2]
+    assert compiled["pieces"][1]["cubes"] == [[1, 0, -3], [1, 1, -3], [1, 2, -3]] # lying down, the flattest way it fits
+    cache_files = list((tmp_path / "cache").iterdir())
+    assert len(cache_files) == 1
+    cache_files[0].write_text(json.dumps({"pieces": [], "extents": []}))
+    assert load_piece_set(str(path), WIDTH, DEPTH, cache_folder=tmp_path / "cache") == {"pieces": [], "extents": []} # read back, not compiled again
+    assert load_piece_set(str(path), WIDTH+1, DEPTH, cache_folder=tmp_path / "cache") != {"pieces": [], "extents": []} # a different grid size is another entry
+    with pytest.raises(ValueError):
+        load_piece_set("tricubes", 1, 1, cache_folder=tmp_path / "cache")
+
+def test_game_plays_with_pentacubes(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "PIECES", PIECES)
+    engine.use_piece_set(load_piece_set("pentacubes", WIDTH, DEPTH, cache_folder=tmp_path))
+    assert len(engine.PIECES) == 29
+    random.seed(2)
+    game = Game()
+    game.init_game()
+    seen = set()
+    for _ in range(200):
+        if game.mode != "Playing":
+            game.init_game()
+        seen.add(game.current_piece["id"])
+        assert len(game.current_piece["cubes"]) == 5
+        for input in range(6):
+            game.rotate_piece(input)
+            for x, y, z in game.current_piece["cubes"]:
+                assert 0 <= x < WIDTH and 0 <= y < DEPTH and z < HEIGHT
+        game.drop_piece(instant_placement=True)
+    assert len(seen) > 20
@@ -0,0 +1,120 @@
+import os
+import time
+
+import numpy as np
+import pygame
+import pytest
+from pygame.locals import KEYDOWN, KEYUP
+
+from Qubitrix.fonts import get_large_font, get_small_font
+from Qubitrix.engine import WIDTH, DEPTH, HEIGHT, FPS, hotkeys
+from Qubitrix.render.board import WINDOW_WIDTH, WINDOW_HEIGHT, BACKGROUND_COLORS, global_render
+from Qubitrix.render.level_of_detail import FULL_DETAIL, CIRCLES
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+
+# Each scenario plays an input script through Replay (so through keyboard_input_check and global_tick, like main()),
+# renders the final frame headlessly and compares it with tests/render/golden/<name>.png. Run pytest with
+# --update-golden to rewrite the images after an intended change to how things look, and check the new ones by eye.
+#
+# The same frames are timed as well: the fastest of RENDER_REPEATS renders has to fit in the frame budget.
+
+GOLDEN_FOLDER = os.path.join(os.path.dirname(__file__), "golden")
+PIXEL_TOLERANCE = 8 # how far each color channel may be from the golden image
+MISMATCH_FRACTION = 0.001 # how many pixels may be further off than that, for differences in text or polygon edges
+FRAME_BUDGET = 1/FPS # in seconds
+RENDER_REPEATS = 5
+KEYS = dict(zip(("right", "up", "left", "down", "grid cw", "grid ccw", "lower", "modifier", "hold", "pause"), hotkeys))
+
+def make_script(steps, seed=20240601):
+    """
+    Returns an InputLog that taps the keys named in steps one after another, a frame each with a frame in between.
+    Keys joined with "+" are pressed together and released in reverse order ("modifier+lower" is a hard drop), and
+    "wait N" lets N frames pass and "press KEY" presses a key without releasing it.
+    """
+    log = InputLog(seed)
+    frame = 1
+    for step in steps:
+        if step.startswith("wait "):
+            frame += int(step[5:])
+            continue
+        if step.startswith("press "):
+            log.frames[frame] = {"keys": [[KEYDOWN, KEYS[step[6:]]]]}
+            frame += 1
+            continue
+        scancodes = [KEYS[key] for key in step.split("+")]
+        log.frames[frame] = {"keys": [[KEYDOWN, scancode] for scancode in scancodes]}
+        log.frames[frame+1] = {"keys": [[KEYUP, scancode] for scancode in reversed(scancodes)]}
+        frame += 2
+    log.frame_count = frame
+    return log
+
+HARD_DROP = "modifier+lower"
+STACK = ["lower", "left", "left", HARD_DROP, "right", "right", HARD_DROP, "up", "modifier+right", HARD_DROP, "down", "down", HARD_DROP,
+         "modifier+up", "left", HARD_DROP, "right", HARD_DROP, "modifier+grid cw", "up", "up", HARD_DROP, HARD_DROP] # starts a game and builds a stack with overhangs
+
+COVERED_HOLES = {**{(x, y, HEIGHT-1): 1 + (x+y) % 8 for x in range(WIDTH) for y in range(DEPTH) if (x, y) not in ((1, 1), (2, 2))},
+                 (1, 1, HEIGHT-2): 3, (2, 2, HEIGHT-2): 5} # two empty cells with a cube above them, which are secluded
+
+SCENARIOS = { # name: (steps, detail, cells written to the grid afterwards, what the final state has to be)
+    "home": ([], FULL_DETAIL, {}, lambda game: game.mode == "Home"),
+    "rotation_0": (STACK + ["wait 60"], FULL_DETAIL, {}, lambda game: game.visual_grid_rotation == game.grid_rotation == 0),
+    "rotation_1": (STACK + ["grid cw", "wait 60"], FULL_DETAIL, {}, lambda game: game.visual_grid_rotation == game.grid_rotation == 1),
+    "rotation_2": (STACK + ["grid cw", "grid cw", "wait 60"], FULL_DETAIL, {}, lambda game: game.visual_grid_rotation == game.grid_rotation == 2),
+    "rotation_3": (STACK + ["grid ccw", "wait 60"], FULL_DETAIL, {}, lambda game: game.visual_grid_rotation == game.grid_rotation == 3),
+    "rotation_easing": (STACK + ["grid cw", "wait 2"], FULL_DETAIL, {}, lambda game: 0 < game.visual_grid_rotation < 1),
+    "ghost_grounded": (["lower", "wait 10"], FULL_DETAIL, {}, lambda game: game.piece_fully_grounded(game.ghost_piece)), # drawn with id -2
+    "ghost_hanging": (STACK + ["wait 10"], FULL_DETAIL, {}, lambda game: not game.piece_fully_grounded(game.ghost_piece)), # drawn with id -3
+    "secluded_spaces": (["lower", "wait 10"], FULL_DETAIL, COVERED_HOLES, lambda game: game.secluded_spaces == 2),
+    "circles": (STACK + ["wait 60"], CIRCLES, {}, lambda game: game.mode == "Playing"),
+    "paused": (STACK + ["pause", "wait 10"], FULL_DETAIL, {}, lambda game: game.mode == "Paused"),
+    "game_over": (["lower"] + [HARD_DROP]*40 + ["wait 60"], FULL_DETAIL, {}, lambda game: game.mode == "Finished" and not game.rotate_modifier),
+    "game_over_grid": (["lower"] + [HARD_DROP]*40 + ["wait 60", "press modifier", "wait 10"], FULL_DETAIL, {}, lambda game: game.mode == "Finished" and game.rotate_modifier),
+}
+
+def play(steps, cells):
+    replay = Replay(make_script(steps))
+    ui_color_id = None
+    while not replay.finished():
+        ui_color_id = replay.step()
+    if cells:
+        for (x, y, z), id in cells.items():
+            replay.game.grid[x][y][z] = id
+        replay.game.get_secluded_spaces() # as if the cells had been placed
+        replay.game.get_ghost_piece()
+    return replay.game, ui_color_id
+
+def render(game, ui_color_id, detail):
+    """Returns the frame main() would show, and the fastest time it took to render it out of RENDER_REPEATS."""
+    screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    font_small, font_large = get_small_font(WINDOW_HEIGHT), get_large_font(WINDOW_HEIGHT)
+    fastest = float("inf")
+    for _ in range(RENDER_REPEATS):
+        start = time.perf_counter()
+        screen.fill(tuple(int(c) for c in BACKGROUND_COLORS[ui_color_id]))
+        global_render(screen, game, font_small, font_large, ui_color_id, detail)
+        fastest = min(fastest, time.perf_counter()-start)
+    return screen, fastest
+
+@pytest.fixture(scope="module", autouse=True)
+def fonts():
+    pygame.font.init()
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_golden_frame(name, request, record_property):
+    steps, detail, cells, expected = SCENARIOS[name]
+    game, ui_color_id = play(steps, cells)
+    assert expected(game), f"the script for {name} no longer reaches the state it is meant to show"
+    frame, render_time = render(game, ui_color_id, detail)
+    record_property("render_ms", round(render_time*1000, 3))
+    path = os.path.join(GOLDEN_FOLDER, f"{name}.png")
+    if request.config.getoption("--update-golden") or not os.path.exists(path):
+        os.makedirs(GOLDEN_FOLDER, exist_ok=True)
+        pygame.image.save(frame, path)
+        if not request.config.getoption("--update-golden"):
+            pytest.fail(f"{path} did not exist and was created, check it and run the tests again")
+    golden = pygame.surfarray.array3d(pygame.image.load(path)).astype(np.int16)
+    difference = np.abs(pygame.surfarray.array3d(frame).astype(np.int16) - golden).max(axis=2)
+    mismatched = (difference > PIXEL_TOLERANCE).mean()
+    assert mismatched <= MISMATCH_FRACTION, f"{mismatched:.2%} of the pixels of {name} differ from {path}"
+    assert render_time <= FRAME_BUDGET, f"{name} took {render_time*1000:.1f}ms to render, over the {FRAME_BUDGET*1000:.1f}ms budget"
@@ -0,0 +1,19 @@
+from Qubitrix.render.level_of_detail import DetailGovernor, FULL_DETAIL, FLAT_SHADING, CIRCLES, STEP_DOWN_FRAMES, STEP_UP_FRAMES
+
+def test_steps_down_while_behind_and_back_up_with_headroom():
+    governor = DetailGovernor(1/60)
+    for _ in range(STEP_DOWN_FRAMES):
+        governor.record(1/30)
+    assert governor.tier == FLAT_SHADING and governor.steps_down == 1
+    for _ in range(STEP_DOWN_FRAMES*10):
+        governor.record(1/30)
+    assert governor.tier == CIRCLES # and no further
+    for _ in range(STEP_UP_FRAMES*CIRCLES):
+        governor.record(1/240)
+    assert governor.tier == FULL_DETAIL and governor.steps_up == CIRCLES
+
+def test_holds_tier_between_thresholds():
+    governor = DetailGovernor(1/60, tier=FLAT_SHADING)
+    for _ in range(STEP_UP_FRAMES*3):
+        governor.record(0.7/60) # too slow to step up, fast enough to stay
+    assert governor.tier == FLAT_SHADING and governor.steps_down == governor.steps_up == 0
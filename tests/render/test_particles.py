@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pygame
+
+from Qubitrix.engine import WIDTH, DEPTH, HEIGHT, FPS, Game
+from Qubitrix.render.board import WINDOW_WIDTH, WINDOW_HEIGHT, Y_CAMERA_DISTANCE, COLORS, PIECE_COLOR_COUNT, screen_coordinates
+from Qubitrix.render.particles import ParticleSystem
+
+PARTICLE_BUDGET = 0.25/FPS # in seconds, what a frame full of particles may add to rendering it
+FRAME_REPEATS = 5
+
+def make_particles(capacity=16384):
+    return ParticleSystem(WIDTH, DEPTH, HEIGHT, Y_CAMERA_DISTANCE, COLORS[:PIECE_COLOR_COUNT+1], capacity, seed=1)
+
+def test_particles_move_fade_and_are_packed():
+    particles = make_particles(capacity=100)
+    particles.spawn(np.zeros((60, 3), np.float32), np.array([1, 0, 0], np.float32), np.repeat([0.1, 1.0], 30), (255, 0, 0), 0.1, 1.0)
+    particles.spawn(np.zeros((60, 3), np.float32), 0.0, 1.0, (0, 255, 0), 0.1)
+    assert (particles.count, particles.dropped) == (100, 20)
+    particles.update(0.2)
+    assert particles.count == 70 # the short lived ones are gone, the rest moved up to fill their slots
+    assert np.all(particles.lifetime[:70] == 1.0)
+    assert np.all(particles.position[:30, 0] > 0) and np.all(particles.position[:30, 2] > 0) # moving and falling
+    assert np.all(particles.position[30:70] == 0) # staying put
+    particles.update(1.0)
+    assert particles.count == 0
+
+def test_particles_are_drawn_within_budget():
+    pygame.font.init()
+    particles = make_particles()
+    ids = [[(x+y) % PIECE_COLOR_COUNT + 1 for y in range(DEPTH)] for x in range(WIDTH)]
+    for z in range(HEIGHT-4, HEIGHT): # the most a single piece can clear, with a spin
+        particles.plane_cleared(z, ids, spin=True)
+    cubes = [(x, 0, HEIGHT-1) for x in range(4)]
+    particles.piece_locked(cubes, 1, hard=True)
+    particles.piece_spun(cubes, (1.5, 0, HEIGHT-1), 1, points=300)
+    assert particles.count > 1000 and not particles.dropped
+
+    screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    font = pygame.font.Font(None, 24)
+    fastest = float("inf")
+    for _ in range(FRAME_REPEATS):
+        screen.fill((0, 0, 0))
+        start = time.perf_counter()
+        particles.update(1/FPS)
+        particles.draw(screen, 0.5, screen_coordinates, font)
+        fastest = min(fastest, time.perf_counter()-start)
+    assert pygame.surfarray.array3d(screen).any()
+    assert fastest < PARTICLE_BUDGET
+
+def test_game_spawns_particles():
+    game = Game()
+    game.particles = make_particles()
+    game.init_game()
+    game.modified_input(6) # sonic drop
+    game.modified_input(6) # and place
+    assert game.particles.count > 0 and not game.particles.popups
+
+    game.particles = make_particles()
+    for x in range(WIDTH):
+        for y in range(DEPTH):
+            game.grid[x][y][HEIGHT-1] = 1
+    game.modified_input(6)
+    game.modified_input(6)
+    assert game.total_planes_cleared == 1
+    assert game.particles.count > WIDTH*DEPTH
+    assert game.particles.popups
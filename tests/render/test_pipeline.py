@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import pygame
+import pytest
+from pygame.locals import KEYDOWN, KEYUP
+
+from Qubitrix.fonts import get_large_font, get_small_font
+from Qubitrix.engine import WIDTH, DEPTH, HEIGHT, Game, global_tick, keyboard_input_check, get_ui_color_id
+from Qubitrix.render.board import WINDOW_WIDTH, WINDOW_HEIGHT, Y_CAMERA_DISTANCE, COLORS, PIECE_COLOR_COUNT, global_render
+from Qubitrix.render.particles import ParticleSystem
+from Qubitrix.render.pipeline import FrameSnapshot, SimulationThread
+
+def render(view):
+    screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    global_render(screen, view, get_small_font(WINDOW_HEIGHT), get_large_font(WINDOW_HEIGHT), get_ui_color_id(view))
+    return pygame.surfarray.array3d(screen)
+
+def make_game():
+    game = Game()
+    game.particles = ParticleSystem(WIDTH, DEPTH, HEIGHT, Y_CAMERA_DISTANCE, COLORS[:PIECE_COLOR_COUNT+1], seed=1)
+    return game
+
+def test_snapshots_draw_like_the_game():
+    pygame.font.init()
+    game = make_game()
+    assert np.array_equal(render(FrameSnapshot.capture(game)), render(game)) # the home screen
+    game.init_game()
+    game.hold_piece()
+    for x in range(WIDTH):
+        for y in range(DEPTH-1):
+            game.grid[x][y][HEIGHT-1] = 2
+    game.modified_input(6) # sonic drop
+    game.modified_input(6) # and place, leaving particles behind
+    game.basic_input(4) # turn the grid
+    global_tick(game)
+    assert game.particles.count and 0 < game.visual_grid_rotation % 1
+    assert np.array_equal(render(FrameSnapshot.capture(game)), render(game))
+    game.mode = "Finished"
+    assert np.array_equal(render(FrameSnapshot.capture(game)), render(game))
+
+def test_snapshots_do_not_change():
+    game = make_game()
+    game.init_game()
+    snapshot = FrameSnapshot.capture(game, frame=7)
+    grid, piece = snapshot.grid, snapshot.current_piece["cubes"]
+    game.modified_input(6)
+    game.modified_input(6)
+    global_tick(game)
+    assert snapshot.grid == grid and not any(any(any(column) for column in rows) for rows in grid)
+    assert snapshot.current_piece["cubes"] == piece != tuple(map(tuple, game.current_piece["cubes"]))
+    assert snapshot.particles.count == 0 < game.particles.count
+    with pytest.raises(AttributeError):
+        snapshot.score = 1
+    with pytest.raises(TypeError):
+        snapshot.current_piece["id"] = 0
+
+def test_simulation_thread_ticks_and_publishes():
+    game = make_game()
+    def step(events):
+        for event in events:
+            keyboard_input_check(event, game)
+        global_tick(game)
+    simulation = SimulationThread(step, lambda frame: FrameSnapshot.capture(game, frame), 240)
+    simulation.start()
+    simulation.send([pygame.event.Event(KEYDOWN, scancode=44)]) # space starts the game
+    simulation.send([pygame.event.Event(KEYUP, scancode=44)])
+    deadline = time.perf_counter()+5
+    while (simulation.latest is None or simulation.latest.mode != "Playing") and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    simulation.stop()
+    assert simulation.latest.mode == "Playing" and simulation.latest.grid is not None
+    assert simulation.latest.frame == simulation.ticks-1 > 0
+    ticks = simulation.ticks
+    time.sleep(0.05)
+    assert simulation.ticks == ticks
+
+def test_simulation_errors_reach_the_main_thread():
+    def step(events):
+        raise ValueError("broken tick")
+    simulation = SimulationThread(step, lambda frame: frame, 60)
+    simulation.start()
+    simulation.thread.join(5)
+    assert isinstance(simulation.error, ValueError)
+    with pytest.raises(ValueError):
+        simulation.stop()
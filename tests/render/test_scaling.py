@@ -0,0 +1,24 @@
+import pygame
+
+from Qubitrix.render.scaling import ScaledDisplay, get_scaled_rect
+
+def test_scaled_rect_keeps_the_aspect_ratio():
+    assert get_scaled_rect((960, 720), (960, 720)) == pygame.Rect(0, 0, 960, 720)
+    assert get_scaled_rect((960, 720), (3840, 2160)) == pygame.Rect(480, 0, 2880, 2160) # bars at the sides
+    assert get_scaled_rect((480, 360), (800, 1000)) == pygame.Rect(0, 200, 800, 600) # bars above and below
+
+def test_frames_are_scaled_to_the_window():
+    pygame.display.init()
+    try:
+        display = ScaledDisplay((96, 72), (400, 150))
+        display.surface.fill((200, 0, 0))
+        display.present((0, 0, 200))
+        assert display.rect == pygame.Rect(100, 0, 200, 150)
+        assert display.window.get_at((200, 75))[:3] == (200, 0, 0)
+        assert display.window.get_at((50, 75))[:3] == (0, 0, 200)
+        pygame.display.set_mode((96, 72), pygame.RESIZABLE) # as if the window had been resized
+        display.resize()
+        display.present((0, 0, 200))
+        assert display.rect == pygame.Rect(0, 0, 96, 72) and display.window.get_at((0, 0))[:3] == (200, 0, 0)
+    finally:
+        pygame.display.quit()
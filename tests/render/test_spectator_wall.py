@@ -0,0 +1,58 @@
+import functools
+
+import pygame
+
+from Qubitrix.environments.bot import make_bot
+from Qubitrix.fonts import get_small_font
+from Qubitrix.render.board import BACKGROUND_COLORS, global_render
+from Qubitrix.render.spectator_wall import CachedFont, SpectatorWall
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+from test_replay import make_log
+
+def test_replays_on_a_wall_play_like_alone():
+    logs = [make_log(600, seed) for seed in (11, 12, 13)]
+    pygame.init()
+    wall = SpectatorWall([functools.partial(Replay, log) for log in logs] + [functools.partial(make_bot, 5, think_frames=2)], tile_height=90)
+    for _ in range(logs[0].frame_count):
+        wall.step()
+        wall.render()
+    for log, board in zip(logs, wall.boards):
+        replay = Replay(log)
+        while not replay.finished():
+            replay.step()
+        assert board.game.mode == replay.game.mode != "Home"
+        assert (board.game.grid, board.game.score, board.game.next_pieces) == (replay.game.grid, replay.game.score, replay.game.next_pieces)
+
+def test_only_changed_boards_are_redrawn():
+    pygame.init()
+    idle_log = InputLog(1) # stays on the home screen
+    idle_log.frame_count = 100
+    wall = SpectatorWall([functools.partial(Replay, idle_log), functools.partial(make_bot, 2, think_frames=2)], tile_height=90)
+    for _ in range(60):
+        wall.step()
+        wall.render()
+    assert wall.skips >= 59 # the home screen doesn't change
+    assert 1 < wall.redraws < 60 + 60
+    assert not wall.stale
+
+
+def test_boards_look_as_if_drawn_alone():
+    pygame.init()
+    wall = SpectatorWall([functools.partial(make_bot, seed, think_frames=1) for seed in (3, 4)], tile_height=90)
+    for frame in range(400):
+        wall.step()
+        wall.render()
+        if frame % 10 == 0:
+            for n, player in enumerate(wall.boards):
+                alone = pygame.Surface(wall.tile_size)
+                alone.fill(tuple(int(c) for c in BACKGROUND_COLORS[wall.ui_color_ids[n]]))
+                global_render(alone, player.game, wall.font_small, wall.font_large, wall.ui_color_ids[n])
+                assert pygame.image.tobytes(alone, "RGB") == pygame.image.tobytes(wall.tiles[n], "RGB")
+
+def test_cached_font_renders_each_text_once():
+    pygame.init()
+    font = CachedFont(get_small_font(270))
+    assert font.render("Score", True, (255, 255, 255)) is font.render("Score", True, [255, 255, 255])
+    assert font.render("Score", True, (0, 0, 0)) is not font.render("Score", True, (255, 255, 255))
+    assert font.size("Score") == font.font.size("Score")
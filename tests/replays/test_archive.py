@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from Qubitrix.environments.bot import make_bot
+from Qubitrix.controllers.abstract_controller import GameEvent
+from Qubitrix.replays.archive import (GAP, INPUT_GAP, STREAMS, MAX_FRAME_DELTA, GameRecorder, ReplayArchive, append_games, clear_frequencies, get_event_dtype,
+                             get_game_frames, input_counts, multiplier_curve, placement_heatmap, record_session)
+from test_replay import make_log
+
+def play_bot_games(seed, frames):
+    """Returns the GameRecorder.games of a bot playing for frames frames, and the bot."""
+    bot = make_bot(seed, think_frames=1)
+    recorder = GameRecorder(seed)
+    bot.game.archive = recorder
+    for frame in range(frames):
+        recorder.frame = frame
+        bot.step()
+    recorder.frame = frames
+    recorder.finish(bot.game)
+    return recorder.games, bot
+
+def test_archive_matches_the_games_recorded(tmp_path):
+    log = make_log(1500)
+    log.save(tmp_path / "log.json")
+    session_games = record_session(tmp_path / "log.json")
+    bot_games, bot = play_bot_games(3, 4000)
+    append_games(tmp_path / "archive", session_games)
+    append_games(tmp_path / "archive", bot_games)
+
+    with ReplayArchive(tmp_path / "archive") as archive:
+        assert len(archive.games) == len(session_games) + len(bot_games)
+        assert list(archive.games["seed"]) == [1234]*len(session_games) + [3]*len(bot_games)
+        assert archive.games[-1]["score"] == int(bot.game.score)
+        assert archive.games[-1]["planes_cleared"] == bot.game.total_planes_cleared
+        assert list(archive.games[-1]["plane_clear_types"]) == bot.game.total_plane_clear_types
+        placements = sum(len(events) for _, events, _ in session_games + bot_games)
+        assert len(archive.events) == placements
+        assert all(archive.games["event_count"] > 0)
+
+        per_game = [(games, events) for games, events in archive.chunks(max_records=50)] # chunks hold whole games
+        assert sum(len(games) for games, _ in per_game) == len(archive.games)
+        frames = np.concatenate([get_game_frames(games, events) for games, events in per_game])
+        ends = np.cumsum(archive.games["event_count"]) - 1
+        assert all(frames[ends] <= archive.games["frames"])
+        assert np.all(np.cumsum(archive.events["score_delta"][:ends[0]+1]) <= archive.games[0]["score"])
+
+        heatmap = placement_heatmap(archive)
+        assert heatmap.shape == (archive.width, archive.depth, archive.height)
+        cubes = archive.events["cubes"].reshape(-1, 3)
+        assert heatmap.sum() == np.count_nonzero(cubes[:, 2] >= 0)
+        clears = clear_frequencies(archive)
+        assert clears.sum() == placements
+        assert clears[:, 0, 1:].sum(axis=0).tolist() == np.sum([game["plane_clear_types"] for game in archive.games], axis=0).tolist()
+        averages, counts = multiplier_curve(archive, bin_seconds=5)
+        assert counts.sum() == placements
+        assert np.all(averages[counts > 0] >= 1)
+
+        inputs = input_counts(archive)
+        assert inputs.sum() == len(archive.inputs) == sum(len(inputs) for _, _, inputs in session_games + bot_games)
+        assert inputs[GameEvent.LOWER_PIECE.value] > 0 # the session taps space
+        session_inputs = np.concatenate([get_game_frames(games, inputs, "inputs") for games, inputs in archive.chunks(stream="inputs")])[:archive.games[0]["input_count"]]
+        assert np.all(np.diff(session_inputs) >= 0)
+
+def test_long_gaps_and_interrupted_appends(tmp_path):
+    games, bot = play_bot_games(5, 300)
+    recorder = GameRecorder(6)
+    recorder.start_game(bot.game)
+    recorder.frame = 3*MAX_FRAME_DELTA
+    recorder.record_input(GameEvent.HOLD_PIECE)
+    recorder.record_piece(bot.game, 1, [(0, 0, 11), (1, 0, 11), (2, 0, 11), (3, 0, 11)], 0, False)
+    recorder.finish()
+    append_games(tmp_path, games + recorder.games)
+    for name, _, _, _ in STREAMS.values():
+        with open(tmp_path / name, "ab") as file:
+            file.write(b"\xff"*100) # records of an append that never got to write its games
+    append_games(tmp_path, games)
+
+    with ReplayArchive(tmp_path) as archive:
+        assert len(archive.games) == 2*len(games) + 1
+        gap_game = archive.games[len(games)]
+        gap_events = archive.events[gap_game["first_event"]:gap_game["first_event"]+gap_game["event_count"]]
+        assert list(gap_events["piece"]) == [GAP, GAP, 1]
+        assert gap_events["frame_delta"].sum(dtype=np.int64) == 3*MAX_FRAME_DELTA
+        gap_inputs = archive.inputs[gap_game["first_input"]:gap_game["first_input"]+gap_game["input_count"]]
+        assert list(gap_inputs["event"]) == [INPUT_GAP, INPUT_GAP, GameEvent.HOLD_PIECE.value]
+        assert placement_heatmap(archive)[:, 0, 11].sum() >= 4
+        first, last = archive.games[0], archive.games[-1]
+        assert bytes(archive.events[first["first_event"]:first["first_event"]+first["event_count"]]) == \
+               bytes(archive.events[last["first_event"]:last["first_event"]+last["event_count"]]) # the garbage was overwritten
+
+    with pytest.raises(ValueError):
+        append_games(tmp_path, [(games[0][0], np.zeros(1, get_event_dtype(5)), games[0][2])]) # pentacubes don't fit
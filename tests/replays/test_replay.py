@@ -0,0 +1,49 @@
+import os
+import random
+from pygame.locals import KEYDOWN, KEYUP
+
+from Qubitrix.replays.input_log import InputLog
+from Qubitrix.replays.replay import Replay
+
+def make_log(frame_count=900, seed=1234):
+    """A session that starts a game and then taps random hotkeys, holding shift some of the time."""
+    rng = random.Random(3)
+    log = InputLog(seed=seed)
+    log.frames[1] = {"keys": [[KEYDOWN, 44]]} # space starts the game
+    log.frames[2] = {"keys": [[KEYUP, 44]]}
+    for frame in range(10, frame_count, 6):
+        scancode = rng.choice([7, 26, 4, 22, 14, 15, 44, 225])
+        log.frames[frame] = {"keys": [[KEYDOWN, scancode]]}
+        log.frames[frame+rng.randrange(1, 5)] = {"keys": [[KEYUP, scancode]]}
+    log.frame_count = frame_count
+    return log
+
+def test_save_and_load(tmp_path):
+    log = make_log()
+    log.save(tmp_path / "log.json")
+    loaded = InputLog.load(tmp_path / "log.json")
+    assert (loaded.seed, loaded.frame_count, loaded.frames) == (log.seed, log.frame_count, log.frames)
+
+def test_snapshot_restores_identical_state():
+    log = make_log()
+    replay = Replay(log)
+    while replay.frame < 400:
+        replay.step()
+    snapshot = replay.snapshot()
+    while not replay.finished():
+        replay.step()
+    restored = Replay.restore(log, snapshot)
+    while not restored.finished():
+        restored.step()
+    assert replay.game.mode != "Home"
+    assert restored.game.grid == replay.game.grid
+    assert restored.game.score == replay.game.score
+
+def test_render_chunk(tmp_path):
+    from Qubitrix.render_replay import render_chunk, take_snapshots, frame_path
+    log = make_log(60)
+    log.save(tmp_path / "log.json")
+    snapshots = take_snapshots(log, 40)
+    render_chunk(str(tmp_path / "log.json"), snapshots[1], 45, str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["frame_000040.png", "frame_000041.png", "frame_000042.png", "frame_000043.png", "frame_000044.png", "log.json"]
+    assert os.path.isfile(frame_path(str(tmp_path), 44))
@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+from test_replay import make_log
+from Qubitrix.replays.replay import Replay
+from Qubitrix.replays.verification import VERIFIED, MISMATCH, TIMEOUT, INVALID, VerificationService, get_result, make_request_handler, verify_submission
+
+def make_submission(frame_count=900, **claimed_changes):
+    log = make_log(frame_count)
+    replay = Replay(log)
+    while not replay.finished():
+        replay.step()
+    return {"replay": log.to_dict(), "claimed": {**get_result(replay.game), **claimed_changes}}
+
+def test_verify_submission():
+    submission = make_submission()
+    assert submission["claimed"]["score"] > 0
+    report = verify_submission(submission)
+    assert report["verdict"] == VERIFIED and report["frames"] == 900
+    report = verify_submission(make_submission(score=submission["claimed"]["score"]+100, level=99))
+    assert report["verdict"] == MISMATCH and report["mismatches"] == ["level", "score"]
+    assert verify_submission({**submission, "claimed": {"score": submission["claimed"]["score"]}})["verdict"] == VERIFIED # unclaimed fields aren't checked
+    assert verify_submission({**submission, "claimed": {"lines": 4}})["verdict"] == INVALID
+    assert verify_submission({**submission, "claimed": {"level": submission["claimed"]["level"]}})["verdict"] == INVALID # claiming nothing proves nothing
+    assert verify_submission({"replay": {"version": 1}, "claimed": {}})["verdict"] == INVALID
+    assert verify_submission(make_submission(5000), time_limit=0)["verdict"] == TIMEOUT
+
+def test_service_queue_is_bounded():
+    submission = make_submission(3000)
+    with VerificationService(workers=1, queue_size=2) as service:
+        futures = [service.submit(submission, timeout=0) for _ in range(3)]
+        assert futures[2] is None # refused while the first two are queued
+        assert [future.result()["verdict"] for future in futures[:2]] == [VERIFIED, VERIFIED]
+        assert service.submit(submission, timeout=5).result()["verdict"] == VERIFIED # room again once they finished
+    assert service.counts == {VERIFIED: 3}
+
+def test_http_endpoint():
+    submission = make_submission(300)
+    with VerificationService(workers=1, queue_size=1) as service:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_request_handler(service, queue_timeout=5, max_body=len(json.dumps(submission))))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url + "/verify", json.dumps(submission).encode())) as response:
+                assert json.load(response)["verdict"] == VERIFIED
+            try:
+                urllib.request.urlopen(urllib.request.Request(url + "/verify", b"{"))
+                assert False, "malformed JSON was accepted"
+            except urllib.error.HTTPError as error:
+                assert error.code == 400
+            try:
+                urllib.request.urlopen(urllib.request.Request(url + "/verify", json.dumps(submission).encode() + b" "))
+                assert False, "an oversized submission was accepted"
+            except urllib.error.HTTPError as error:
+                assert error.code == 413
+            for _ in range(100): # the count is updated right after the report is sent
+                with urllib.request.urlopen(url + "/stats") as response:
+                    if json.load(response)["counts"] == {VERIFIED: 1}:
+                        break
+                time.sleep(0.01)
+            else:
+                assert False, "the verified submission wasn't counted"
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -11,3 +11,45 @@ def test_lazy_loading():
     # This assumes you have a sound file named "sonic_drop.wav" in the sounds folder
     effect = effects._load_sound("sonic_drop")
     assert effect.name == "sonic_drop"
+
+@pytest.fixture
+def fresh_effects():
+    """The Effects singleton with nothing loaded, put back the way it was afterwards."""
+    effects = Effects()
+    saved = dict(effects.__dict__)
+    effects.sounds = type(effects.sounds)()
+    effects.memory_used = 0
+    effects.counts = dict.fromkeys(effects.counts, 0)
+    yield effects
+    effects.__dict__.clear()
+    effects.__dict__.update(saved)
+
+def test_memory_budget_unloads_least_recently_played(fresh_effects):
+    effects = fresh_effects
+    clip_memory = effects["1_plane_clear"].memory # every clip is as long
+    effects.sounds.clear()
+    effects.memory_used = 0
+    effects.memory_budget = len(effects.pinned)*clip_memory + 2*clip_memory # room for two clips besides the pinned ones
+    effects.load_all_sounds()
+    assert set(effects.sounds) == effects.pinned | {"1_plane_clear", "1_spin_clear"} # pinned first, then while there is room
+    effects["1_plane_clear"] # played, so now the most recently played
+    effects.hold_piece
+    effects["2_plane_clear"] # over the budget: the least recently played unpinned sounds are unloaded
+    assert effects.memory_used <= effects.memory_budget
+    assert set(effects.sounds) == effects.pinned | {"hold_piece", "2_plane_clear"}
+    assert effects.counts["evictions"] > 0
+
+    loads = effects.counts["loads"]
+    effects["1_plane_clear"].play() # loaded again when it is needed
+    effects.move_piece.play()
+    assert effects.counts["loads"] == loads + 1
+    assert "hold_piece" not in effects.sounds and "move_piece" in effects.sounds
+
+def test_converted_sounds_are_cached_on_disk(fresh_effects, tmp_path):
+    effects = fresh_effects
+    effects.cache_folder = str(tmp_path)
+    raw = effects["sonic_drop"].sound.get_raw()
+    assert len(list(tmp_path.iterdir())) == 1
+    effects.sounds.clear()
+    assert effects["sonic_drop"].sound.get_raw() == raw
+    assert effects.counts["cache loads"] == 1 and effects.counts["loads"] == 2
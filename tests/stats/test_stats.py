@@ -0,0 +1,57 @@
+import sqlite3
+
+from Qubitrix.engine import Game
+from Qubitrix.stats import StatsStore
+
+def play_until_finished(game):
+    game.init_game()
+    while game.mode == "Playing":
+        game.modified_input(6) # sonic drop
+        game.modified_input(6) # and place
+
+def test_games_are_recorded(tmp_path):
+    path = str(tmp_path / "stats.sqlite3")
+    game = Game()
+    game.stats = StatsStore(path)
+    play_until_finished(game)
+    play_until_finished(game)
+    assert [score for score, _ in game.stats.leaderboard] == sorted([score for score, _ in game.stats.leaderboard], reverse=True)
+    assert len(game.stats.leaderboard) == 2 # known before anything is written
+    game.stats.close()
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM sessions WHERE ended_at IS NOT NULL").fetchone()[0] == 2
+    final_score, final_level = connection.execute("SELECT final_score, final_level FROM sessions WHERE id = 2").fetchone()
+    assert (final_score, final_level) == (int(game.score), game.level)
+    assert connection.execute("SELECT COUNT(*) FROM piece_events WHERE session_id = 2").fetchone()[0] > 0
+    connection.close()
+
+def test_leaderboard_is_loaded_at_startup(tmp_path):
+    path = str(tmp_path / "stats.sqlite3")
+    game = Game()
+    game.stats = StatsStore(path)
+    play_until_finished(game)
+    leaderboard = game.stats.leaderboard
+    game.stats.close()
+    store = StatsStore(path)
+    assert store.leaderboard == leaderboard
+    store.close()
+
+def test_processes_share_a_database(tmp_path):
+    path = str(tmp_path / "stats.sqlite3")
+    games = [Game(), Game()]
+    for game in games: # each store stands in for another process, with its own connection
+        game.stats = StatsStore(path)
+    for game in games + games:
+        play_until_finished(game)
+    games[0].init_game() # quit before this game is over
+    for game in games:
+        game.stats.close()
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*), COUNT(ended_at), COUNT(final_score) FROM sessions").fetchone() == (5, 5, 4)
+    assert connection.execute("SELECT COUNT(DISTINCT session_id) FROM piece_events").fetchone()[0] == 4
+    connection.close()
+    store = StatsStore(path)
+    assert len(store.leaderboard) == 4 # not the game that was quit
+    store.close()
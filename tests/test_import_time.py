@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pygame.locals
+
+from Qubitrix import engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET = 0.1 # in seconds, what importing Qubitrix.engine may take in a fresh interpreter, compiling it included
+IMPORT_REPEATS = 3
+
+def run_python(code, *options):
+    """Runs code in a fresh interpreter from the repository root and returns what it wrote to stdout and stderr."""
+    result = subprocess.run([sys.executable, *options, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout, result.stderr
+
+def loaded(code):
+    """Returns which of pygame, numpy and the lazily imported Qubitrix modules are imported after running code."""
+    stdout, _ = run_python(code + "\nimport sys\nprint(*(name for name in ('pygame', 'numpy', 'Qubitrix.sounds', 'Qubitrix.render.board') if name in sys.modules))")
+    return set(stdout.split())
+
+def test_engine_imports_without_pygame():
+    assert not loaded("import Qubitrix.engine")
+    assert not loaded("import Qubitrix, Qubitrix.render, Qubitrix.audio")
+    assert not loaded("from Qubitrix.engine import Game, global_tick\n"
+                      "game = Game(sounds=False)\n"
+                      "game.init_game()\n"
+                      "for frame in range(300):\n"
+                      "    if frame % 30 == 0:\n"
+                      "        game.modified_input(6)\n"
+                      "    global_tick(game)") - {"numpy"} # observation buffers need NumPy, but not pygame
+    assert {"pygame", "Qubitrix.render.board"} <= loaded("import Qubitrix\nQubitrix.render.WINDOW_WIDTH")
+    assert {"pygame", "Qubitrix.sounds"} <= loaded("import Qubitrix\nQubitrix.audio.Effects")
+
+def test_engine_imports_within_budget():
+    fastest = float("inf")
+    for _ in range(IMPORT_REPEATS):
+        _, stderr = run_python("import Qubitrix.engine", "-X", "importtime")
+        # lines are "import time: self [us] | cumulative | imported package", the engine's cumulative time includes its imports
+        cumulative = [int(line.split("|")[1]) for line in stderr.splitlines() if line.split("|")[-1].strip() == "Qubitrix.engine"]
+        fastest = min(fastest, cumulative[0]/1e6)
+    assert fastest < IMPORT_BUDGET
+
+def test_key_event_types_match_pygame():
+    assert (engine.KEYDOWN, engine.KEYUP) == (pygame.locals.KEYDOWN, pygame.locals.KEYUP)
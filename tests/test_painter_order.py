@@ -0,0 +1,21 @@
+import math
+
+from Qubitrix.engine import WIDTH, DEPTH, HEIGHT
+from Qubitrix.render.board import Y_CAMERA_DISTANCE, get_painter_order, painter_orders
+
+def test_painter_order_draws_occluded_cubes_first():
+    for rot in (0, 0.3, 0.5, 1, 1.7, 2.5, 3.9):
+        order = get_painter_order(rot)
+        camera = (Y_CAMERA_DISTANCE*math.sin(rot*math.pi/2)+(WIDTH-1)/2, -Y_CAMERA_DISTANCE*math.cos(rot*math.pi/2)+(DEPTH-1)/2, -(HEIGHT-1)/1.8)
+        position = {cell: n for n, cell in enumerate(order)}
+        for cell in order:
+            for axis in range(3): # the neighbour towards the camera along each axis can hide this cell, so it is drawn later
+                step = 1 if camera[axis] > cell[axis] + 0.5 else (-1 if camera[axis] < cell[axis] - 0.5 else 0)
+                neighbour = tuple(cell[n] + (step if n == axis else 0) for n in range(3))
+                if step and neighbour in position:
+                    assert position[neighbour] > position[cell]
+
+def test_painter_orders_are_cached_per_region():
+    assert get_painter_order(0) is get_painter_order(0.01)
+    assert get_painter_order(0) is not get_painter_order(1)
+    assert len(painter_orders) >= 2
@@ -0,0 +1,59 @@
+import random
+
+from Qubitrix.engine import Game, WIDTH, DEPTH, HEIGHT, get_kick_order
+
+def test_kick_order():
+    order = get_kick_order([4, 1, 1], 0)
+    assert order is get_kick_order((4, 1, 1), 0)
+    assert len(order) == len(set(order)) == 9*3*3
+    assert order[:3] == [(0, 0, 1), (1, 0, 1), (0, -1, 1)] # no horizontal displacement first, then towards the input, then beside it
+    assert [z for _, _, z in order] == sorted((z for _, _, z in order), reverse=True) # lower positions first
+    assert get_kick_order([4, 1, 1], 2)[1] == (-1, 0, 1)
+
+def test_blocked_rotation_leaves_the_piece():
+    random.seed(0)
+    game = Game()
+    game.init_game()
+    game.drop_piece()
+    cubes = [list(cube) for cube in game.current_piece["cubes"]]
+    for x in range(WIDTH):
+        for y in range(DEPTH):
+            for z in range(HEIGHT):
+                if [x, y, z] not in cubes:
+                    game.grid[x][y][z] = 9
+    for input in range(6):
+        game.rotate_piece(input)
+        assert game.current_piece["cubes"] == cubes
+
+def test_rotations_stay_in_free_cells():
+    random.seed(1)
+    game = Game()
+    for _ in range(20):
+        game.init_game()
+        for x in range(WIDTH):
+            for y in range(DEPTH):
+                for z in range(HEIGHT-random.randrange(HEIGHT-2), HEIGHT):
+                    game.grid[x][y][z] = 9
+        game.drop_piece()
+        for _ in range(10):
+            game.rotate_piece(random.randrange(6))
+            for x, y, z in game.current_piece["cubes"]:
+                assert 0 <= x < WIDTH and 0 <= y < DEPTH and z < HEIGHT
+                assert z < 0 or game.grid[x][y][z] <= 0
+
+def test_ghost_piece_lands_where_lowering_stops():
+    random.seed(2)
+    game = Game()
+    for _ in range(20):
+        game.init_game()
+        for x in range(WIDTH):
+            for y in range(DEPTH):
+                for z in range(HEIGHT-random.randrange(HEIGHT-2), HEIGHT):
+                    game.grid[x][y][z] = 9 if random.random() < 0.7 else 0
+        for _ in range(5):
+            game.rotate_piece(random.randrange(6))
+            lowered = {"centers": [list(center) for center in game.current_piece["centers"]], "cubes": [list(cube) for cube in game.current_piece["cubes"]]}
+            while not game.piece_grounded(lowered):
+                for position in lowered["cubes"] + lowered["centers"]:
+                    position[2] += 1
+            assert game.ghost_piece["cubes"] == lowered["cubes"] and game.ghost_piece["centers"] == lowered["centers"]